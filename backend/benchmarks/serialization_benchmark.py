@@ -0,0 +1,112 @@
+"""抽出結果のシリアライズのベンチマーク
+
+/api/extract-text の応答を作る処理を、従来の方法（ページごとの PageText モデルを作り、
+FastAPI の response_model と同じ手順で検証・変換してから json.dumps）と、
+services.serialization.dumps でページの辞書を直接バイト列にする方法で比較する。
+暗号化エンドポイントの従来の処理（.dict() + json.dumps(ensure_ascii=False)）も計測する。
+
+100ページあたりの処理時間（ミリ秒）と、処理中の最大メモリ使用量（tracemalloc、MB）を表示する。
+
+使い方（backend ディレクトリで実行）:
+    python -m benchmarks.serialization_benchmark path/to/scenario.pdf [--pages 300] [--repeat 5]
+"""
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+
+from pydantic import TypeAdapter
+
+from main import ExtractResponse, PageText
+from services import serialization
+from services.page_extractor import extract_page_range
+
+
+def build_result(pdf_path: str, pages: int) -> dict:
+    """PDFを抽出し、ページを繰り返して指定ページ数の run_extraction と同じ形式の結果を作る"""
+    extracted = extract_page_range(pdf_path, 1, None, True, False, False, 0.1, 0.1)["pages"]
+    page_list = [dict(extracted[i % len(extracted)], page_number=i + 1) for i in range(pages)]
+    return {
+        "total_pages": pages,
+        "extracted_pages": page_list,
+        "full_text": "\n".join(page["text"] for page in page_list),
+        "formatted_text": None,
+        "header_region": None,
+        "footer_region": None,
+        "layout": None
+    }
+
+
+def model_path(result: dict) -> bytes:
+    """従来の /api/extract-text: PageText モデル → response_model での検証 → JSON"""
+    response = ExtractResponse(
+        total_pages=result["total_pages"],
+        extracted_pages=[PageText(**page) for page in result["extracted_pages"]],
+        full_text=result["full_text"]
+    )
+    adapter = TypeAdapter(ExtractResponse)
+    content = adapter.dump_python(adapter.validate_python(response), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encrypted_model_path(result: dict) -> bytes:
+    """従来の /api/extract-text-encrypted: PageText モデル → .dict() → json.dumps"""
+    response = ExtractResponse(
+        total_pages=result["total_pages"],
+        extracted_pages=[PageText(**page) for page in result["extracted_pages"]],
+        full_text=result["full_text"]
+    )
+    return json.dumps(response.model_dump(), ensure_ascii=False).encode("utf-8")  # .dict() と同じ
+
+
+def stdlib_path(result: dict) -> bytes:
+    """ページの辞書を直接シリアライズ（標準ライブラリ）"""
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def measure(func, result: dict, repeat: int):
+    """(最小の処理時間 秒, 最大メモリ使用量 バイト, 出力サイズ バイト) を返す"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(result)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    output = func(result)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抽出結果のシリアライズのベンチマーク")
+    parser.add_argument("pdf", help="抽出するPDF（ページを繰り返して指定ページ数にする）")
+    parser.add_argument("--pages", type=int, default=300, help="結果のページ数")
+    parser.add_argument("--repeat", type=int, default=5, help="処理時間の計測回数（最小値を表示）")
+    args = parser.parse_args()
+
+    # 抽出処理のログは計測結果の表示の邪魔になるため出力しない
+    logging.disable(logging.INFO)
+
+    result = build_result(args.pdf, args.pages)
+    paths = [
+        ("PageText + response_model", model_path),
+        ("PageText + .dict() + json.dumps", encrypted_model_path),
+        ("辞書を直接（json）", stdlib_path),
+    ]
+    if serialization.orjson is not None:
+        paths.append(("辞書を直接（orjson）", serialization.dumps))
+
+    per_100 = 100 / args.pages
+    print(f"{args.pages}ページ（100ページあたりに換算）")
+    print(f"{'方法':<36}{'時間(ms)':>10}{'最大メモリ(MB)':>16}{'サイズ(MB)':>12}")
+    for name, func in paths:
+        elapsed, peak, size = measure(func, result, args.repeat)
+        print(f"{name:<36}{elapsed * 1000 * per_100:>10.1f}{peak * per_100 / 1e6:>16.2f}{size * per_100 / 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
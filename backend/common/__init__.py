@@ -1,16 +1,37 @@
 """共通ユーティリティモジュール"""
 
+from .page_model import Block, Line, Span, blocks_from_page_dict, as_blocks
 from .boundary_detector import detect_header_footer_boundaries
 from .gap_detector import detect_vertical_gaps
 from .column_detector import calculate_column_regions, calculate_columns_from_gaps
 from .column_assigner import assign_blocks_to_columns, assign_blocks_to_column_regions
 from .text_processor import process_blocks_to_text, merge_paragraph_blocks
 from .text_extractor import extract_block_text, contains_japanese
-from .text_style_analyzer import analyze_text_styles, classify_text_style, format_text_with_style
+from .text_style_analyzer import StyleProfile, analyze_text_styles, classify_text_style, format_text_with_style
 from .text_processor_with_style import process_blocks_to_text_with_style
 from .line_break_handler import should_break_line, merge_blocks_with_smart_breaks
+from .line_builder import group_words_into_lines
+from .text_page import PageTextContext, get_text_context
+from .layout_template import LayoutTemplateCache, geometry_signature, detect_page_layout
+from .reading_order import XYCutNode, xy_cut
+from .header_footer_model import HeaderFooterLearner, normalize_text_pattern, header_footer_thresholds
+from .layout_extractor import (
+    extract_with_layout,
+    build_text_blocks,
+    assemble_layout_text,
+    detect_page_regions,
+    detect_columns_with_blocks,
+    detect_toc_layout,
+    detect_header_footer,
+    process_block,
+)
 
 __all__ = [
+    'Block',
+    'Line',
+    'Span',
+    'blocks_from_page_dict',
+    'as_blocks',
     'detect_header_footer_boundaries',
     'detect_vertical_gaps',
     'calculate_column_regions',
@@ -21,10 +42,30 @@ __all__ = [
     'merge_paragraph_blocks',
     'extract_block_text',
     'contains_japanese',
+    'StyleProfile',
     'analyze_text_styles',
     'classify_text_style',
     'format_text_with_style',
     'process_blocks_to_text_with_style',
     'should_break_line',
     'merge_blocks_with_smart_breaks',
+    'group_words_into_lines',
+    'PageTextContext',
+    'get_text_context',
+    'LayoutTemplateCache',
+    'geometry_signature',
+    'detect_page_layout',
+    'XYCutNode',
+    'xy_cut',
+    'HeaderFooterLearner',
+    'normalize_text_pattern',
+    'header_footer_thresholds',
+    'extract_with_layout',
+    'build_text_blocks',
+    'assemble_layout_text',
+    'detect_page_regions',
+    'detect_columns_with_blocks',
+    'detect_toc_layout',
+    'detect_header_footer',
+    'process_block',
 ]
\ No newline at end of file
@@ -1,14 +1,16 @@
 """ヘッダー・フッター境界検出モジュール"""
 
-from typing import List, Dict, Tuple
+from typing import List, Tuple
+from .geometry import BlockGeometry
+from .page_model import Block, as_blocks
 
 
-def detect_header_footer_boundaries(blocks: List[Dict], page_height: float) -> Tuple[float, float]:
+def detect_header_footer_boundaries(blocks: List[Block], page_height: float) -> Tuple[float, float]:
     """
     位置のみに基づいてヘッダー・フッター境界を検出
     
     Args:
-        blocks: テキストブロックのリスト。各ブロックは"bbox"キーを持つ辞書
+        blocks: テキストブロックのリスト（Block または get_text("dict") 形式の辞書）
         page_height: ページの高さ
     
     Returns:
@@ -23,56 +25,34 @@ def detect_header_footer_boundaries(blocks: List[Dict], page_height: float) -> T
     
     if not blocks:
         return header_threshold, footer_threshold
+    blocks = as_blocks(blocks)
     
-    # Y座標でソート
-    sorted_blocks = sorted(blocks, key=lambda b: b["bbox"][1])
-    
-    # ページの実際の内容領域を確認
-    content_top = sorted_blocks[0]["bbox"][1] if sorted_blocks else 0
-    content_bottom = sorted_blocks[-1]["bbox"][3] if sorted_blocks else page_height
-    
-    # ヘッダー候補：ページ上部8%以内かつ50ポイント以内のブロック
+    # ヘッダー候補：ページ上部8%以内かつ50ポイント以内の最上部のブロック（通常ヘッダーは1行）
     header_limit = min(page_height * 0.08, 50)
-    # 上から順に見て、大きな間隔が開くまでをヘッダーとする
-    header_candidates = []
-    prev_bottom = 0
-    for b in sorted_blocks:
-        if b["bbox"][1] > header_limit:
-            break
-        # 前のブロックとの間隔が15ポイント以上開いたら終了
-        if header_candidates and b["bbox"][1] - prev_bottom > 15:
-            break
-        # 2つ以上のブロックは含めない（通常ヘッダーは1行）
-        if len(header_candidates) >= 1:
-            break
-        header_candidates.append(b)
-        prev_bottom = b["bbox"][3]
-    
     # フッター候補：ページ下部10%以内かつ下から60ポイント以内のブロック
     footer_limit = max(page_height * 0.9, page_height - 60)
-    footer_candidates = [b for b in sorted_blocks if b["bbox"][3] > footer_limit]
+    geometry = BlockGeometry(blocks)
+    header, next_body, footer_top, prev_body = geometry.header_footer_indices(header_limit, footer_limit)
     
     # ヘッダー境界の決定
-    if header_candidates:
+    if header is not None:
         # ヘッダー候補の最下端 + マージン
-        header_bottom = max(b["bbox"][3] for b in header_candidates)
+        header_bottom = blocks[header].bbox[3]
         # 次のブロックとの間隔を考慮
-        non_header_blocks = [b for b in sorted_blocks if b not in header_candidates]
-        if non_header_blocks:
-            next_block_top = non_header_blocks[0]["bbox"][1]
+        if next_body is not None:
+            next_block_top = blocks[next_body].bbox[1]
             # ヘッダーと本文の中間点を境界とする
             header_threshold = (header_bottom + next_block_top) / 2
         else:
             header_threshold = header_bottom + 10
     
     # フッター境界の決定
-    if footer_candidates:
+    if footer_top is not None:
         # フッター候補の最上端 - マージン
-        footer_top = min(b["bbox"][1] for b in footer_candidates)
+        footer_top = blocks[footer_top].bbox[1]
         # 前のブロックとの間隔を考慮
-        non_footer_blocks = [b for b in sorted_blocks if b not in footer_candidates]
-        if non_footer_blocks:
-            prev_block_bottom = non_footer_blocks[-1]["bbox"][3]
+        if prev_body is not None:
+            prev_block_bottom = blocks[prev_body].bbox[3]
             # 本文とフッターの中間点を境界とする
             footer_threshold = (prev_block_bottom + footer_top) / 2
         else:
@@ -1,86 +1,46 @@
 """ブロックのカラム割り当てモジュール"""
 
 from typing import List, Dict, Tuple
-
-try:
-    from .text_extractor import extract_block_text
-except ImportError:
-    # フォールバック
-    def extract_block_text(block):
-        if "lines" in block:
-            text = ""
-            for line in block["lines"]:
-                for span in line.get("spans", []):
-                    text += span.get("text", "")
-            return text
-        return ""
+from .geometry import BlockGeometry
+from .page_model import Block, as_blocks
 
 
 def assign_blocks_to_columns(
-    blocks: List[Dict],
+    blocks: List[Block],
     column_regions: List[Tuple[float, float]],
     overlap_threshold: float = 0.5
-) -> List[List[Dict]]:
+) -> List[List[Block]]:
     """
     ブロックを適切なカラムに割り当て
     
     Args:
-        blocks: テキストブロックのリスト
+        blocks: テキストブロックのリスト（Block または get_text("dict") 形式の辞書）
         column_regions: カラム領域のリスト。各領域は (left, right) のタプル
         overlap_threshold: カラムに割り当てるための最小オーバーラップ率（デフォルト: 0.5）
     
     Returns:
         カラムごとのブロックリスト
     """
-    columns = [[] for _ in range(len(column_regions))]
-    
-    for block in blocks:
-        block_left = block["bbox"][0]
-        block_right = block["bbox"][2]
-        
-        # どのカラムに属するか判定（ブロックの大部分が含まれるカラムに割り当て）
-        best_column = -1
-        best_overlap = 0
-        
-        for i, (col_left, col_right) in enumerate(column_regions):
-            # オーバーラップ部分を計算
-            overlap_left = max(block_left, col_left)
-            overlap_right = min(block_right, col_right)
-            overlap_width = max(0, overlap_right - overlap_left)
-            
-            # ブロックの幅
-            block_width = block_right - block_left
-            
-            # オーバーラップ率を計算
-            if block_width > 0:
-                overlap_ratio = overlap_width / block_width
-                if overlap_ratio > best_overlap:
-                    best_overlap = overlap_ratio
-                    best_column = i
-        
-        # 最もオーバーラップが大きいカラムに割り当て
-        if best_column >= 0 and best_overlap >= overlap_threshold:
-            columns[best_column].append(block)
-    
-    # 各カラムをY座標でソート
-    for column_blocks in columns:
-        column_blocks.sort(key=lambda b: b["bbox"][1])
+    # ブロックの大部分が含まれるカラムに割り当て、各カラムをY座標でソート
+    geometry = BlockGeometry(as_blocks(blocks))
+    labels = geometry.best_overlap_columns(column_regions, overlap_threshold)
+    columns = [geometry.take(indices) for indices in geometry.group_by_label(labels, len(column_regions))]
     
     # 空のカラムを除去せず、すべてのカラムを返す（analyze_layoutでの対応関係を保持するため）
     return columns
 
 
 def assign_blocks_to_column_regions(
-    blocks: List[Dict],
+    blocks: List[Block],
     column_regions: List[Dict],
     vertical_gaps: List[Dict] = None,
     overlap_threshold: float = 0.5
-) -> List[List[Dict]]:
+) -> List[List[Block]]:
     """
     ブロックをカラム領域（辞書形式）に割り当て
     
     Args:
-        blocks: テキストブロックのリスト
+        blocks: テキストブロックのリスト（Block または get_text("dict") 形式の辞書）
         column_regions: カラム領域のリスト。各領域は {x, width, y, height} を持つ辞書
         vertical_gaps: 縦の余白領域のリスト。各領域は {x, width, y, height} を持つ辞書
         overlap_threshold: カラムに割り当てるための最小オーバーラップ率（デフォルト: 0.5）
@@ -98,43 +58,11 @@ def assign_blocks_to_column_regions(
         for i, gap in enumerate(vertical_gaps):
             logger.info(f"[column_assigner] 余白{i}: x={gap['x']:.2f}, width={gap['width']:.2f}")
     
-    columns = [[] for _ in range(len(column_regions))]
-    
-    for block_idx, block in enumerate(blocks):
-        block_left = block["bbox"][0]
-        block_right = block["bbox"][2]
-        
-        # どのカラムに属するか判定
-        best_column = -1
-        best_overlap = 0
-        
-        for i, column in enumerate(column_regions):
-            col_left = column["x"]
-            col_right = column["x"] + column["width"]
-            
-            # オーバーラップ部分を計算
-            overlap_left = max(block_left, col_left)
-            overlap_right = min(block_right, col_right)
-            overlap_width = max(0, overlap_right - overlap_left)
-            
-            # ブロックの幅
-            block_width = block_right - block_left
-            
-            # オーバーラップ率を計算
-            if block_width > 0:
-                overlap_ratio = overlap_width / block_width
-                
-                if overlap_ratio > best_overlap:
-                    best_overlap = overlap_ratio
-                    best_column = i
-        
-        # 最もオーバーラップが大きいカラムに割り当て
-        if best_column >= 0 and best_overlap >= overlap_threshold:
-            columns[best_column].append(block)
-    
-    # 各カラムをY座標でソート
-    for column_blocks in columns:
-        column_blocks.sort(key=lambda b: b["bbox"][1])
+    # 最もオーバーラップが大きいカラムに割り当て、各カラムをY座標でソート
+    geometry = BlockGeometry(as_blocks(blocks))
+    regions = [(column["x"], column["x"] + column["width"]) for column in column_regions]
+    labels = geometry.best_overlap_columns(regions, overlap_threshold)
+    columns = [geometry.take(indices) for indices in geometry.group_by_label(labels, len(column_regions))]
     
     # 空のカラムを除去せず、すべてのカラムを返す（analyze_layoutでの対応関係を保持するため）
     return columns
\ No newline at end of file
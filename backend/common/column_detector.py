@@ -1,9 +1,10 @@
 """カラム検出と領域計算モジュール"""
 
 from typing import List, Dict, Tuple
+from .page_model import Block, as_blocks
 
 
-def calculate_column_regions(blocks: List[Dict], page_width: float, gap_threshold: float = 50) -> List[Tuple[float, float]]:
+def calculate_column_regions(blocks: List[Block], page_width: float, gap_threshold: float = 50) -> List[Tuple[float, float]]:
     """
     ブロックのX座標分布からカラム領域を計算
     
@@ -20,9 +21,9 @@ def calculate_column_regions(blocks: List[Dict], page_width: float, gap_threshol
     
     # 全ブロックのX座標範囲を収集
     x_ranges = []
-    for block in blocks:
-        left = block["bbox"][0]
-        right = block["bbox"][2]
+    for block in as_blocks(blocks):
+        left = block.bbox[0]
+        right = block.bbox[2]
         x_ranges.append((left, right))
     
     # 左端でソート
@@ -50,7 +51,7 @@ def calculate_column_regions(blocks: List[Dict], page_width: float, gap_threshol
 
 def calculate_columns_from_gaps(
     vertical_gaps: List[Dict],
-    blocks: List[Dict],
+    blocks: List[Block],
     page_width: float,
     header_boundary: float,
     footer_boundary: float
@@ -88,8 +89,9 @@ def calculate_columns_from_gaps(
     
     # ブロックの最小・最大X座標を取得（余白領域外も考慮）
     if blocks:
-        min_x = min(b["bbox"][0] for b in blocks)
-        max_x = max(b["bbox"][2] for b in blocks)
+        blocks = as_blocks(blocks)
+        min_x = min(b.bbox[0] for b in blocks)
+        max_x = max(b.bbox[2] for b in blocks)
     else:
         min_x = 0
         max_x = page_width
@@ -0,0 +1,165 @@
+"""ブロック座標の一括計算モジュール
+
+1ページ分のブロックの bbox を (N, 4) の float 配列にまとめ、カラムとの重なり率・
+割り当て先カラム・ヘッダー/フッター候補・ソート順を NumPy でまとめて計算する。
+結果はブロックのインデックス配列で返し、元の Block への対応付けは呼び出し側で行う。
+判定の条件（比較の向き、同率のときに先頭を選ぶことなど）は従来のループ処理と同じにしている。
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .page_model import Block
+
+# 割り当て先のカラムがないことを表すラベル
+UNASSIGNED = -1
+
+
+class BlockGeometry:
+    """1ページ分のブロックの bbox を (N, 4) の配列として保持する"""
+
+    def __init__(self, blocks: Sequence[Block]):
+        """
+        Args:
+            blocks: Block のリスト
+        """
+        self.blocks = blocks
+        self.boxes = np.array([b.bbox for b in blocks], dtype=np.float64).reshape(-1, 4)
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    @property
+    def centers_x(self) -> np.ndarray:
+        """ブロックの中心X座標"""
+        return (self.boxes[:, 0] + self.boxes[:, 2]) / 2
+
+    def take(self, indices: Sequence[int]) -> List[Block]:
+        """インデックスの並びを Block のリストに戻す"""
+        return [self.blocks[i] for i in indices]
+
+    def y_order(self) -> np.ndarray:
+        """上端のY座標での安定ソート順（sorted(key=y0) と同じ並び）"""
+        return np.argsort(self.boxes[:, 1], kind="stable")
+
+    def yx_order(self) -> np.ndarray:
+        """(上端Y, 左端X) での安定ソート順（sorted(key=(y0, x0)) と同じ並び）"""
+        return np.lexsort((self.boxes[:, 0], self.boxes[:, 1]))
+
+    def overlap_ratios(self, column_regions: Sequence[Tuple[float, float]]) -> np.ndarray:
+        """
+        各ブロックの横幅のうち各カラムと重なる割合を (N, M) の行列で返す
+        幅が0以下のブロックの行はすべて0にする
+        """
+        cols = np.array(column_regions, dtype=np.float64).reshape(-1, 2)
+        left = self.boxes[:, 0:1]
+        right = self.boxes[:, 2:3]
+        overlap = np.minimum(right, cols[:, 1]) - np.maximum(left, cols[:, 0])
+        np.maximum(overlap, 0, out=overlap)
+        widths = right - left
+        valid = widths[:, 0] > 0
+        ratios = np.zeros_like(overlap)
+        ratios[valid] = overlap[valid] / widths[valid]
+        return ratios
+
+    def best_overlap_columns(
+        self,
+        column_regions: Sequence[Tuple[float, float]],
+        overlap_threshold: float
+    ) -> np.ndarray:
+        """
+        各ブロックの重なり率が最大のカラムのインデックスを返す
+
+        重なり率が0のブロックと、最大の重なり率が overlap_threshold 未満のブロックは UNASSIGNED。
+        最大の重なり率のカラムが複数ある場合は先頭のカラムを選ぶ。
+        """
+        labels = np.full(len(self), UNASSIGNED, dtype=np.intp)
+        if not len(self) or not len(column_regions):
+            return labels
+        ratios = self.overlap_ratios(column_regions)
+        best = ratios.argmax(axis=1)
+        best_ratio = ratios[np.arange(len(self)), best]
+        assigned = (best_ratio > 0) & (best_ratio >= overlap_threshold)
+        labels[assigned] = best[assigned]
+        return labels
+
+    def center_columns(self, column_regions: Sequence[Tuple[float, float]]) -> np.ndarray:
+        """
+        中心X座標が含まれるカラム（両端を含む）のインデックスを返す
+        複数のカラムに含まれる場合は先頭のカラム、どのカラムにも含まれない場合は中心が最も近いカラム
+        """
+        labels = np.zeros(len(self), dtype=np.intp)
+        if not len(self) or not len(column_regions):
+            return labels
+        cols = np.array(column_regions, dtype=np.float64).reshape(-1, 2)
+        centers = self.centers_x[:, None]
+        inside = (cols[:, 0] <= centers) & (centers <= cols[:, 1])
+        col_centers = (cols[:, 0] + cols[:, 1]) / 2
+        nearest = np.abs(centers - col_centers).argmin(axis=1)
+        return np.where(inside.any(axis=1), inside.argmax(axis=1), nearest)
+
+    def boundary_columns(self, boundaries: Sequence[float]) -> np.ndarray:
+        """
+        昇順の境界座標で区切ったカラム [boundaries[i], boundaries[i + 1]) のうち
+        中心X座標が含まれるカラムのインデックスを返す（範囲外の場合は中心が最も近いカラム）
+        """
+        edges = np.asarray(boundaries, dtype=np.float64)
+        n_columns = len(edges) - 1
+        labels = np.zeros(len(self), dtype=np.intp)
+        if not len(self) or n_columns < 1:
+            return labels
+        centers = self.centers_x
+        labels = np.searchsorted(edges, centers, side="right") - 1
+        outside = (labels < 0) | (labels >= n_columns)
+        if outside.any():
+            col_centers = (edges[:-1] + edges[1:]) / 2
+            nearest = np.abs(centers[outside, None] - col_centers).argmin(axis=1)
+            labels[outside] = nearest
+        return labels
+
+    def group_by_label(self, labels: np.ndarray, n_groups: int, order: Optional[np.ndarray] = None) -> List[List[int]]:
+        """
+        ラベルごとにブロックのインデックスをまとめる（UNASSIGNED は除く）
+        各グループの中は order の並び（省略時は y_order）になる
+        """
+        if order is None:
+            order = self.y_order()
+        groups = [[] for _ in range(n_groups)]
+        for i, label in zip(order.tolist(), labels[order].tolist()):
+            if label != UNASSIGNED:
+                groups[label].append(i)
+        return groups
+
+    def header_footer_indices(
+        self,
+        header_limit: float,
+        footer_limit: float
+    ) -> Tuple[Optional[int], Optional[int], Optional[int], Optional[int]]:
+        """
+        ヘッダー・フッターの境界計算に使うブロックのインデックスを返す
+
+        ヘッダーは上端が header_limit 以下の最上部の1ブロック、フッターは下端が footer_limit を
+        超えるブロックとする。
+
+        Returns:
+            (header, next_body, footer_top, prev_body):
+                ヘッダーのブロック、ヘッダーの次のブロック、フッター候補のうち上端が最も上のブロック、
+                フッター候補以外でY順の最後のブロック（該当がない場合はNone）
+        """
+        if not len(self):
+            return None, None, None, None
+        order = self.y_order()
+        header = next_body = footer_top = prev_body = None
+        if self.boxes[order[0], 1] <= header_limit:
+            header = int(order[0])
+            if len(order) > 1:
+                next_body = int(order[1])
+        is_footer = self.boxes[order, 3] > footer_limit
+        if is_footer.any():
+            footer_order = order[is_footer]
+            footer_top = int(footer_order[self.boxes[footer_order, 1].argmin()])
+            body_order = order[~is_footer]
+            if len(body_order):
+                prev_body = int(body_order[-1])
+        return header, next_body, footer_top, prev_body
@@ -0,0 +1,293 @@
+"""ドキュメント全体で繰り返し現れるヘッダー・フッターの学習モジュール
+
+ページを1ページずつ受け取り、ページ上部・下部の帯にあるブロックのテキストを正規化した
+パターンごとの件数だけを保持する（ページのブロック自体は保持しない）。
+全ページを読み終えたら、多くのページで同じ位置に現れるパターンからドキュメント共通の
+ヘッダー領域・フッター領域を決め、各ページの処理ではその領域を使う。
+
+ページ範囲ごとに作った学習結果は merge でページ順に結合できる。
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .page_model import Block, as_blocks
+from .text_extractor import extract_block_text
+
+# ヘッダーを探すページ上部の帯（ページ高さに対する割合。狭い帯から順に調べる）
+HEADER_LEVELS = (0.05, 0.10, 0.15, 0.20)
+# フッターを探すページ下部の帯（ブロック上端のページ高さに対する割合。狭い帯から順に調べる）
+FOOTER_LEVELS = (0.95, 0.90, 0.85, 0.80)
+# ヘッダー・フッターとみなすパターンが現れるページの割合
+REPEAT_RATIO = 0.7
+# ページ番号とみなすパターンが現れるページの割合
+PAGE_NUMBER_RATIO = 0.5
+# 1つの帯で保持するパターン数の上限（超えたら出現ページ数の少ないものから捨てる）
+MAX_PATTERNS_PER_LEVEL = 64
+
+PAGE_NUMBER = 'PAGE_NUMBER'
+
+
+def normalize_text_pattern(text: str) -> str:
+    """
+    ヘッダー・フッターのテキストをページ間で比較できる形に正規化する
+
+    ページ番号だけのテキストは 'PAGE_NUMBER' に、日付・時刻・章番号・その他の数字は記号に置き換える。
+    """
+    if not text:
+        return ""
+
+    normalized = text.strip()
+
+    # 単独の数字（ページ番号の可能性が高い）を特別に処理
+    if re.match(r'^\d+$', normalized):
+        return PAGE_NUMBER
+
+    # ページ番号を含むパターン
+    # 例: "- 1 -", "Page 1", "1 / 10", "[1]"
+    if re.match(r'^[-\[\(\{]*\s*\d+\s*[-\]\)\}]*$', normalized):
+        return PAGE_NUMBER
+
+    if re.match(r'^(Page|ページ|頁|P\.?|p\.?)\s*\d+$', normalized, re.IGNORECASE):
+        return PAGE_NUMBER
+
+    if re.match(r'^\d+\s*/\s*\d+$', normalized):  # "1 / 10" 形式
+        return PAGE_NUMBER
+
+    # 日付パターンを正規化（ページ番号と区別するため、より厳密に）
+    normalized = re.sub(r'\d{4}[-/年]\d{1,2}[-/月]\d{1,2}[日]?', 'DATE', normalized)
+    normalized = re.sub(r'\d{1,2}[-/月]\d{1,2}[日]?', 'DATE', normalized)
+
+    # 時刻パターンを正規化
+    normalized = re.sub(r'\d{1,2}:\d{2}(:\d{2})?', 'TIME', normalized)
+
+    # 章番号パターンを正規化
+    normalized = re.sub(r'第\s*\d+\s*[章節]', '第#章', normalized)
+    normalized = re.sub(r'Chapter\s*\d+', 'Chapter #', normalized, flags=re.IGNORECASE)
+
+    # その他の数字を正規化（ページ番号ではないもの）
+    normalized = re.sub(r'\b\d+\b', '#', normalized)
+
+    # 空白の正規化
+    normalized = re.sub(r'\s+', ' ', normalized)
+
+    return normalized.strip()
+
+
+class _PatternCounter:
+    """1つの帯の1つのパターンの出現状況"""
+
+    __slots__ = ("pages", "last_page", "y_sum", "y_count", "max_height",
+                 "numbers", "first_number", "last_number", "sequential")
+
+    def __init__(self):
+        self.pages = 0            # 出現したページ数
+        self.last_page = None     # 最後に出現したページ番号
+        self.y_sum = 0.0          # ブロック上端のY座標の合計
+        self.y_count = 0          # 出現したブロック数
+        self.max_height = 0.0     # ブロックの高さの最大値
+        # ページ番号の連続性（数字の出現数、(ページ番号, テキスト中の数字) の最初と最後、これまで連続しているか）
+        self.numbers = 0
+        self.first_number = None
+        self.last_number = None
+        self.sequential = True
+
+    def add(self, page_number: int, y: float, height: float, number: Optional[int]):
+        if self.last_page != page_number:
+            self.pages += 1
+            self.last_page = page_number
+        self.y_sum += y
+        self.y_count += 1
+        self.max_height = max(self.max_height, height)
+        if number is not None:
+            self._add_numbers((page_number, number), (page_number, number), 1)
+
+    def _add_numbers(self, first: Tuple[int, int], last: Tuple[int, int], count: int):
+        """数字の出現（first から last までの count 個）を後ろに追加する"""
+        self.numbers += count
+        if self.last_number is None:
+            self.first_number = first
+        elif first[1] - self.last_number[1] != first[0] - self.last_number[0]:
+            self.sequential = False
+        self.last_number = last
+
+    def merge(self, other: "_PatternCounter"):
+        """後ろのページ範囲の出現状況を加える"""
+        self.pages += other.pages
+        if other.last_page is not None:
+            self.last_page = other.last_page
+        self.y_sum += other.y_sum
+        self.y_count += other.y_count
+        self.max_height = max(self.max_height, other.max_height)
+        if other.first_number is not None:
+            self._add_numbers(other.first_number, other.last_number, other.numbers)
+            self.sequential = self.sequential and other.sequential
+
+    @property
+    def is_sequential(self) -> bool:
+        """2つ以上の数字が、ページ番号と同じ間隔で増えているか"""
+        return self.sequential and self.numbers >= 2
+
+    @property
+    def avg_y(self) -> float:
+        return self.y_sum / self.y_count
+
+
+def _merge_level(level: Dict[str, _PatternCounter], other: Dict[str, _PatternCounter]):
+    for pattern, counter in other.items():
+        if pattern in level:
+            level[pattern].merge(counter)
+        else:
+            level[pattern] = counter
+    _prune_level(level)
+
+
+def _prune_level(level: Dict[str, _PatternCounter]):
+    """パターン数が上限を超えたら出現ページ数の多いものだけを残す"""
+    if len(level) <= MAX_PATTERNS_PER_LEVEL:
+        return
+    keep = sorted(level.items(), key=lambda item: item[1].pages, reverse=True)[:MAX_PATTERNS_PER_LEVEL // 2]
+    kept = dict(keep)
+    for pattern in list(level):
+        if pattern not in kept:
+            del level[pattern]
+
+
+class HeaderFooterLearner:
+    """ページを順に受け取り、ヘッダー・フッターのパターンの出現数を数える"""
+
+    def __init__(self):
+        self.page_count = 0
+        self.header_levels: List[Dict[str, _PatternCounter]] = [{} for _ in HEADER_LEVELS]
+        self.footer_levels: List[Dict[str, _PatternCounter]] = [{} for _ in FOOTER_LEVELS]
+
+    def add_page(self, page_number: int, page_height: float, blocks: Iterable[Block]):
+        """
+        1ページ分のブロックを追加する（ページ番号の昇順に呼ぶ）
+
+        Args:
+            page_number: ページ番号（1始まり）
+            page_height: ページの高さ
+            blocks: ページのテキストブロック（テキストブロックがないページは数えない）
+        """
+        blocks = as_blocks(blocks)
+        if not blocks:
+            return
+        self.page_count += 1
+
+        header_limit = page_height * HEADER_LEVELS[-1]
+        footer_limit = page_height * FOOTER_LEVELS[-1]
+        for block in blocks:
+            y = block.bbox[1]
+            if header_limit < y < footer_limit:
+                continue
+            text = block.text if block.text is not None else extract_block_text(block)
+            text = " ".join(line for line in text.split("\n") if line)
+            pattern = normalize_text_pattern(text)
+            if not pattern:
+                continue
+            number = None
+            if pattern == PAGE_NUMBER:
+                match = re.search(r'\d+', text)
+                number = int(match.group()) if match else None
+            height = block.bbox[3] - block.bbox[1]
+
+            for level, percent in zip(self.header_levels, HEADER_LEVELS):
+                if y <= page_height * percent:
+                    self._count(level, pattern, page_number, y, height, number)
+            for level, percent in zip(self.footer_levels, FOOTER_LEVELS):
+                if y >= page_height * percent:
+                    self._count(level, pattern, page_number, y, height, number)
+
+    @staticmethod
+    def _count(level: Dict[str, _PatternCounter], pattern: str, page_number: int, y: float, height: float, number: Optional[int]):
+        counter = level.get(pattern)
+        if counter is None:
+            counter = level[pattern] = _PatternCounter()
+        counter.add(page_number, y, height, number)
+        _prune_level(level)
+
+    def merge(self, other: "HeaderFooterLearner") -> "HeaderFooterLearner":
+        """後ろのページ範囲の学習結果を加える"""
+        self.page_count += other.page_count
+        for level, other_level in zip(self.header_levels, other.header_levels):
+            _merge_level(level, other_level)
+        for level, other_level in zip(self.footer_levels, other.footer_levels):
+            _merge_level(level, other_level)
+        return self
+
+    def _header_region(self) -> Optional[Dict[str, Any]]:
+        for level in self.header_levels:
+            candidates = [
+                (pattern, counter) for pattern, counter in level.items()
+                if counter.pages >= self.page_count * REPEAT_RATIO
+            ]
+            if candidates:
+                # 最も多くのページに現れるパターン
+                pattern, counter = max(candidates, key=lambda c: c[1].pages)
+                return {
+                    "y_end": counter.avg_y + counter.max_height * 1.5,
+                    "pattern": pattern
+                }
+        return None
+
+    def _footer_region(self) -> Optional[Dict[str, Any]]:
+        candidates = []
+        for level in self.footer_levels:
+            for pattern, counter in level.items():
+                ratio = PAGE_NUMBER_RATIO if pattern == PAGE_NUMBER else REPEAT_RATIO
+                if counter.pages >= self.page_count * ratio:
+                    candidates.append((pattern, counter))
+            # 連続したページ番号が見つかったら、より広い帯は調べない
+            if any(pattern == PAGE_NUMBER and counter.is_sequential for pattern, counter in candidates):
+                break
+        if not candidates:
+            return None
+        pattern, counter = max(candidates, key=lambda c: c[1].pages)
+        return {
+            "y_start": counter.avg_y - 20,
+            "pattern": pattern
+        }
+
+    def regions(self) -> Optional[Dict[str, Optional[Dict[str, Any]]]]:
+        """
+        ドキュメント共通のヘッダー・フッター領域を返す
+
+        Returns:
+            {"header": {"y_end", "pattern"} または None, "footer": {"y_start", "pattern"} または None}。
+            テキストのあるページが2ページ未満の場合は None（ページごとの検出を使う）
+        """
+        if self.page_count < 2:
+            return None
+        return {
+            "header": self._header_region(),
+            "footer": self._footer_region()
+        }
+
+
+def header_footer_thresholds(
+    page_height: float,
+    header_threshold_percent: float,
+    footer_threshold_percent: float,
+    regions: Optional[Dict[str, Optional[Dict[str, Any]]]] = None
+) -> Tuple[float, float]:
+    """
+    ヘッダー・フッターとみなすY座標の境界を返す
+
+    regions（HeaderFooterLearner.regions）がある場合は、指定割合の帯とドキュメント共通の領域の
+    狭い方を使う。領域が見つからなかった側はヘッダー・フッターなしとする。
+    regions が None の場合は指定割合の帯をそのまま使う。
+
+    Returns:
+        (header_threshold, footer_threshold): 上端がこれより上のブロックがヘッダー、下のブロックがフッター
+    """
+    header_threshold = page_height * header_threshold_percent
+    footer_threshold = page_height * (1 - footer_threshold_percent)
+    if regions is None:
+        return header_threshold, footer_threshold
+
+    header = regions.get("header")
+    footer = regions.get("footer")
+    header_threshold = min(header_threshold, header["y_end"]) if header else 0
+    footer_threshold = max(footer_threshold, footer["y_start"]) if footer else float('inf')
+    return header_threshold, footer_threshold
@@ -0,0 +1,887 @@
+"""レイアウト解析付きページテキスト抽出モジュール"""
+
+import re
+import logging
+import fitz
+from typing import List, Dict, Optional, Tuple
+from .line_builder import group_words_into_lines
+from .text_page import get_text_context
+from .geometry import BlockGeometry
+from .header_footer_model import header_footer_thresholds
+from .page_model import Block, Line, Span, as_blocks
+from .reading_order import READING_ORDER_XY_CUT, READING_ORDER_HEURISTIC, xy_cut
+
+logger = logging.getLogger(__name__)
+
+
+def detect_page_regions(page, words=None):
+    """
+    文字座標から動的にヘッダー・フッター・カラム領域を認識
+    
+    Args:
+        words: page.get_text("words") の戻り値（省略時はページから取得）
+    
+    Returns:
+        dict: {
+            'header_boundary': Y座標の境界,
+            'footer_boundary': Y座標の境界,
+            'column_boundaries': [X座標の境界リスト],
+            'main_content_bounds': (x0, y0, x1, y1)
+        }
+    """
+    # 全てのワードを取得（呼び出し元で取得済みの場合はそれを使う）
+    if words is None:
+        words = page.get_text("words")
+    if not words:
+        return {
+            'header_boundary': 0,
+            'footer_boundary': page.rect.height,
+            'column_boundaries': [],
+            'main_content_bounds': (0, 0, page.rect.width, page.rect.height)
+        }
+    
+    # 右下と左上の文字を探す
+    rightmost_bottom_y = float('inf')
+    leftmost_top_y = 0
+    
+    # ページの10%マージンを考慮
+    page_margin_x = page.rect.width * 0.1
+    page_margin_y = page.rect.height * 0.1
+    
+    for word in words:
+        x0, y0, x1, y1, text, block_no, line_no, word_no = word
+        
+        # 右下の文字（右端かつ上部）を探す
+        if x1 > page.rect.width - page_margin_x and y0 < page_margin_y:
+            rightmost_bottom_y = min(rightmost_bottom_y, y1)
+        
+        # 左上の文字（左端かつ下部）を探す
+        if x0 < page_margin_x and y1 > page.rect.height - page_margin_y:
+            leftmost_top_y = max(leftmost_top_y, y0)
+    
+    # ヘッダー境界：右下の文字のY座標より下
+    header_boundary = rightmost_bottom_y if rightmost_bottom_y < float('inf') else page.rect.height * 0.1
+    
+    # フッター境界：左上の文字のY座標より上
+    footer_boundary = leftmost_top_y if leftmost_top_y > 0 else page.rect.height * 0.9
+    
+    # メインコンテンツ領域内のワードのみを使用してカラム境界を検出
+    main_words = []
+    for word in words:
+        x0, y0, x1, y1, text, block_no, line_no, word_no = word
+        if header_boundary < y0 < footer_boundary:
+            main_words.append(word)
+    
+    # X座標の分布からカラム領域を検出（座標範囲として）
+    column_regions = detect_column_boundaries_from_words(main_words, page.rect.width)
+    
+    # デバッグ出力
+    if page.number + 1 == 3:
+        logger.info(f"[領域検出] ページ3:")
+        logger.info(f"  ヘッダー境界: Y={header_boundary:.1f}")
+        logger.info(f"  フッター境界: Y={footer_boundary:.1f}")
+        logger.info(f"  カラム数: {len(column_regions)}")
+        for i, (start, end) in enumerate(column_regions):
+            logger.info(f"  カラム{i+1}領域: X={start:.1f}-{end:.1f}")
+    
+    return {
+        'header_boundary': header_boundary,
+        'footer_boundary': footer_boundary,
+        'column_regions': column_regions,  # [(x_start, x_end), ...]の形式
+        'main_content_bounds': (0, header_boundary, page.rect.width, footer_boundary)
+    }
+
+def detect_column_boundaries_from_words(words, page_width):
+    """ワードのX座標分布からカラム境界を検出し、各カラムの実際の座標範囲を返す"""
+    if not words:
+        return []
+    
+    # X座標の分布を分析（左端のみ）
+    x_starts = []
+    for word in words:
+        x0, y0, x1, y1, text, block_no, line_no, word_no = word
+        x_starts.append(x0)
+    
+    x_starts.sort()
+    
+    # X座標のヒストグラムを作成して、クラスタを検出
+    # 20ピクセル単位でビンを作成
+    bin_size = 20
+    bins = {}
+    
+    for x in x_starts:
+        bin_idx = int(x / bin_size)
+        if bin_idx not in bins:
+            bins[bin_idx] = 0
+        bins[bin_idx] += 1
+    
+    # クラスタの境界を検出
+    clusters = []
+    current_cluster_start = None
+    prev_bin = -1
+    
+    for bin_idx in sorted(bins.keys()):
+        if current_cluster_start is None:
+            current_cluster_start = bin_idx * bin_size
+        elif bin_idx - prev_bin > 3:  # 3ビン以上の空白があれば新しいクラスタ
+            clusters.append((current_cluster_start, prev_bin * bin_size + bin_size))
+            current_cluster_start = bin_idx * bin_size
+        prev_bin = bin_idx
+    
+    if current_cluster_start is not None:
+        clusters.append((current_cluster_start, prev_bin * bin_size + bin_size))
+    
+    # カラム領域を定義（各クラスタの実際の座標範囲）
+    column_regions = []
+    for cluster in clusters:
+        # このクラスタに属するワードの実際の範囲を取得
+        cluster_words = []
+        for word in words:
+            x0, y0, x1, y1, text, block_no, line_no, word_no = word
+            if cluster[0] <= x0 <= cluster[1]:
+                cluster_words.append(word)
+        
+        if cluster_words:
+            min_x = min(w[0] for w in cluster_words)
+            max_x = max(w[2] for w in cluster_words)
+            column_regions.append((min_x, max_x))
+    
+    # デバッグ出力
+    logger.info(f"[カラム領域検出] クラスタ数: {len(column_regions)}")
+    for i, (start, end) in enumerate(column_regions):
+        logger.info(f"  カラム{i+1}: X={start:.1f}-{end:.1f} (幅={end-start:.1f})")
+    
+    return column_regions
+
+def build_text_blocks(page, text_page=None):
+    """
+    ページのワードを行・ブロックにまとめる（レイアウト抽出の解析段階）
+    
+    ワードがない場合は get_text("dict") のテキストブロックを使う。
+    
+    Args:
+        text_page: ページの PageTextContext（省略時はこのページ用に作成）
+    
+    Returns:
+        List[Block]: テキストブロックのリスト
+    """
+    text_page = get_text_context(page, text_page)
+    words = text_page.words
+    
+    # ページ1と3でデバッグ
+    if page.number + 1 in [1, 3]:
+        logger.info(f"[get_text_words] ページ{page.number + 1}: ワード数={len(words)}")
+        # 最初の30ワードを表示
+        for i, word in enumerate(words[:30]):
+            x0, y0, x1, y1, text, block_no, line_no, word_no = word
+            logger.info(f"  ワード{i}: '{text}' X={x0:.1f}-{x1:.1f}, Y={y0:.1f}, block={block_no}, line={line_no}")
+        
+        # 「0」や「|」などの特殊文字を探す
+        for i, word in enumerate(words):
+            x0, y0, x1, y1, text, block_no, line_no, word_no = word
+            if text in ["0", "|", "1", "2", "3"] and len(text) == 1:
+                logger.info(f"  特殊文字発見: '{text}' at X={x0:.1f}, Y={y0:.1f}")
+    
+    # Y座標でグループ化して行を作成（X座標の大きなギャップも考慮）
+    lines_dict = group_words_into_lines(words, tolerance=3, x_gap_threshold=50)
+
+    # ページ3でのみ行の分離結果をデバッグ
+    if page.number + 1 == 3:
+        logger.info(f"[行分離後] ページ3: 行数={len(lines_dict)}")
+        for line_key, words_in_line in sorted(lines_dict.items(), key=lambda item: item[0][0])[:10]:
+            line_y, line_x_range = line_key
+            logger.info(f"  行 Y={line_y:.1f}: {len(words_in_line)}ワード, X範囲={min(w['x0'] for w in words_in_line):.1f}-{max(w['x1'] for w in words_in_line):.1f}")
+            for w in words_in_line:
+                logger.info(f"    '{w['text']}'")
+    
+    # 行をブロックにグループ化（各行内の単語をX座標でグループ化）
+    block_id = 0
+    x_gap_threshold = 20  # 同じ行内でのX座標の最大ギャップ（より厳密に）
+    y_gap_threshold = 20  # 行間の最大許容ギャップ
+    
+    # 全ての行を処理して、各行内でX座標が離れているワードを別ブロックに分ける
+    all_line_segments = []
+    
+    for line_key, words_in_line in lines_dict.items():
+        line_y, line_x_range = line_key
+        
+        # この行のワードをX座標でソート
+        sorted_words = sorted(words_in_line, key=lambda w: w["x0"])
+        
+        # 1ワードだけの場合はそのまま追加
+        if len(sorted_words) == 1:
+            all_line_segments.append({
+                "y": line_y,
+                "words": sorted_words,
+                "x_start": sorted_words[0]["x0"],
+                "x_end": sorted_words[0]["x1"]
+            })
+            continue
+        
+        # X座標のギャップで分割
+        current_segment = [sorted_words[0]]
+        
+        for i in range(1, len(sorted_words)):
+            prev_word = sorted_words[i-1]
+            curr_word = sorted_words[i]
+            
+            # 前のワードとの距離をチェック
+            x_distance = curr_word["x0"] - prev_word["x1"]
+            
+            # ページ3でのみデバッグ
+            if page.number + 1 == 3 and line_y == 111.6:
+                logger.info(f"    ギャップチェック: '{prev_word['text']}' ({prev_word['x1']:.1f}) -> '{curr_word['text']}' ({curr_word['x0']:.1f}), 距離={x_distance:.1f}")
+            
+            if x_distance > x_gap_threshold:
+                # 新しいセグメントを開始
+                all_line_segments.append({
+                    "y": line_y,
+                    "words": current_segment,
+                    "x_start": min(w["x0"] for w in current_segment),
+                    "x_end": max(w["x1"] for w in current_segment)
+                })
+                current_segment = [curr_word]
+            else:
+                # 同じセグメントに追加
+                current_segment.append(curr_word)
+        
+        # 最後のセグメントを追加
+        if current_segment:
+            all_line_segments.append({
+                "y": line_y,
+                "words": current_segment,
+                "x_start": min(w["x0"] for w in current_segment),
+                "x_end": max(w["x1"] for w in current_segment)
+            })
+    
+    # Y座標でソート
+    all_line_segments.sort(key=lambda seg: seg["y"])
+
+    # ページ3でのみセグメント分割結果をデバッグ
+    if page.number + 1 == 3:
+        logger.info(f"[セグメント分割後] ページ3: セグメント数={len(all_line_segments)}")
+        for i, seg in enumerate(all_line_segments[:15]):
+            logger.info(f"  セグメント{i}: Y={seg['y']:.1f}, X範囲={seg['x_start']:.1f}-{seg['x_end']:.1f}")
+            logger.info(f"    テキスト: '{' '.join(w['text'] for w in seg['words'])}')")
+    
+    # セグメントをブロックにグループ化
+    x_tolerance = 30  # ブロック間のX座標の許容誤差
+    block_segments = []
+    
+    for segment in all_line_segments:
+        if block_segments:
+            current_segments = block_segments[-1]
+            # 前の行との距離をチェック
+            y_gap = segment["y"] - current_segments[-1]["y"]
+            
+            # X座標が近く、Y座標のギャップが小さい場合は同じブロック
+            if abs(segment["x_start"] - current_segments[0]["x_start"]) < x_tolerance and y_gap < y_gap_threshold:
+                current_segments.append(segment)
+                continue
+        
+        # 新しいブロックを開始
+        block_segments.append([segment])
+    
+    text_blocks = [_segments_to_block(segments) for segments in block_segments]
+    
+    if not text_blocks:
+        # フォールバック: 従来のdict方式
+        text_blocks = text_page.blocks
+    
+    return text_blocks
+
+
+def _segments_to_block(segments):
+    """同じブロックにまとめた行セグメントから Block を作成する（1行を1スパンにする）"""
+    lines = []
+    line_texts = []
+    for segment in segments:
+        words = segment["words"]
+        line_text = " ".join(w["text"] for w in words)
+        line_bbox = (
+            min(w["x0"] for w in words),
+            segment["y"],
+            max(w["x1"] for w in words),
+            max(w["y1"] for w in words)
+        )
+        lines.append(Line([Span(line_text, line_bbox)], line_bbox))
+        line_texts.append(line_text)
+    
+    bbox = (
+        segments[0]["x_start"],
+        segments[0]["y"],
+        max(segment["x_end"] for segment in segments),
+        max(line.bbox[3] for line in lines)
+    )
+    return Block(bbox, lines, "\n".join(line_texts))
+
+def assemble_layout_text(page, text_blocks, regions, reading_order=READING_ORDER_HEURISTIC):
+    """
+    ヘッダー/フッターを除外済みのブロックからページのテキストを組み立てる（レイアウト抽出の組み立て段階）
+    
+    目次のようなレイアウトは目次エントリとして、それ以外は detect_page_regions のカラム領域
+    （単一カラムの場合はページ中央での左右分割）の順にブロックを並べる。
+    reading_order が "xycut" の場合は、再帰的XYカットの読み順で並べる（regions は使わない）。
+    
+    Args:
+        text_blocks: テキストブロックのリスト（空でないこと）
+        regions: detect_page_regions の戻り値（reading_order が "xycut" の場合は None でよい）
+        reading_order: 読み順の決定方法（"heuristic" または "xycut"）
+    
+    Returns:
+        Tuple[str, List[Dict], int]: (テキスト, ブロック情報, カラム数)
+    """
+    text_parts = []
+    block_infos = []
+    
+    # まず目次のようなレイアウトかチェック
+    toc_entries = detect_toc_layout(text_blocks, page)
+
+    if toc_entries:
+        # 目次レイアウトとして処理
+        for entry in toc_entries:
+            text = entry["full_text"]
+            info = {
+                "bbox": entry["bbox"],
+                "font_size": entry.get("font_size", 12),
+                "is_toc": True
+            }
+            text_parts.append(text)
+            block_infos.append(info)
+    elif reading_order == READING_ORDER_XY_CUT:
+        # 再帰的XYカットの読み順でテキストを結合
+        tree = xy_cut(text_blocks)
+        for index in tree.order():
+            text, info = process_block(text_blocks[index])
+            if text:
+                text_parts.append(text)
+                block_infos.append(info)
+        return "\n".join(text_parts), block_infos, tree.column_count()
+    else:
+        # 通常のカラム処理：動的に検出された領域を使用
+        if len(regions['column_regions']) >= 2:  # 複数カラムが検出された場合
+            # カラム領域に基づいてブロックを分類
+            # 中心がカラム領域内にあるカラム（どのカラムにも属さない場合は最も近いカラム）に割り当て、
+            # 各カラム内でY座標でソート
+            geometry = BlockGeometry(text_blocks)
+            labels = geometry.center_columns(regions['column_regions'])
+            columns_blocks = [
+                geometry.take(indices)
+                for indices in geometry.group_by_label(labels, len(regions['column_regions']))
+            ]
+        
+            # デバッグ
+            if page.number + 1 == 3:
+                logger.info(f"[カラム処理] ページ3: {len(regions['column_regions'])}カラム検出")
+                for i, col_blocks in enumerate(columns_blocks):
+                    if col_blocks:
+                        col_start, col_end = regions['column_regions'][i]
+                        logger.info(f"  カラム{i+1} (X={col_start:.1f}-{col_end:.1f}): {len(col_blocks)}ブロック")
+                        for j, block in enumerate(col_blocks[:3]):
+                            text = (block.text or "").replace('\n', ' ')[:30]
+                            logger.info(f"    {j}: '{text}...'")
+        
+            # 左から右の順序でテキストを結合
+            for col_blocks in columns_blocks:
+                for block in col_blocks:
+                    text, info = process_block(block)
+                    if text:
+                        text_parts.append(text)
+                        block_infos.append(info)
+        else:
+            # シンプルな左右分割（動的検出で単一カラムの場合）
+            page_width = max(block.bbox[2] for block in text_blocks)
+            page_center = page_width / 2
+        
+            # ブロックを左右に分類（より正確な判定）
+            left_blocks = []
+            right_blocks = []
+        
+            for block in text_blocks:
+                # ブロックの左端と右端を取得
+                block_left = block.bbox[0]
+                block_right = block.bbox[2]
+            
+                # ブロックの実際の幅を考慮した判定
+                # ブロックの中心がページ中央より左か右かで判定
+                block_center = (block_left + block_right) / 2
+            
+                # ただし、ブロックがページ中央を跨いでいる場合は
+                # より多くの部分がある側に分類
+                if block_left < page_center and block_right > page_center:
+                    # ページ中央を跨いでいる場合
+                    left_part = page_center - block_left
+                    right_part = block_right - page_center
+                
+                    if left_part > right_part:
+                        left_blocks.append(block)
+                    else:
+                        right_blocks.append(block)
+                elif block_right <= page_center:
+                    # 完全に左側
+                    left_blocks.append(block)
+                else:
+                    # 完全に右側
+                    right_blocks.append(block)
+        
+            # 各カラム内でY座標でソート
+            left_blocks = sorted(left_blocks, key=lambda b: b.bbox[1])
+            right_blocks = sorted(right_blocks, key=lambda b: b.bbox[1])
+    
+            # デバッグ
+            if page.number + 1 == 3:
+                logger.info(f"  シンプルカラム処理: 左={len(left_blocks)}ブロック, 右={len(right_blocks)}ブロック")
+                logger.info(f"  ページ中央: X={page_center:.1f}")
+            
+                # 最初の数ブロックの詳細を表示
+                logger.info("  左カラムのブロック:")
+                for i, block in enumerate(left_blocks[:5]):
+                    text = (block.text or "").replace('\n', ' ')[:30]
+                    logger.info(f"    {i}: X={block.bbox[0]:.1f}-{block.bbox[2]:.1f}, Y={block.bbox[1]:.1f}, '{text}...'")
+            
+                logger.info("  右カラムのブロック:")
+                for i, block in enumerate(right_blocks[:5]):
+                    text = (block.text or "").replace('\n', ' ')[:30]
+                    logger.info(f"    {i}: X={block.bbox[0]:.1f}-{block.bbox[2]:.1f}, Y={block.bbox[1]:.1f}, '{text}...'")
+        
+            # 左カラムを処理
+            for block in left_blocks:
+                text, info = process_block(block)
+                if text:
+                    text_parts.append(text)
+                    block_infos.append(info)
+        
+            # 右カラムを処理
+            for block in right_blocks:
+                text, info = process_block(block)
+                if text:
+                    text_parts.append(text)
+                    block_infos.append(info)
+    
+    return "\n".join(text_parts), block_infos, 2
+
+def extract_with_layout(page, pre_filtered_blocks=None, text_page=None):
+    """
+    レイアウト情報を保持してテキストを抽出（マルチカラム対応）
+    複数の方法を組み合わせて、すべてのテキストを確実に取得
+    
+    Args:
+        page: PyMuPDFのページオブジェクト
+        pre_filtered_blocks: ヘッダー/フッターが除外されたブロックのリスト（オプション）
+        text_page: ページの PageTextContext（省略時はこのページ用に作成）
+    """
+    text_page = get_text_context(page, text_page)
+    
+    # 動的に領域を検出
+    regions = detect_page_regions(page, text_page.words)
+    
+    # pre_filtered_blocksが提供されている場合はそれを使用
+    if pre_filtered_blocks is not None:
+        # デバッグ
+        if page.number + 1 == 3:
+            logger.info(f"[extract_with_layout] ページ3: フィルタリング済みブロック数={len(pre_filtered_blocks)}")
+        
+        if not pre_filtered_blocks:
+            return "", [], 1, []
+        pre_filtered_blocks = as_blocks(pre_filtered_blocks)
+        
+        text, block_infos, column_count = assemble_layout_text(page, pre_filtered_blocks, regions)
+        return text, block_infos, column_count, pre_filtered_blocks
+    
+    text_blocks = build_text_blocks(page, text_page)
+    if not text_blocks:
+        return "", [], 1, []
+    
+    # デバッグ: カラム検出前の状態を確認
+    if page.number + 1 == 3:  # ページ3でのみデバッグ
+        logger.info(f"[カラム検出デバッグ] ページ3: ブロック数={len(text_blocks)}")
+        for i, block in enumerate(text_blocks):  # 全ブロック
+            text_preview = block.text.replace('\n', ' ')[:50]
+            logger.info(f"  ブロック{i}: X={block.bbox[0]:.1f}-{block.bbox[2]:.1f}, Y={block.bbox[1]:.1f}, テキスト='{text_preview}...'")
+    
+    # カラムを検出
+    columns = detect_columns_with_blocks(text_blocks, page)
+    column_count = len(columns)
+    
+    # デバッグ: カラム検出結果
+    if page.number + 1 == 3:
+        logger.info(f"  検出されたカラム数: {column_count}")
+        for i, col in enumerate(columns):
+            logger.info(f"    カラム{i}: {len(col)}ブロック")
+            if col:
+                logger.info(f"      X範囲: {min(b.bbox[0] for b in col):.1f} - {max(b.bbox[2] for b in col):.1f}")
+    
+    text_parts = []
+    block_infos = []
+    
+    if column_count > 1:
+        # マルチカラムの場合：カラムごとに処理
+        if page.number + 1 == 3:  # デバッグ
+            logger.info(f"  マルチカラム処理: {column_count}カラム")
+        
+        # 中央のヘッダーやタイトルを特定
+        page_width = max(block.bbox[2] for block in text_blocks)
+        page_center = page_width / 2
+        
+        header_blocks = []
+        column_blocks = [[] for _ in range(column_count)]
+        
+        # 各ブロックを適切なカラムまたはヘッダーに分類
+        for block in text_blocks:
+            x_start = block.bbox[0]
+            x_end = block.bbox[2]
+            block_center = (x_start + x_end) / 2
+            block_width = x_end - x_start
+            
+            # 中央揃えのブロック（ヘッダー）を判定
+            is_centered = abs(block_center - page_center) < 30 and block_width < page_width * 0.5
+            
+            # テキスト内容から判定
+            text = (block.text or "").strip()
+            is_title_like = len(text) < 20 and not any(char in text for char in ["。", "、"]) and block.bbox[1] < 100
+            
+            if is_centered or is_title_like:
+                header_blocks.append(block)
+            else:
+                # 最も近いカラムに割り当て
+                best_col = 0
+                min_distance = float('inf')
+                
+                for col_idx, col in enumerate(columns):
+                    # カラムの中心X座標を計算
+                    col_x_center = sum(b.bbox[0] for b in col) / len(col) if col else 0
+                    distance = abs(block_center - col_x_center)
+                    
+                    if distance < min_distance:
+                        min_distance = distance
+                        best_col = col_idx
+                
+                # X座標が明確に左右に分かれている場合のみカラムに追加
+                if col_idx == 0 and x_end < 200:  # 左カラム
+                    column_blocks[0].append(block)
+                elif col_idx == 1 and x_start > 200:  # 右カラム
+                    column_blocks[1].append(block)
+        
+        # ヘッダーを最初に出力
+        for header in sorted(header_blocks, key=lambda b: b.bbox[1]):
+            text, info = process_block(header)
+            if text:
+                text_parts.append(text)
+                block_infos.append(info)
+        
+        # 各カラムのテキストを処理
+        for col_idx, col_blocks in enumerate(column_blocks):
+            # 各カラム内でY座標でソート
+            col_blocks_sorted = sorted(col_blocks, key=lambda b: b.bbox[1])
+            
+            if page.number + 1 == 3:  # デバッグ
+                logger.info(f"    カラム{col_idx}: {len(col_blocks_sorted)}ブロック")
+                # 最初と最後のブロックを表示
+                if col_blocks_sorted:
+                    first_text = col_blocks_sorted[0].text.replace('\n', ' ')[:30] if col_blocks_sorted else ""
+                    last_text = col_blocks_sorted[-1].text.replace('\n', ' ')[:30] if col_blocks_sorted else ""
+                    logger.info(f"      最初: '{first_text}...'")
+                    logger.info(f"      最後: '{last_text}...'")
+            
+            for block in col_blocks_sorted:
+                text, info = process_block(block)
+                if text:
+                    text_parts.append(text)
+                    block_infos.append(info)
+    else:
+        # シングルカラムの場合：通常通りY座標でソート
+        sorted_blocks = sorted(text_blocks, key=lambda b: b.bbox[1])
+        
+        for block in sorted_blocks:
+            text, info = process_block(block)
+            if text:
+                text_parts.append(text)
+                block_infos.append(info)
+    
+    # text_blocksも返すように変更（フッター検出で使用するため）
+    return "\n".join(text_parts), block_infos, column_count, text_blocks
+
+def process_block(block):
+    """
+    単一ブロックを処理してテキストと情報を抽出
+    """
+    block_text = []
+    
+    for line in block.lines:
+        block_text.append("".join(span.text for span in line.spans))
+    
+    block_full_text = "\n".join(block_text)
+    
+    # ブロック情報を作成
+    block_info = {
+        "bbox": block.bbox,
+        "text": block_full_text,
+        "font_size": get_average_font_size(block),
+        "is_bold": is_bold_block(block)
+    }
+    
+    return block_full_text, block_info
+
+def detect_columns_with_blocks(blocks, page=None):
+    """
+    テキストブロックからカラムを検出してグループ化
+    PyMuPDFのベストプラクティスを参考に実装
+    """
+    if not blocks:
+        return []
+    blocks = as_blocks(blocks)
+    
+    # ページ3のデバッグ
+    is_page_3 = page and page.number + 1 == 3
+    
+    # ページの幅を取得
+    page_width = page.rect.width if page else max(b.bbox[2] for b in blocks)
+    
+    # ブロックをY座標でソート（上から下へ）
+    geometry = BlockGeometry(blocks)
+    order = geometry.yx_order()
+    sorted_blocks = geometry.take(order.tolist())
+    
+    # X座標の分布を分析してカラムの境界を検出
+    x_positions = sorted(x for block in blocks for x in (block.bbox[0], block.bbox[2]))  # 左端・右端
+    
+    # X座標のギャップを分析
+    gaps = []
+    min_gap_threshold = page_width * 0.03  # ページ幅の3%以上のギャップを検討
+    
+    i = 0
+    while i < len(x_positions) - 1:
+        gap = x_positions[i + 1] - x_positions[i]
+        if gap > min_gap_threshold:
+            # 連続する同じようなギャップをマージ
+            gap_start = x_positions[i]
+            gap_end = x_positions[i + 1]
+            j = i + 1
+            while j < len(x_positions) - 1 and x_positions[j + 1] - x_positions[j] < min_gap_threshold:
+                j += 1
+            if j > i + 1:
+                gap_end = x_positions[j]
+            gaps.append((gap_start, gap_end, gap_end - gap_start))
+            i = j
+        else:
+            i += 1
+    
+    # デバッグ
+    if is_page_3:
+        logger.info(f"[カラム境界検出] ページ3: 検出されたギャップ数={len(gaps)}")
+        for idx, (start, end, size) in enumerate(gaps[:5]):
+            logger.info(f"  ギャップ{idx}: {start:.1f}-{end:.1f} (幅={size:.1f})")
+    
+    # 最も大きなギャップをカラムの境界とする
+    column_boundaries = [0]  # 左端
+    if gaps:
+        # ギャップをサイズでソート
+        gaps.sort(key=lambda g: g[2], reverse=True)
+        
+        # 大きなギャップから境界を選択（最大3カラムまで）
+        selected_gaps = []
+        for gap in gaps:
+            # 既に選択したギャップと重ならないかチェック
+            overlap = False
+            for selected in selected_gaps:
+                if not (gap[1] < selected[0] or gap[0] > selected[1]):
+                    overlap = True
+                    break
+            if not overlap:
+                selected_gaps.append(gap)
+                if len(selected_gaps) >= 2:  # 最大3カラム
+                    break
+        
+        # 境界を追加
+        for gap in selected_gaps:
+            boundary = (gap[0] + gap[1]) / 2
+            column_boundaries.append(boundary)
+    
+    column_boundaries.append(page_width)  # 右端
+    column_boundaries.sort()
+    
+    # デバッグ
+    if is_page_3:
+        logger.info(f"[カラム境界] ページ3: 境界={[f'{b:.1f}' for b in column_boundaries]}")
+    
+    # ブロックの中心X座標でカラムに割り当て（割り当てられなかった場合は最も近いカラム）。
+    # 各カラム内は sorted_blocks と同じ上から下の順になる
+    labels = geometry.boundary_columns(column_boundaries)
+    columns = [geometry.take(indices) for indices in geometry.group_by_label(labels, len(column_boundaries) - 1, order)]
+    
+    # 空のカラムを削除
+    columns = [col for col in columns if col]
+    
+    # 単一カラムの場合、または有効なカラムが見つからない場合
+    if len(columns) <= 1:
+        return [sorted_blocks]
+    
+    # デバッグ：ページ3のカラム検出結果
+    if is_page_3:
+        logger.info(f"[カラム検出結果] ページ3: {len(columns)}カラム検出")
+        for idx, col in enumerate(columns):
+            if col:
+                x_range = f"{min(b.bbox[0] for b in col):.1f}-{max(b.bbox[2] for b in col):.1f}"
+                logger.info(f"  カラム{idx}: {len(col)}ブロック, X範囲={x_range}")
+                # 最初の3ブロックのテキストを表示
+                for i, block in enumerate(col[:3]):
+                    text = (block.text or "").replace('\n', ' ')[:40]
+                    logger.info(f"    ブロック{i}: '{text}...'")
+    
+    return columns
+
+def detect_toc_layout(blocks, page):
+    """目次のようなレイアウトを検出"""
+    if not blocks or not page:
+        return []
+    
+    page_width = page.rect.width
+    toc_entries = []
+    y_tolerance = 3  # Y座標の許容誤差
+    
+    # ブロックをY座標でグループ化
+    lines = {}
+    for block in blocks:
+        y = block.bbox[1]
+        # 既存の行に属するかチェック
+        added = False
+        for line_y in list(lines.keys()):
+            if abs(y - line_y) < y_tolerance:
+                lines[line_y].append(block)
+                added = True
+                break
+        if not added:
+            lines[y] = [block]
+    
+    # 各行を分析
+    for y, line_blocks in lines.items():
+        if len(line_blocks) < 2:
+            continue
+        
+        # X座標でソート
+        line_blocks.sort(key=lambda b: b.bbox[0])
+        
+        # 最後のブロックがページ番号パターンかチェック
+        last_block = line_blocks[-1]
+        last_text = (last_block.text or "").strip()
+        
+        # ページ番号パターン（数字、ローマ数字、A-1形式など）
+        if re.match(r'^(\d+|[ivxIVX]+|[A-Z]\d+|[A-Z]-\d+)$', last_text):
+            # 最初と最後のブロック間の距離を計算
+            gap = last_block.bbox[0] - line_blocks[0].bbox[2]
+            
+            # ページ幅の10%以上のギャップがある場合は目次エントリ
+            if gap > page_width * 0.1:
+                # 最後以外のブロックを結合してタイトルとする
+                title_blocks = line_blocks[:-1]
+                title = " ".join((b.text or "").strip() for b in title_blocks)
+                
+                # ドットリーダーは一旦無視（除去しない）
+                # title = re.sub(r'[\.\·\…\-]+\s*$', '', title).strip()
+                
+                toc_entries.append({
+                    "title": title,
+                    "page": last_text,
+                    "full_text": f"{title} {last_text}",
+                    "bbox": [
+                        min(b.bbox[0] for b in line_blocks),
+                        y,
+                        max(b.bbox[2] for b in line_blocks),
+                        max(b.bbox[3] for b in line_blocks)
+                    ],
+                    "gap": gap
+                })
+    
+    # デバッグ出力
+    if page.number + 1 == 3 and toc_entries:
+        logger.info(f"[TOC検出] ページ3: {len(toc_entries)}個の目次エントリを検出")
+        for i, entry in enumerate(toc_entries[:5]):
+            logger.info(f"  エントリ{i}: '{entry['title']}' -> {entry['page']} (ギャップ={entry['gap']:.1f})")
+    
+    # 目次エントリが3つ以上ある場合のみ目次として認識
+    return toc_entries if len(toc_entries) >= 3 else []
+
+def get_average_font_size(block):
+    """ブロックの平均フォントサイズを取得"""
+    sizes = []
+    for line in block.lines:
+        for span in line.spans:
+            sizes.append(12 if span.size is None else span.size)
+    return sum(sizes) / len(sizes) if sizes else 12
+
+def is_bold_block(block):
+    """ブロックが太字かどうかを判定"""
+    for line in block.lines:
+        for span in line.spans:
+            if "bold" in span.font.lower():
+                return True
+    return False
+
+def detect_header_footer(page: fitz.Page, blocks: List[Block], 
+                        header_threshold_percent: float = 0.1, 
+                        footer_threshold_percent: float = 0.1,
+                        regions: Optional[Dict] = None) -> Tuple[bool, bool, Optional[str], Optional[str]]:
+    """
+    ページのヘッダーとフッターを検出する
+    Y座標とパターンマッチングを使用
+    
+    regions（HeaderFooterLearner.regions）を指定した場合は、ドキュメント共通の領域で判定する
+    """
+    if not blocks:
+        return False, False, None, None
+    blocks = as_blocks(blocks)
+    
+    page_height = page.rect.height
+    has_header = False
+    has_footer = False
+    header_text = None
+    footer_text = None
+    
+    # ヘッダー候補：ページ上部の指定割合
+    # フッター候補：ページ下部の指定割合（Y座標で(1-footer_threshold_percent)以降）
+    header_threshold, footer_threshold = header_footer_thresholds(
+        page_height, header_threshold_percent, footer_threshold_percent, regions
+    )
+    
+    # ヘッダー検出
+    for block in blocks:
+        if block.bbox[1] < header_threshold:
+            has_header = True
+            if header_text is None:
+                header_text = block.text.strip()
+            if page.number + 1 == 3:  # ページ3のみログ
+                logger.info(f"  ヘッダー検出: Y座標 = {block.bbox[1]:.1f}, テキスト = '{block.text.strip()}'")
+    
+    # フッター検出（Y座標が大きい順にソートして最下部を優先）
+    footer_candidates = []
+    for block in blocks:
+        if block.bbox[1] > footer_threshold:
+            footer_candidates.append(block)
+            if page.number + 1 == 3:  # ページ3のみログ
+                logger.info(f"  フッター候補: Y座標 = {block.bbox[1]:.1f}, テキスト = '{block.text.strip()}'")
+    
+    if footer_candidates:
+        has_footer = True
+        # Y座標が最も大きい（最下部の）ブロックを選択
+        footer_candidates.sort(key=lambda b: b.bbox[1], reverse=True)
+        footer_block = footer_candidates[0]
+        footer_text = footer_block.text.strip()
+        
+        # ページ番号パターンを優先
+        for block in footer_candidates:
+            text = block.text.strip()
+            # 単純な数字のみのパターンをページ番号として優先
+            if re.match(r'^-?\s*\d+\s*-?$', text):
+                footer_text = text
+                if page.number + 1 == 3:
+                    logger.info(f"  フッターとして選択（ページ番号）: Y座標 = {block.bbox[1]:.1f}, テキスト = '{text}'")
+                break
+        else:
+            # ページ番号が見つからない場合は最下部のテキストを使用
+            if page.number + 1 == 3:
+                logger.info(f"  フッターとして選択（最下部）: Y座標 = {footer_block.bbox[1]:.1f}, テキスト = '{footer_text}'")
+    
+    if page.number + 1 == 3:
+        logger.info(f"  検出結果: ヘッダー = {has_header}, フッター = {has_footer}")
+    
+    return has_header, has_footer, header_text, footer_text
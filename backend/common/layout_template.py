@@ -0,0 +1,165 @@
+"""ページのレイアウトテンプレート（余白・カラム領域）のキャッシュ
+
+同じ版面のページが続くドキュメントでは、ページごとに余白とカラム領域を検出し直しても
+同じ結果になることが多い。ここではページの幾何シグネチャ（メインブロックが占有する
+整数X座標の区間の和集合と、余白検出の対象範囲）をキーに、検出した余白とカラム領域の
+X方向の値をテンプレートとして保持し、同じシグネチャのページでは再利用する。
+
+余白検出が見るのはこの整数の占有区間だけなので、シグネチャが一致すれば余白は必ず同じになる。
+カラム領域はブロックの左右端（小数）も使うため、テンプレートに保存した左右端と一致するかを
+確認し、一致しない場合は通常の検出を行う。Y方向の値（ヘッダー・フッター境界）はページごとに
+埋めるため、再利用しても結果は通常の検出と同じになり、処理するページの順番にも依存しない。
+
+キャッシュはプロセスごとに持つ。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .column_detector import calculate_columns_from_gaps
+from .gap_detector import detect_vertical_gaps, occupied_x_intervals
+from .page_model import Block, as_blocks
+
+# 1プロセスあたりに保持するテンプレート数
+LAYOUT_TEMPLATE_CACHE_SIZE = 256
+
+Signature = Tuple[int, int, Tuple[Tuple[int, int], ...]]
+
+
+def geometry_signature(blocks: List[Block]) -> Optional[Tuple[Signature, float, float]]:
+    """
+    ページの幾何シグネチャを計算する
+
+    Args:
+        blocks: メインコンテンツ領域の Block のリスト
+
+    Returns:
+        (signature, min_x, max_x): シグネチャ（余白検出の対象範囲と占有区間の和集合）と
+        ブロックの左右端。ブロックがない場合は None
+    """
+    if not blocks:
+        return None
+    min_x = min(b.bbox[0] for b in blocks)
+    max_x = max(b.bbox[2] for b in blocks)
+    scan_start, scan_end, occupied = occupied_x_intervals(blocks, min_x, max_x)
+
+    # 重なる区間・隣接する区間をまとめる（余白の計算結果は変わらない）
+    merged = []
+    for left, right in occupied:
+        if merged and left <= merged[-1][1] + 1:
+            if right > merged[-1][1]:
+                merged[-1] = (merged[-1][0], right)
+        else:
+            merged.append((left, right))
+    return (scan_start, scan_end, tuple(merged)), min_x, max_x
+
+
+class LayoutTemplate:
+    """余白とカラム領域のX方向の値"""
+
+    __slots__ = ("min_x", "max_x", "gaps", "columns")
+
+    def __init__(self, min_x: float, max_x: float, vertical_gaps: List[Dict], columns: List[Dict]):
+        self.min_x = min_x
+        self.max_x = max_x
+        self.gaps = [(gap["x"], gap["width"]) for gap in vertical_gaps]
+        self.columns = [(column["x"], column["width"]) for column in columns]
+
+    def matches(self, min_x: float, max_x: float) -> bool:
+        """ブロックの左右端がテンプレートを作ったページと同じか"""
+        return self.min_x == min_x and self.max_x == max_x
+
+    def build(self, header_boundary: float, footer_boundary: float) -> Tuple[List[Dict], List[Dict]]:
+        """ヘッダー・フッター境界を埋めて、余白とカラム領域のリストを作る"""
+        height = footer_boundary - header_boundary
+        vertical_gaps = [
+            {"x": x, "width": width, "y": header_boundary, "height": height}
+            for x, width in self.gaps
+        ]
+        columns = [
+            {"x": x, "y": header_boundary, "width": width, "height": height}
+            for x, width in self.columns
+        ]
+        return vertical_gaps, columns
+
+
+class LayoutTemplateCache:
+    """幾何シグネチャをキーにした LayoutTemplate のLRUキャッシュ"""
+
+    def __init__(self, max_templates: int = LAYOUT_TEMPLATE_CACHE_SIZE):
+        """
+        Args:
+            max_templates: 保持するテンプレート数の上限（0以下でキャッシュしない）
+        """
+        self.max_templates = max_templates
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._templates: "OrderedDict[Signature, LayoutTemplate]" = OrderedDict()
+
+    def detect(
+        self,
+        blocks: List[Block],
+        page_width: float,
+        header_boundary: float,
+        footer_boundary: float
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """
+        メインブロックから余白とカラム領域を検出する（同じシグネチャのテンプレートがあれば再利用する）
+
+        Args:
+            blocks: メインコンテンツ領域のブロックリスト
+            page_width: ページ幅
+            header_boundary: ヘッダー境界のY座標
+            footer_boundary: フッター境界のY座標
+
+        Returns:
+            (vertical_gaps, columns): detect_vertical_gaps の結果と、余白がある場合は
+            calculate_columns_from_gaps の結果（余白がない場合は空リスト）
+        """
+        blocks = as_blocks(blocks)
+        key = geometry_signature(blocks)
+        if key is None:
+            return [], []
+        signature, min_x, max_x = key
+
+        with self._lock:
+            template = self._templates.get(signature)
+            if template is not None and template.matches(min_x, max_x):
+                self._templates.move_to_end(signature)
+                self.hits += 1
+                return template.build(header_boundary, footer_boundary)
+            self.misses += 1
+
+        # テンプレートがない・確認に失敗した場合は通常の検出
+        vertical_gaps = detect_vertical_gaps(blocks, page_width, header_boundary, footer_boundary)
+        columns = []
+        if vertical_gaps:
+            columns = calculate_columns_from_gaps(vertical_gaps, blocks, page_width, header_boundary, footer_boundary)
+
+        if self.max_templates > 0:
+            with self._lock:
+                self._templates[signature] = LayoutTemplate(min_x, max_x, vertical_gaps, columns)
+                self._templates.move_to_end(signature)
+                while len(self._templates) > self.max_templates:
+                    self._templates.popitem(last=False)
+        return vertical_gaps, columns
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+
+# プロセス内で共有するテンプレートキャッシュ
+layout_templates = LayoutTemplateCache()
+
+
+def detect_page_layout(
+    blocks: List[Block],
+    page_width: float,
+    header_boundary: float,
+    footer_boundary: float
+) -> Tuple[List[Dict], List[Dict]]:
+    """プロセス内のテンプレートキャッシュを使って余白とカラム領域を検出する（LayoutTemplateCache.detect）"""
+    return layout_templates.detect(blocks, page_width, header_boundary, footer_boundary)
@@ -1,12 +1,13 @@
 """改行処理モジュール"""
 
-from typing import List, Dict, Optional
+from typing import List, Optional
+from .page_model import Block
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def should_break_line(block: Dict, column_right_edge: Optional[float] = None, threshold: float = 20.0) -> bool:
+def should_break_line(block: Block, column_right_edge: Optional[float] = None, threshold: float = 20.0) -> bool:
     """
     ブロックの後に改行を入れるべきか判定
     
@@ -22,7 +23,7 @@ def should_break_line(block: Dict, column_right_edge: Optional[float] = None, th
         return True
     
     # ブロックの右端
-    block_right = block["bbox"][2]
+    block_right = block.bbox[2]
     
     # 右端との距離
     distance_to_edge = column_right_edge - block_right
@@ -36,7 +37,7 @@ def should_break_line(block: Dict, column_right_edge: Optional[float] = None, th
         return True
 
 
-def merge_blocks_with_smart_breaks(blocks: List[Dict], column_right_edge: Optional[float] = None) -> str:
+def merge_blocks_with_smart_breaks(blocks: List[Block], column_right_edge: Optional[float] = None) -> str:
     """
     ブロックを右端判定付きで結合
     
@@ -0,0 +1,90 @@
+"""ワードから行を組み立てるモジュール"""
+
+import math
+from bisect import bisect_right, insort
+from typing import List, Dict, Tuple
+
+
+def _has_neighbor(sorted_edges: List[float], x: float, x_gap_threshold: float) -> bool:
+    """ソート済みの端点リストに x から x_gap_threshold 未満の点があるか"""
+    i = bisect_right(sorted_edges, x - x_gap_threshold)
+    for j in (i - 1, i):
+        if 0 <= j < len(sorted_edges) and abs(x - sorted_edges[j]) < x_gap_threshold:
+            return True
+    return False
+
+
+def group_words_into_lines(
+    words: List[Tuple],
+    tolerance: float = 3,
+    x_gap_threshold: float = 50
+) -> Dict[Tuple, List[Dict]]:
+    """
+    ワードをY座標でグループ化して行を作成（X座標の大きなギャップも考慮）
+
+    ワードは取得順に処理し、Y座標の差が tolerance 未満で、既存ワードとの
+    X距離が x_gap_threshold 未満となる最初の行に追加する。該当する行が
+    なければ新しい行を作る。
+
+    行の候補は tolerance 幅のYバケットから引き、X距離の判定は行ごとに
+    ソートして保持した左端・右端への二分探索で行うため、ページ内の
+    ワード数に対してほぼ線形に動作する。
+
+    Args:
+        words: page.get_text_words() の戻り値
+        tolerance: Y座標の許容誤差（デフォルト: 3）
+        x_gap_threshold: 同じ行内でのX座標の最大ギャップ（デフォルト: 50）
+
+    Returns:
+        (行のY座標, (最初のワードのx0, x1)) をキー、X座標でソートした
+        ワード辞書のリストを値とする辞書（行の作成順）
+    """
+    line_keys: List[Tuple] = []
+    line_words: List[List[Dict]] = []
+    line_lefts: List[List[float]] = []   # 行内ワードのx0（ソート済み）
+    line_rights: List[List[float]] = []  # 行内ワードのx1（ソート済み）
+    buckets: Dict[int, List[int]] = {}   # Yバケット -> 行インデックス
+
+    for word in words:
+        x0, y0, x1, y1, text, block_no = word[:6]
+        bucket = math.floor(y0 / tolerance)
+
+        # Y座標が許容誤差内の行を作成順に確認
+        candidates = sorted(
+            idx
+            for b in (bucket - 1, bucket, bucket + 1)
+            for idx in buckets.get(b, ())
+            if abs(y0 - line_keys[idx][0]) < tolerance
+        )
+
+        target = None
+        for idx in candidates:
+            # 既存のワードとのX座標の距離をチェック
+            if _has_neighbor(line_rights[idx], x0, x_gap_threshold) or \
+                    _has_neighbor(line_lefts[idx], x1, x_gap_threshold):
+                target = idx
+                break
+
+        if target is None:
+            # 新しい行を作成
+            target = len(line_keys)
+            line_keys.append((y0, (x0, x1)))  # Y座標とX範囲のタプルをキーとする
+            line_words.append([])
+            line_lefts.append([])
+            line_rights.append([])
+            buckets.setdefault(bucket, []).append(target)
+
+        line_words[target].append({
+            "x0": x0, "y0": y0, "x1": x1, "y1": y1,
+            "text": text, "block_no": block_no
+        })
+        insort(line_lefts[target], x0)
+        insort(line_rights[target], x1)
+
+    lines_dict = {}
+    for key, words_in_line in zip(line_keys, line_words):
+        # 各行内でX座標でソート
+        words_in_line.sort(key=lambda w: w["x0"])
+        lines_dict[key] = words_in_line
+
+    return lines_dict
@@ -0,0 +1,103 @@
+"""レイアウト解析で使うページ内容の内部表現
+
+PyMuPDFの get_text("dict") の入れ子の辞書の代わりに、__slots__ を使った軽量なクラスで
+ブロック・行・スパンを表す。フォント名は intern して同じ文字列を共有する。
+common のレイアウト解析処理はこの表現を使い、辞書への変換はAPIの応答を作るところ
+（process_block, PDFProcessor._convert_blocks_to_dict など）でのみ行う。
+"""
+
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+BBox = Tuple[float, float, float, float]
+
+
+class Span:
+    """同じスタイルで書かれたテキストの断片"""
+
+    __slots__ = ("text", "bbox", "size", "font", "flags")
+
+    def __init__(self, text: str, bbox: BBox, size: Optional[float] = None, font: str = "", flags: int = 0):
+        """
+        Args:
+            size: フォントサイズ（ワードから作ったスパンなど、不明な場合はNone）
+        """
+        self.text = text
+        self.bbox = bbox
+        self.size = size
+        self.font = sys.intern(font)
+        self.flags = flags
+
+
+class Line:
+    """1行分のスパン"""
+
+    __slots__ = ("spans", "bbox")
+
+    def __init__(self, spans: List[Span], bbox: Optional[BBox] = None):
+        self.spans = spans
+        self.bbox = bbox
+
+
+class Block:
+    """テキストブロック"""
+
+    __slots__ = ("bbox", "lines", "text")
+
+    def __init__(self, bbox: BBox, lines: List[Line], text: Optional[str] = None):
+        """
+        Args:
+            bbox: (x0, y0, x1, y1)
+            text: ブロック全体のテキスト（ワードから作ったブロックのみ。get_text("dict") 由来の場合はNone）
+        """
+        self.bbox = bbox
+        self.lines = lines
+        self.text = text
+
+    @classmethod
+    def from_dict(cls, block: Dict[str, Any]) -> "Block":
+        """get_text("dict") 形式のブロック辞書から作成する"""
+        lines = []
+        for line in block.get("lines", []):
+            spans = [
+                Span(
+                    span.get("text", ""),
+                    tuple(span["bbox"]) if "bbox" in span else None,
+                    span.get("size"),
+                    span.get("font", ""),
+                    span.get("flags", 0)
+                )
+                for span in line.get("spans", [])
+            ]
+            lines.append(Line(spans, tuple(line["bbox"]) if "bbox" in line else None))
+        return cls(tuple(block["bbox"]), lines, block.get("text"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """get_text("dict") 形式のブロック辞書に変換する"""
+        block = {
+            "type": 0,
+            "bbox": self.bbox,
+            "lines": [
+                {
+                    "bbox": line.bbox,
+                    "spans": [
+                        {"text": span.text, "bbox": span.bbox, "size": span.size, "font": span.font, "flags": span.flags}
+                        for span in line.spans
+                    ]
+                }
+                for line in self.lines
+            ]
+        }
+        if self.text is not None:
+            block["text"] = self.text
+        return block
+
+
+def blocks_from_page_dict(page_dict: Dict[str, Any]) -> List[Block]:
+    """get_text("dict") の結果からテキストブロック（type == 0）を作成する"""
+    return [Block.from_dict(b) for b in page_dict["blocks"] if b["type"] == 0]
+
+
+def as_blocks(blocks: Iterable) -> List[Block]:
+    """ブロックのリストを Block のリストにする（辞書のブロックは変換する）"""
+    return [b if isinstance(b, Block) else Block.from_dict(b) for b in blocks]
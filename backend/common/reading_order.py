@@ -0,0 +1,218 @@
+"""再帰的XYカットによる読み順の決定モジュール
+
+ブロックの bbox をX方向・Y方向に射影し、ソート済みの区間を1回走査して空白（カット位置）を探す。
+縦の空白（カラム間の余白）があれば左から右のカラムに、なければ横の空白で上から下の帯に分け、
+分けた領域ごとに同じ処理を繰り返して読み順の木（XYCutNode）を作る。
+
+横の帯に分けるときは、隣り合う帯を合わせても縦の空白が残る場合（2カラムの本文を段落の
+切れ目で横に切った帯など）は1つの領域にまとめてから再帰する。これにより、ページ幅の見出しの
+下に2カラムの本文が続くページでも「見出し → 左カラム → 右カラム」の順になる。
+他のカラムと縦の範囲が重ならない部分（カラムの間の下端にあるページ番号など）は、カラムではなく
+帯として分ける。
+
+各ノードの処理はソートが中心で、ノード内のブロック数 m に対して O(m log m)。
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .page_model import Block, BBox, as_blocks
+
+# 読み順の決定方法（APIの reading_order パラメータの値）
+READING_ORDER_HEURISTIC = "heuristic"  # 従来のカラム検出（余白・カラム領域・左右分割）
+READING_ORDER_XY_CUT = "xycut"         # 再帰的XYカット
+
+# カラム間の余白とみなす縦の空白の最小幅
+MIN_COLUMN_GAP = 5.0
+# 帯の区切りとみなす横の空白の最小幅（これより広い空白で区切る）
+MIN_BAND_GAP = 0.0
+
+_X = (0, 2)
+_Y = (1, 3)
+
+
+class XYCutNode:
+    """読み順の木のノード"""
+
+    __slots__ = ("axis", "bbox", "children", "indices")
+
+    def __init__(self, axis: Optional[str], bbox: BBox, children: List["XYCutNode"], indices: List[int]):
+        """
+        Args:
+            axis: "x"（子は左から右のカラム）、"y"（子は上から下の帯）、None（葉）
+            bbox: ノードに含まれるブロックの外接矩形
+            children: 子ノード（読み順）
+            indices: 葉のブロックのインデックス（読み順。葉以外では空）
+        """
+        self.axis = axis
+        self.bbox = bbox
+        self.children = children
+        self.indices = indices
+
+    def order(self) -> List[int]:
+        """ブロックのインデックスを読み順で返す"""
+        if not self.children:
+            return list(self.indices)
+        result = []
+        for child in self.children:
+            result.extend(child.order())
+        return result
+
+    def segments(self) -> List[List[int]]:
+        """
+        続けて読むブロックのまとまり（カラムまたはページ幅の流れ）を読み順で返す
+
+        カラムに分かれたノードは子ごとに別のまとまりにし、帯に分かれたノードでは
+        カラムに分かれていない帯が続く間は1つのまとまりにする。
+        """
+        if not self.children:
+            return [list(self.indices)]
+        result = []
+        flowing = False
+        for child in self.children:
+            child_segments = child.segments()
+            if self.axis == "y" and flowing and len(child_segments) == 1:
+                result[-1].extend(child_segments[0])
+            else:
+                result.extend(child_segments)
+            flowing = self.axis == "y" and len(child_segments) == 1
+        return result
+
+    def column_count(self) -> int:
+        """カラムに分かれたノードの子の数の最大値（カラムがない場合は1）"""
+        count = len(self.children) if self.axis == "x" else 1
+        for child in self.children:
+            count = max(count, child.column_count())
+        return count
+
+    def to_dict(self) -> Dict:
+        """APIの応答用の辞書（葉はブロックのインデックスを持つ）"""
+        x0, y0, x1, y1 = self.bbox
+        node = {"axis": self.axis, "x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0}
+        if self.children:
+            node["children"] = [child.to_dict() for child in self.children]
+        else:
+            node["blocks"] = list(self.indices)
+        return node
+
+
+def _cut(boxes: Sequence[BBox], indices: List[int], axis: Tuple[int, int], min_gap: float) -> List[List[int]]:
+    """
+    ソートした射影を走査し、幅が min_gap を超える空白で indices を分ける
+
+    Returns:
+        分けたインデックスのリスト（空白がない場合は要素1つ）
+    """
+    lo, hi = axis
+    order = sorted(indices, key=lambda i: boxes[i][lo])
+    groups = [[order[0]]]
+    reach = boxes[order[0]][hi]
+    for i in order[1:]:
+        if boxes[i][lo] - reach > min_gap:
+            groups.append([i])
+        else:
+            groups[-1].append(i)
+        reach = max(reach, boxes[i][hi])
+    return groups
+
+
+def _x_intervals(boxes: Sequence[BBox], indices: List[int]) -> List[Tuple[float, float]]:
+    """ブロックが占有するX区間の和集合（左端でソート済み）"""
+    merged = []
+    for x0, x1 in sorted((boxes[i][0], boxes[i][2]) for i in indices):
+        if merged and x0 - merged[-1][1] <= MIN_COLUMN_GAP:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], x1))
+        else:
+            merged.append((x0, x1))
+    return merged
+
+
+def _union(a: List[Tuple[float, float]], b: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """2つのX区間の和集合を合わせる"""
+    merged = []
+    for x0, x1 in sorted(a + b):
+        if merged and x0 - merged[-1][1] <= MIN_COLUMN_GAP:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], x1))
+        else:
+            merged.append((x0, x1))
+    return merged
+
+
+def _overlaps(a: Tuple[float, float], intervals: List[Tuple[float, float]]) -> bool:
+    return any(a[0] <= b[1] and b[0] <= a[1] for b in intervals)
+
+
+def _merge_column_bands(boxes: Sequence[BBox], bands: List[List[int]]) -> List[List[int]]:
+    """
+    隣り合う帯を、合わせても縦の空白が残り、新しいカラムが増えない間は1つの領域にまとめる
+
+    カラムの間に置かれたページ番号のように、どのカラムとも横に重ならない帯は別の領域にする。
+    """
+    groups = [list(bands[0])]
+    intervals = _x_intervals(boxes, bands[0])
+    for band in bands[1:]:
+        band_intervals = _x_intervals(boxes, band)
+        combined = _union(intervals, band_intervals)
+        if len(combined) > 1 and all(_overlaps(interval, intervals) for interval in band_intervals):
+            groups[-1].extend(band)
+            intervals = combined
+        else:
+            groups.append(list(band))
+            intervals = band_intervals
+    return groups
+
+
+def _has_floating_column(boxes: Sequence[BBox], columns: List[List[int]]) -> bool:
+    """他のどのカラムとも縦の範囲が重ならないカラム（カラムの間の下端にあるページ番号など）があるか"""
+    ranges = [
+        (min(boxes[i][1] for i in column), max(boxes[i][3] for i in column))
+        for column in columns
+    ]
+    return any(
+        not any(j != k and other[0] <= y1 and y0 <= other[1] for k, other in enumerate(ranges))
+        for j, (y0, y1) in enumerate(ranges)
+    )
+
+
+def _bbox(boxes: Sequence[BBox], indices: List[int]) -> BBox:
+    return (
+        min(boxes[i][0] for i in indices),
+        min(boxes[i][1] for i in indices),
+        max(boxes[i][2] for i in indices),
+        max(boxes[i][3] for i in indices),
+    )
+
+
+def _build(boxes: Sequence[BBox], indices: List[int]) -> XYCutNode:
+    bbox = _bbox(boxes, indices)
+
+    # 縦の空白があればカラムに分ける（他のカラムと縦に重ならない部分がある場合は先に帯に分ける）
+    columns = _cut(boxes, indices, _X, MIN_COLUMN_GAP)
+    if len(columns) > 1 and not _has_floating_column(boxes, columns):
+        return XYCutNode("x", bbox, [_build(boxes, column) for column in columns], [])
+
+    # 横の空白で帯に分ける（カラムに分かれる帯は続く帯とまとめる）
+    bands = _cut(boxes, indices, _Y, MIN_BAND_GAP)
+    if len(bands) > 1:
+        groups = _merge_column_bands(boxes, bands)
+        if len(groups) > 1:
+            return XYCutNode("y", bbox, [_build(boxes, group) for group in groups], [])
+
+    # これ以上分けられない領域は上から、同じ高さでは左から読む
+    leaf = sorted(indices, key=lambda i: (boxes[i][1], boxes[i][0]))
+    return XYCutNode(None, bbox, [], leaf)
+
+
+def xy_cut(blocks: List[Block]) -> Optional[XYCutNode]:
+    """
+    ブロックの読み順の木を作る
+
+    Args:
+        blocks: Block のリスト（ヘッダー・フッターは除外しておく）
+
+    Returns:
+        読み順の木の根（ブロックがない場合はNone）。葉の indices は blocks のインデックス
+    """
+    if not blocks:
+        return None
+    boxes = [b.bbox for b in as_blocks(blocks)]
+    return _build(boxes, list(range(len(boxes))))
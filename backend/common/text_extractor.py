@@ -1,10 +1,10 @@
 """テキスト抽出ユーティリティモジュール"""
 
 import re
-from typing import Dict
+from .page_model import Block
 
 
-def extract_block_text(block: Dict) -> str:
+def extract_block_text(block: Block) -> str:
     """
     ブロックからテキストを抽出
     
@@ -15,10 +15,8 @@ def extract_block_text(block: Dict) -> str:
         抽出されたテキスト
     """
     lines = []
-    for line in block.get("lines", []):
-        line_text = ""
-        for span in line.get("spans", []):
-            line_text += span.get("text", "")
+    for line in block.lines:
+        line_text = "".join(span.text for span in line.spans)
         if line_text:
             lines.append(line_text)
     
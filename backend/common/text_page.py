@@ -0,0 +1,75 @@
+"""ページのテキスト層（fitz.TextPage）の共有モジュール
+
+page.get_text("words") / get_text("dict") / get_text() はそれぞれページの内容を解析し直すため、
+1ページに対して複数の抽出処理を行うと同じ解析が繰り返される。
+PageTextContext は1ページにつき1つの TextPage を作り、words・dict（Block のリスト）・text を
+必要になった時点でそこから作って保持する。
+"""
+
+import fitz
+from typing import Dict, List, Optional
+
+from .page_model import Block, blocks_from_page_dict
+
+# TextPageの作成フラグ（画像データは読み込まない。get_text("words") / get_text() の既定値と同じ）
+TEXT_PAGE_FLAGS = fitz.TEXTFLAGS_TEXT
+
+
+class PageTextContext:
+    """1ページ分のテキスト層と、そこから作った words / dict / text を保持する"""
+
+    def __init__(self, page: fitz.Page, flags: int = TEXT_PAGE_FLAGS):
+        """
+        Args:
+            page: PyMuPDFのページオブジェクト
+            flags: TextPageの作成フラグ
+        """
+        self.page = page
+        self.flags = flags
+        self._textpage = None
+        self._words = None
+        self._dict = None
+        self._blocks = None
+        self._text = None
+
+    @property
+    def textpage(self) -> fitz.TextPage:
+        """ページのTextPage（最初に使うときに作成する）"""
+        if self._textpage is None:
+            self._textpage = self.page.get_textpage(flags=self.flags)
+        return self._textpage
+
+    @property
+    def words(self) -> List[tuple]:
+        """page.get_text("words") 相当のワードのリスト"""
+        if self._words is None:
+            self._words = self.page.get_text_words(textpage=self.textpage)
+        return self._words
+
+    @property
+    def page_dict(self) -> Dict:
+        """page.get_text("dict") 相当の辞書（画像ブロックは含まない）"""
+        if self._dict is None:
+            self._dict = self.page.get_text("dict", textpage=self.textpage)
+        return self._dict
+
+    @property
+    def blocks(self) -> List[Block]:
+        """page_dict のテキストブロック（type == 0）を Block にしたもの"""
+        if self._blocks is None:
+            self._blocks = blocks_from_page_dict(self.page_dict)
+        return self._blocks
+
+    @property
+    def text(self) -> str:
+        """page.get_text() 相当のプレーンテキスト"""
+        if self._text is None:
+            self._text = self.page.get_text(textpage=self.textpage)
+        return self._text
+
+
+def get_text_context(page: fitz.Page, text_page: Optional[PageTextContext] = None) -> PageTextContext:
+    """呼び出し元から渡された PageTextContext を返す（ない場合はこのページ用に作成する）"""
+    if text_page is not None:
+        return text_page
+    return PageTextContext(page)
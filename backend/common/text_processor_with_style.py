@@ -1,6 +1,7 @@
 """スタイル付きテキスト処理モジュール"""
 
 from typing import List, Dict, Optional
+from .page_model import Block, as_blocks
 from .text_extractor import extract_block_text
 from .text_style_analyzer import classify_text_style, format_text_with_style
 import logging
@@ -9,7 +10,7 @@ logger = logging.getLogger(__name__)
 
 
 def process_blocks_to_text_with_style(
-    blocks: List[Dict], 
+    blocks: List[Block], 
     style_stats: Optional[Dict[str, float]] = None,
     paragraph_threshold: float = 20, 
     already_sorted: bool = False,
@@ -19,7 +20,7 @@ def process_blocks_to_text_with_style(
     ブロックをY座標でソートし、段落を検出して結合（スタイル付き）
     
     Args:
-        blocks: テキストブロックのリスト
+        blocks: テキストブロックのリスト（Block または get_text("dict") 形式の辞書）
         style_stats: analyze_text_stylesで計算した基準値
         paragraph_threshold: 段落間の閾値（デフォルト: 20）
         already_sorted: すでにソート済みの場合True（カラム処理後など）
@@ -30,6 +31,7 @@ def process_blocks_to_text_with_style(
     """
     if not blocks:
         return ""
+    blocks = as_blocks(blocks)
     
     # スタイル統計がない場合は通常の処理
     if not style_stats:
@@ -40,7 +42,7 @@ def process_blocks_to_text_with_style(
     if already_sorted:
         sorted_blocks = blocks
     else:
-        sorted_blocks = sorted(blocks, key=lambda b: b["bbox"][1])
+        sorted_blocks = sorted(blocks, key=lambda b: b.bbox[1])
     
     # 段落の検出と結合
     paragraphs = []
@@ -48,7 +50,7 @@ def process_blocks_to_text_with_style(
     last_y = None
     
     for block in sorted_blocks:
-        y_pos = block["bbox"][1]
+        y_pos = block.bbox[1]
         
         if last_y is not None and y_pos - last_y > paragraph_threshold:
             # 新しい段落
@@ -58,7 +60,7 @@ def process_blocks_to_text_with_style(
         else:
             current_paragraph.append(block)
         
-        last_y = block["bbox"][3]  # 下端のY座標
+        last_y = block.bbox[3]  # 下端のY座標
     
     # 最後の段落を追加
     if current_paragraph:
@@ -67,7 +69,7 @@ def process_blocks_to_text_with_style(
     return "\n\n".join(paragraphs)
 
 
-def merge_paragraph_blocks_with_style(blocks: List[Dict], style_stats: Dict[str, float], column_right_edge: float = None) -> str:
+def merge_paragraph_blocks_with_style(blocks: List[Block], style_stats: Dict[str, float], column_right_edge: float = None) -> str:
     """
     同じ段落のブロックを結合（スタイル付き）
     
@@ -82,24 +84,17 @@ def merge_paragraph_blocks_with_style(blocks: List[Dict], style_stats: Dict[str,
     if column_right_edge is not None:
         # スマート改行処理を使用
         from .line_break_handler import merge_blocks_with_smart_breaks
-        # 各ブロックにスタイルを適用してから結合
+        # 各ブロックにスタイルを適用してから結合（ブロックとフォーマット済みテキストの組）
         styled_blocks = []
         for block in blocks:
             style = classify_text_style(block, style_stats)
             text = extract_block_text(block)
             if text:
-                formatted_text = format_text_with_style(text, style)
-                # フォーマット済みテキストをブロックに設定
-                styled_block = block.copy()
-                styled_block['styled_text'] = formatted_text
-                styled_blocks.append(styled_block)
+                styled_blocks.append((block, format_text_with_style(text, style)))
         
-        # スマート改行処理（styled_textを使用）
+        # スマート改行処理（フォーマット済みテキストを使用）
         result_parts = []
-        for i, block in enumerate(styled_blocks):
-            text = block.get('styled_text', '')
-            if not text:
-                continue
+        for i, (block, text) in enumerate(styled_blocks):
             
             # 最後のブロック以外で右端判定
             if i < len(styled_blocks) - 1:
@@ -2,14 +2,88 @@
 
 from typing import Dict, List, Tuple, Optional
 import logging
+from .page_model import Block, as_blocks
 
 logger = logging.getLogger(__name__)
 
 
-def analyze_text_styles(blocks: List[Dict]) -> Dict[str, float]:
+class StyleProfile:
+    """
+    フォントサイズごとの文字数（文字数で重み付けしたヒストグラム）
+    
+    ページごとに add_blocks で追加し、merge で他のページ範囲の結果と結合できる。
+    平均・中央値・最頻値はヒストグラムの件数から計算する。
+    """
+    
+    def __init__(self, size_counts: Optional[Dict[float, int]] = None):
+        """
+        Args:
+            size_counts: フォントサイズ → 文字数（最初に現れた順）
+        """
+        self.size_counts: Dict[float, int] = dict(size_counts or {})
+    
+    def add_blocks(self, blocks: List[Block]) -> "StyleProfile":
+        """ブロックのスパンのフォントサイズを文字数で重み付けして追加する"""
+        counts = self.size_counts
+        for block in as_blocks(blocks):
+            for line in block.lines:
+                for span in line.spans:
+                    size = span.size or 0
+                    text_length = len(span.text)
+                    if size > 0 and text_length:
+                        counts[size] = counts.get(size, 0) + text_length
+        return self
+    
+    def merge(self, other: "StyleProfile") -> "StyleProfile":
+        """他のヒストグラムの件数を加える（後ろのページ範囲の結果を順に加える）"""
+        counts = self.size_counts
+        for size, count in other.size_counts.items():
+            counts[size] = counts.get(size, 0) + count
+        return self
+    
+    @property
+    def total(self) -> int:
+        """重み（文字数）の合計"""
+        return sum(self.size_counts.values())
+    
+    def stats(self) -> Dict[str, float]:
+        """analyze_text_styles と同じ形式の基準値を返す（文字がない場合は12.0）"""
+        total = self.total
+        if not total:
+            return {
+                "avg_font_size": 12.0,
+                "median_font_size": 12.0,
+                "common_font_size": 12.0
+            }
+        
+        avg_size = sum(size * count for size, count in self.size_counts.items()) / total
+        
+        # 中央値：サイズ順に数えて total // 2 番目（0始まり）の文字のサイズ
+        median_index = total // 2
+        cumulative = 0
+        for size in sorted(self.size_counts):
+            cumulative += self.size_counts[size]
+            if cumulative > median_index:
+                median_size = size
+                break
+        
+        # 最頻値（同数の場合は先に現れたサイズ）
+        common_size = max(self.size_counts.items(), key=lambda x: x[1])[0]
+        
+        return {
+            "avg_font_size": avg_size,
+            "median_font_size": median_size,
+            "common_font_size": common_size
+        }
+
+
+def analyze_text_styles(blocks: List[Block]) -> Dict[str, float]:
     """
     全ブロックのテキストスタイルを解析し、基準値を計算
     
+    Args:
+        blocks: テキストブロックのリスト（Block または get_text("dict") 形式の辞書）
+    
     Returns:
         {
             "avg_font_size": 平均フォントサイズ,
@@ -17,51 +91,20 @@ def analyze_text_styles(blocks: List[Dict]) -> Dict[str, float]:
             "common_font_size": 最頻値フォントサイズ
         }
     """
-    all_sizes = []
-    
-    for block in blocks:
-        for line in block.get("lines", []):
-            for span in line.get("spans", []):
-                size = span.get("size", 0)
-                if size > 0:
-                    # テキストの長さで重み付け
-                    text_length = len(span.get("text", ""))
-                    all_sizes.extend([size] * text_length)
-    
-    if not all_sizes:
-        return {
-            "avg_font_size": 12.0,
-            "median_font_size": 12.0,
-            "common_font_size": 12.0
-        }
-    
-    # 統計値を計算
-    avg_size = sum(all_sizes) / len(all_sizes)
-    sorted_sizes = sorted(all_sizes)
-    median_size = sorted_sizes[len(sorted_sizes) // 2]
-    
-    # 最頻値（モード）を計算
-    size_counts = {}
-    for size in all_sizes:
-        size_counts[size] = size_counts.get(size, 0) + 1
-    common_size = max(size_counts.items(), key=lambda x: x[1])[0]
-    
-    logger.info(f"[text_style_analyzer] フォントサイズ統計: 平均={avg_size:.1f}, 中央値={median_size:.1f}, 最頻値={common_size:.1f}")
-    
-    return {
-        "avg_font_size": avg_size,
-        "median_font_size": median_size,
-        "common_font_size": common_size
-    }
+    profile = StyleProfile().add_blocks(blocks)
+    stats = profile.stats()
+    if profile.total:
+        logger.info(f"[text_style_analyzer] フォントサイズ統計: 平均={stats['avg_font_size']:.1f}, 中央値={stats['median_font_size']:.1f}, 最頻値={stats['common_font_size']:.1f}")
+    return stats
 
 
-def classify_text_style(block: Dict, base_stats: Dict[str, float]) -> Dict[str, str]:
+def classify_text_style(block: Block, base_stats: Dict[str, float]) -> Dict[str, str]:
     """
     ブロックのテキストスタイルを分類
     
     Args:
         block: テキストブロック
-        base_stats: analyze_text_stylesで計算した基準値
+        base_stats: analyze_text_styles（またはドキュメント全体の StyleProfile.stats）で計算した基準値
     
     Returns:
         {
@@ -78,20 +121,20 @@ def classify_text_style(block: Dict, base_stats: Dict[str, float]) -> Dict[str,
     is_bold = False
     is_italic = False
     
-    for line in block.get("lines", []):
-        for span in line.get("spans", []):
-            size = span.get("size", base_size)
+    for line in block.lines:
+        for span in line.spans:
+            size = base_size if span.size is None else span.size
             sizes.append(size)
             
             # フォント名から太字・斜体を判定
-            font_name = span.get("font", "").lower()
+            font_name = span.font.lower()
             if "bold" in font_name or "heavy" in font_name or "black" in font_name:
                 is_bold = True
             if "italic" in font_name or "oblique" in font_name:
                 is_italic = True
             
             # フラグからも判定
-            flags = span.get("flags", 0)
+            flags = span.flags
             if flags & 2**4:  # 太字フラグ
                 is_bold = True
             if flags & 2**1:  # 斜体フラグ
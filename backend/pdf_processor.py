@@ -4,7 +4,7 @@ from typing import List, Dict, Optional
 import re
 from common import (
     detect_header_footer_boundaries,
-    detect_vertical_gaps,
+    detect_page_layout,
     calculate_columns_from_gaps,
     assign_blocks_to_column_regions,
     process_blocks_to_text,
@@ -14,8 +14,11 @@ from common import (
     analyze_text_styles,
     classify_text_style,
     format_text_with_style,
-    process_blocks_to_text_with_style
+    process_blocks_to_text_with_style,
+    get_text_context,
+    xy_cut
 )
+from common.reading_order import READING_ORDER_HEURISTIC, READING_ORDER_XY_CUT
 
 logger = logging.getLogger(__name__)
 
@@ -26,74 +29,105 @@ class PDFProcessor:
     def __init__(self):
         pass
 
-    def extract_text_with_structure(self, page, apply_text_style: bool = False) -> Dict:
-        """構造を保持したテキスト抽出
+    def analyze_page_geometry(self, page, text_page=None, header_footer_regions: Optional[Dict] = None) -> Dict:
+        """ページの幾何情報だけを計算（テキストの組み立て・スタイル解析は行わない）
+
+        ヘッダー・フッター境界、位置によるブロックの分類、縦の余白領域とカラム領域を求める。
+        extract_text_with_structure のテキスト抽出の前段階と同じ結果になる。
 
         Args:
             page: PDFページオブジェクト
-            apply_text_style: テキストスタイル（太字、サイズ）を適用するか
+            text_page: ページの PageTextContext（省略時はこのページ用に作成）
+            header_footer_regions: ドキュメント共通のヘッダー・フッター領域（HeaderFooterLearner.regions。省略時はこのページから検出）
+
+        Returns:
+            header_boundary, footer_boundary, page_height, page_width, raw_header_blocks,
+            raw_footer_blocks, raw_main_blocks, vertical_gaps, columns を持つ辞書
         """
-        blocks = page.get_text("dict")
         page_height = page.rect.height
+        page_width = page.rect.width
 
         # テキストブロックのみを抽出
-        text_blocks = [b for b in blocks["blocks"] if b["type"] == 0]
-
-        # テキストスタイルを解析
-        style_stats = None
-        if apply_text_style:
-            style_stats = analyze_text_styles(text_blocks)
+        text_blocks = get_text_context(page, text_page).blocks
 
         # ヘッダー・フッター境界を検出
-        header_threshold, footer_threshold = detect_header_footer_boundaries(text_blocks, page_height)
-
-        logger.debug(f"[PDFProcessor] ページ高さ: {page_height}, ヘッダー境界: {header_threshold}, フッター境界: {footer_threshold}")
-
-        logger.debug(f"[PDFProcessor] 全ブロック数: {len(text_blocks)}")
-        if text_blocks:
-            for i, block in enumerate(text_blocks[:5]):
-                logger.debug(f"  ブロック{i}: y={block['bbox'][1]:.2f}, text='{extract_block_text(block)[:50]}'")
-            if len(text_blocks) > 10:
-                logger.debug("  ...")
-            for i, block in enumerate(text_blocks[-5:], len(text_blocks)-5):
-                logger.debug(f"  ブロック{i}: y={block['bbox'][1]:.2f}, text='{extract_block_text(block)[:50]}'")
+        if header_footer_regions is None:
+            header_threshold, footer_threshold = detect_header_footer_boundaries(text_blocks, page_height)
+        else:
+            # ドキュメント共通の領域を使う（見つからなかった側はヘッダー・フッターなし）
+            header_region = header_footer_regions.get("header")
+            footer_region = header_footer_regions.get("footer")
+            header_threshold = header_region["y_end"] if header_region else 0
+            footer_threshold = footer_region["y_start"] if footer_region else page_height
 
+        # 位置のみによる分類（パターンマッチングなし）
         main_blocks = []
         headers = []
         footers = []
-
-        for idx, block in enumerate(text_blocks):
-            y_pos = block["bbox"][1]
-
-            # 位置のみによる分類（パターンマッチングなし）
+        for block in text_blocks:
+            y_pos = block.bbox[1]
             if y_pos <= header_threshold:
                 headers.append(block)
-                logger.debug(f"[PDFProcessor] ヘッダーブロック検出: y_pos={y_pos}, bbox={block['bbox']}, text='{extract_block_text(block)}'")
             elif y_pos >= footer_threshold:
                 footers.append(block)
-                logger.debug(f"[PDFProcessor] フッターブロック検出: y_pos={y_pos}, bbox={block['bbox']}, text='{extract_block_text(block)}'")
             else:
                 main_blocks.append(block)
-                if len(main_blocks) <= 20:
-                    text = extract_block_text(block)
-                    logger.debug(f"[PDFProcessor] メインブロック{len(main_blocks)-1} (元index={idx}): Y={y_pos:.1f}, X={block['bbox'][0]:.1f}-{block['bbox'][2]:.1f}, text='{text[:30]}'...")
 
-        # ページ幅を取得
-        page_width = page.rect.width
+        # 縦の余白領域とカラム領域を検出（メインブロックのみで。同じ版面のページはテンプレートを再利用）
+        vertical_gaps, columns = detect_page_layout(main_blocks, page_width, header_threshold, footer_threshold)
 
-        # 縦の余白領域を検出（メインブロックのみで）
-        vertical_gaps = detect_vertical_gaps(main_blocks, page_width, header_threshold, footer_threshold)
-        logger.debug(f"[PDFProcessor] extract_text_with_structure: main_blocks数={len(main_blocks)}, 検出された余白数={len(vertical_gaps)}")
-        logger.debug(f"[PDFProcessor] ページ幅: {page_width}")
+        return {
+            "header_boundary": header_threshold,
+            "footer_boundary": footer_threshold,
+            "page_height": page_height,
+            "page_width": page_width,
+            "raw_header_blocks": headers,
+            "raw_footer_blocks": footers,
+            "raw_main_blocks": main_blocks,
+            "vertical_gaps": vertical_gaps,
+            "columns": columns
+        }
 
-        if main_blocks:
-            x_coords = [(b["bbox"][0], b["bbox"][2]) for b in main_blocks]
-            x_coords.sort()
-            logger.debug(f"[PDFProcessor] 最初の5ブロックのX座標: {x_coords[:5]}")
-            logger.debug(f"[PDFProcessor] 最後の5ブロックのX座標: {x_coords[-5:]}")
+    def extract_text_with_structure(self, page, apply_text_style: bool = False, text_page=None, style_stats: Optional[Dict] = None, header_footer_regions: Optional[Dict] = None, reading_order: str = READING_ORDER_HEURISTIC) -> Dict:
+        """構造を保持したテキスト抽出
+
+        Args:
+            page: PDFページオブジェクト
+            apply_text_style: テキストスタイル（太字、サイズ）を適用するか
+            text_page: ページの PageTextContext（省略時はこのページ用に作成）
+            style_stats: スタイルの基準値（ドキュメント全体の StyleProfile.stats など。省略時はこのページから計算）
+            header_footer_regions: ドキュメント共通のヘッダー・フッター領域（HeaderFooterLearner.regions。省略時はこのページから検出）
+            reading_order: 読み順の決定方法（"heuristic" は余白から求めたカラム順、"xycut" は再帰的XYカット）
+        """
+        text_page = get_text_context(page, text_page)
+
+        # テキストスタイルを解析
+        if not apply_text_style:
+            style_stats = None
+        elif style_stats is None:
+            style_stats = analyze_text_styles(text_page.blocks)
+
+        # 境界・ブロックの分類・余白とカラム領域
+        geometry = self.analyze_page_geometry(page, text_page, header_footer_regions)
+        page_height = geometry["page_height"]
+        header_threshold = geometry["header_boundary"]
+        footer_threshold = geometry["footer_boundary"]
+        headers = geometry["raw_header_blocks"]
+        footers = geometry["raw_footer_blocks"]
+        main_blocks = geometry["raw_main_blocks"]
+        vertical_gaps = geometry["vertical_gaps"]
+        columns = geometry["columns"]
+
+        logger.debug(f"[PDFProcessor] ページ高さ: {page_height}, ヘッダー境界: {header_threshold}, フッター境界: {footer_threshold}")
+        logger.debug(f"[PDFProcessor] extract_text_with_structure: ヘッダー{len(headers)}, フッター{len(footers)}, main_blocks数={len(main_blocks)}, 検出された余白数={len(vertical_gaps)}")
 
         # メインコンテンツの処理（ヘッダー・フッターも渡す）
-        structured_text = self._process_main_blocks(main_blocks, page_height, header_threshold, footer_threshold, vertical_gaps, headers, footers, style_stats)
+        reading_order_tree = None
+        if reading_order == READING_ORDER_XY_CUT:
+            reading_order_tree = xy_cut(main_blocks)
+            structured_text = self._process_xy_cut_blocks(main_blocks, reading_order_tree, style_stats)
+        else:
+            structured_text = self._process_main_blocks(main_blocks, page_height, header_threshold, footer_threshold, vertical_gaps, headers, footers, style_stats, columns)
 
         full_text_parts = []
         if structured_text:
@@ -105,14 +139,8 @@ class PDFProcessor:
             "footers": [extract_block_text(f) for f in footers],
             "has_columns": len(vertical_gaps) > 0,
             "blocks": self._convert_blocks_to_dict(main_blocks),
-            "header_boundary": header_threshold,
-            "footer_boundary": footer_threshold,
-            "page_height": page_height,
-            "page_width": page_width,
-            "raw_header_blocks": headers,
-            "raw_footer_blocks": footers,
-            "raw_main_blocks": main_blocks,
-            "vertical_gaps": vertical_gaps
+            **geometry,
+            "reading_order_tree": reading_order_tree
         }
 
         if style_stats:
@@ -124,19 +152,19 @@ class PDFProcessor:
         """カラム数を検出"""
         return len(vertical_gaps) + 1 if vertical_gaps else 1
 
-    def _process_main_blocks(self, blocks, page_height, header_boundary, footer_boundary, vertical_gaps, header_blocks=None, footer_blocks=None, style_stats=None) -> str:
+    def _process_main_blocks(self, blocks, page_height, header_boundary, footer_boundary, vertical_gaps, header_blocks=None, footer_blocks=None, style_stats=None, columns=None) -> str:
         """メインブロックを処理してテキストを生成"""
         if not blocks:
             return ""
 
-        page_width = max(block["bbox"][2] for block in blocks) if blocks else 0
+        page_width = max(block.bbox[2] for block in blocks) if blocks else 0
         if page_height is None:
-            page_height = max(block["bbox"][3] for block in blocks) if blocks else 0
+            page_height = max(block.bbox[3] for block in blocks) if blocks else 0
 
         logger.debug(f"[PDFProcessor] _process_main_blocks: main_blocks数={len(blocks)}, 受け取った余白数={len(vertical_gaps)}")
 
         if vertical_gaps:
-            return self._process_multicolumn_blocks(blocks, page_height, header_boundary, footer_boundary, vertical_gaps, style_stats)
+            return self._process_multicolumn_blocks(blocks, page_height, header_boundary, footer_boundary, vertical_gaps, style_stats, columns)
         else:
             column_right_edge = page_width
             if style_stats:
@@ -145,19 +173,20 @@ class PDFProcessor:
                 text = process_blocks_to_text(blocks, column_right_edge=column_right_edge)
             return f"---\n\n{text}" if text else ""
 
-    def _process_multicolumn_blocks(self, blocks, page_height, header_boundary, footer_boundary, vertical_gaps, style_stats=None) -> str:
-        """マルチカラムのブロックを処理"""
+    def _process_multicolumn_blocks(self, blocks, page_height, header_boundary, footer_boundary, vertical_gaps, style_stats=None, columns=None) -> str:
+        """マルチカラムのブロックを処理（columns を省略した場合は余白から計算する）"""
         if not blocks:
             return ""
 
-        page_width = max(block["bbox"][2] for block in blocks) if blocks else 0
+        page_width = max(block.bbox[2] for block in blocks) if blocks else 0
         main_blocks = blocks
 
         if not vertical_gaps:
             text = process_blocks_to_text(blocks)
             return f"【カラム1】\n{text}" if text else ""
 
-        columns = calculate_columns_from_gaps(vertical_gaps, main_blocks, page_width, header_boundary, footer_boundary)
+        if columns is None:
+            columns = calculate_columns_from_gaps(vertical_gaps, main_blocks, page_width, header_boundary, footer_boundary)
         column_blocks_list = assign_blocks_to_column_regions(main_blocks, columns, vertical_gaps)
 
         column_texts = []
@@ -167,13 +196,13 @@ class PDFProcessor:
                 if len(column_blocks) > 0:
                     for j, block in enumerate(column_blocks[:3]):
                         text = extract_block_text(block)
-                        logger.debug(f"  最初のブロック{j}: Y={block['bbox'][1]:.1f}, text='{text[:20]}'")
+                        logger.debug(f"  最初のブロック{j}: Y={block.bbox[1]:.1f}, text='{text[:20]}'")
 
                     if len(column_blocks) > 6:
                         logger.debug("  ...")
                         for j, block in enumerate(column_blocks[-3:], len(column_blocks)-3):
                             text = extract_block_text(block)
-                            logger.debug(f"  最後のブロック{j}: Y={block['bbox'][1]:.1f}, text='{text[:20]}'")
+                            logger.debug(f"  最後のブロック{j}: Y={block.bbox[1]:.1f}, text='{text[:20]}'")
 
                 column_right_edge = columns[i]['x'] + columns[i]['width'] if i < len(columns) else None
 
@@ -193,14 +222,34 @@ class PDFProcessor:
             else:
                 return "---\n\n" + "\n\n---\n\n".join(texts)
 
+    def _process_xy_cut_blocks(self, blocks, tree, style_stats=None) -> str:
+        """XYカットの読み順でブロックを処理（続けて読むまとまりごとに段落を結合）"""
+        if tree is None:
+            return ""
+
+        texts = []
+        for segment in tree.segments():
+            segment_blocks = [blocks[i] for i in segment]
+            column_right_edge = max(block.bbox[2] for block in segment_blocks)
+            if style_stats:
+                text = process_blocks_to_text_with_style(segment_blocks, style_stats, already_sorted=True, column_right_edge=column_right_edge)
+            else:
+                text = process_blocks_to_text(segment_blocks, already_sorted=True, column_right_edge=column_right_edge)
+            if text:
+                texts.append(text)
+
+        if not texts:
+            return ""
+        return "---\n\n" + "\n\n---\n\n".join(texts)
+
     def _convert_blocks_to_dict(self, blocks) -> List[Dict]:
         """ブロック情報を辞書形式に変換"""
         result = []
         for block in blocks:
             block_info = {
-                "bbox": block["bbox"],
+                "bbox": block.bbox,
                 "text": extract_block_text(block),
-                "lines": len(block.get("lines", [])),
+                "lines": len(block.lines),
                 "avg_font_size": self._get_avg_font_size(block),
                 "is_heading": self._is_heading(block)
             }
@@ -210,9 +259,9 @@ class PDFProcessor:
     def _get_avg_font_size(self, block) -> float:
         """平均フォントサイズを取得"""
         sizes = []
-        for line in block.get("lines", []):
-            for span in line.get("spans", []):
-                sizes.append(span.get("size", 12))
+        for line in block.lines:
+            for span in line.spans:
+                sizes.append(12 if span.size is None else span.size)
         return sum(sizes) / len(sizes) if sizes else 12
 
     def _is_heading(self, block) -> bool:
@@ -223,9 +272,9 @@ class PDFProcessor:
         if avg_size > 14:
             return True
 
-        for line in block.get("lines", []):
-            for span in line.get("spans", []):
-                if "bold" in span.get("font", "").lower():
+        for line in block.lines:
+            for span in line.spans:
+                if "bold" in span.font.lower():
                     return True
 
         heading_patterns = [
@@ -2,14 +2,20 @@ import uvicorn
 import signal
 import sys
 import os
+import atexit
+
+from services.executor import shutdown_executor
 
 # グレースフルシャットダウンのためのシグナルハンドラー
 def signal_handler(sig, frame):
     print("\n[INFO] Shutting down server gracefully...")
+    shutdown_executor(wait=False)
     sys.exit(0)
 
 signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
+# uvicornのshutdownイベントを経由しない終了でもワーカープロセスを残さない
+atexit.register(shutdown_executor)
 
 if __name__ == "__main__":
     # 環境変数設定
@@ -18,6 +24,7 @@ if __name__ == "__main__":
     print("[INFO] Starting FastAPI server...")
     print(f"[INFO] Working directory: {os.getcwd()}")
     print("[INFO] Press Ctrl+C to stop the server")
+    print(f"[INFO] PDF worker processes: {os.getenv('PDF_WORKER_PROCESSES', 'auto')}")
     
     try:
         uvicorn.run(
@@ -38,4 +45,6 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"\n[ERROR] Server error: {e}")
     finally:
+        # 実行中の抽出タスクを待ってからワーカープロセスを停止
+        shutdown_executor()
         print("[INFO] Server shutdown complete")
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""開いたPDF（fitz.Document）のプロセス内キャッシュ
+
+fitz.open はxref・フォント・ページツリーを毎回解析するため、同じPDFに対して
+小さなページ範囲のリクエストが続くと、その準備処理が毎回繰り返される。
+ここでは内容のハッシュ（ドキュメントID）をキーに開いたドキュメントを保持し、
+件数とおおよそのメモリ量で古いものから閉じる。
+
+キャッシュはプロセスごとに持つ（ワーカープロセスではそれぞれのワーカーが保持する）。
+ドキュメントはファイルの内容をメモリに読み込んで開くため、元のファイルが
+削除されても（アップロード時の一時ファイルなど）キャッシュは有効なまま。
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import fitz
+
+logger = logging.getLogger(__name__)
+
+# 1プロセスあたりに保持するドキュメント数（0以下でキャッシュしない）
+PDF_DOCUMENT_CACHE_SIZE = int(os.getenv("PDF_DOCUMENT_CACHE_SIZE", "8"))
+
+# 1プロセスあたりに保持するドキュメントの合計サイズ（PDFファイルサイズで概算）
+PDF_DOCUMENT_CACHE_MAX_BYTES = int(os.getenv("PDF_DOCUMENT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+class DocumentCache:
+    """ドキュメントIDをキーにした fitz.Document のLRUキャッシュ"""
+
+    def __init__(self, max_documents: int, max_bytes: int):
+        """
+        Args:
+            max_documents: 保持するドキュメント数の上限
+            max_bytes: 保持するドキュメントの合計サイズの上限（バイト）
+        """
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+
+    def _evict(self):
+        """上限を超えた分を最終使用が古い順に破棄する（ロック取得済みで呼ぶ）"""
+        while self._entries and (len(self._entries) > self.max_documents or self._total_bytes > self.max_bytes):
+            document_id, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry["size"]
+            self.evictions += 1
+            entry["evicted"] = True
+            # 使用中のドキュメントは使い終わったときに閉じる
+            if entry["users"] == 0:
+                entry["document"].close()
+            logger.info(f"[document_cache] ドキュメントを破棄: {document_id[:12]}")
+
+    def _release(self, entry: Dict[str, Any]):
+        with self._lock:
+            entry["users"] -= 1
+            if entry["users"] == 0 and entry["evicted"]:
+                entry["document"].close()
+
+    @contextmanager
+    def open(self, pdf_path: str, document_id: Optional[str] = None) -> Iterator[fitz.Document]:
+        """
+        PDFを開く（キャッシュ済みの場合は開いたドキュメントを再利用する）
+
+        同じドキュメントを複数スレッドで同時に使わないよう、with ブロックの間は
+        ドキュメントごとのロックを保持する。ドキュメントは閉じたり変更したりしないこと。
+
+        Args:
+            pdf_path: PDFファイルのパス
+            document_id: PDF内容のハッシュ。Noneの場合はキャッシュせずに開いて閉じる
+
+        Yields:
+            fitz.Document: 開いたドキュメント
+        """
+        if document_id is None or self.max_documents <= 0:
+            pdf_document = fitz.open(pdf_path)
+            try:
+                yield pdf_document
+            finally:
+                pdf_document.close()
+            return
+
+        with self._lock:
+            entry = self._entries.get(document_id)
+            if entry is not None:
+                self._entries.move_to_end(document_id)
+                entry["users"] += 1
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is None:
+            with open(pdf_path, 'rb') as f:
+                data = f.read()
+            pdf_document = fitz.open(stream=data, filetype="pdf")
+
+            with self._lock:
+                entry = self._entries.get(document_id)
+                if entry is not None:
+                    # 別のスレッドが先に開いていた場合はそちらを使う
+                    entry["users"] += 1
+                    pdf_document.close()
+                else:
+                    entry = {
+                        "document": pdf_document,
+                        "size": len(data),
+                        "lock": threading.Lock(),
+                        "users": 1,
+                        "evicted": False
+                    }
+                    self._entries[document_id] = entry
+                    self._total_bytes += len(data)
+                    self._evict()
+            logger.info(f"[document_cache] ドキュメントを開きました: {document_id[:12]} ({len(data)}バイト, hits={self.hits}, misses={self.misses})")
+
+        try:
+            with entry["lock"]:
+                yield entry["document"]
+        finally:
+            self._release(entry)
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット・ミス数と現在の保持状況を返す"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "documents": len(self._entries),
+                "bytes": self._total_bytes
+            }
+
+    def clear(self):
+        """保持しているドキュメントをすべて破棄する"""
+        with self._lock:
+            self.max_documents, max_documents = 0, self.max_documents
+            self._evict()
+            self.max_documents = max_documents
+
+
+document_cache = DocumentCache(PDF_DOCUMENT_CACHE_SIZE, PDF_DOCUMENT_CACHE_MAX_BYTES)
+
+
+def open_pdf(pdf_path: str, document_id: Optional[str] = None):
+    """プロセス共通のキャッシュでPDFを開く（DocumentCache.open を参照）"""
+    return document_cache.open(pdf_path, document_id)
@@ -0,0 +1,239 @@
+"""アップロード済みPDFの保存と管理
+
+PDFは内容のSHA-256をIDとしてディスクに保存し、抽出・レイアウト解析の
+リクエストはIDで参照する。保存期間（TTL）と合計サイズの上限を超えた
+ドキュメントは最終アクセスが古いものから削除する。
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_ID_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def compute_document_id(data: bytes) -> str:
+    """PDFの内容からドキュメントID（SHA-256の16進表記）を計算する"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class DocumentStore:
+    """内容アドレス方式のPDF保存領域"""
+
+    def __init__(self, root_dir: str, ttl_seconds: float, max_bytes: int):
+        """
+        Args:
+            root_dir: 保存先ディレクトリ
+            ttl_seconds: 最終アクセスからの保存期間（秒）
+            max_bytes: 保存するPDFの合計サイズの上限（バイト）
+        """
+        self.root_dir = root_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._pins: Dict[str, int] = {}  # 処理中のドキュメント（削除対象から除外）
+
+        os.makedirs(root_dir, exist_ok=True)
+        self._load_index()
+
+    def _pdf_path(self, document_id: str) -> str:
+        return os.path.join(self.root_dir, f"{document_id}.pdf")
+
+    def _meta_path(self, document_id: str) -> str:
+        return os.path.join(self.root_dir, f"{document_id}.json")
+
+    def _load_index(self):
+        """起動時にディスク上のドキュメントからインデックスを復元する"""
+        for name in os.listdir(self.root_dir):
+            document_id, ext = os.path.splitext(name)
+            if ext == ".part":
+                # 書き込み途中で終了したファイル
+                try:
+                    os.remove(os.path.join(self.root_dir, name))
+                except OSError:
+                    pass
+                continue
+            if ext != ".json" or not DOCUMENT_ID_PATTERN.match(document_id):
+                continue
+            pdf_path = self._pdf_path(document_id)
+            try:
+                with open(self._meta_path(document_id), 'r', encoding='utf-8') as f:
+                    info = json.load(f)
+                info["last_access"] = os.path.getmtime(pdf_path)
+                self._documents[document_id] = info
+            except (OSError, ValueError) as e:
+                logger.warning(f"[document_store] インデックス復元をスキップ: {document_id[:12]} ({e})")
+                self._remove_files(document_id)
+
+        logger.info(f"[document_store] {len(self._documents)}件のドキュメントを復元しました: {self.root_dir}")
+        self.cleanup()
+
+    def _remove_files(self, document_id: str):
+        for path in (self._pdf_path(document_id), self._meta_path(document_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"[document_store] ファイル削除エラー: {path} ({e})")
+
+    def _public_info(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "document_id": info["document_id"],
+            "filename": info["filename"],
+            "size": info["size"],
+            "total_pages": info["total_pages"],
+            "expires_in": max(0, int(info["last_access"] + self.ttl_seconds - time.time()))
+        }
+
+    def put(self, source_path: str, document_id: str, filename: str, total_pages: int) -> Dict[str, Any]:
+        """
+        PDFファイルを保存領域に移動して登録する
+        
+        同じ内容が保存済みの場合は source_path を削除し、最終アクセス時刻だけを更新する。
+        ファイルの移動（別のファイルシステムの場合はコピー）はロックの外で行うため、
+        他のドキュメントの参照を待たせない。ブロックするため、イベントループからは
+        asyncio.to_thread で呼ぶ。
+
+        Args:
+            source_path: アップロードされたPDFの一時ファイル
+            document_id: compute_document_id で計算したドキュメントID
+            filename: 元のファイル名
+            total_pages: 総ページ数
+
+        Returns:
+            Dict[str, Any]: ドキュメント情報
+        """
+        with self._lock:
+            info = self._documents.get(document_id)
+            if info is not None:
+                self._touch(info, time.time())
+
+        if info is not None:
+            os.remove(source_path)
+            return self._public_info(info)
+
+        size = os.path.getsize(source_path)
+        # 一時ファイルに移してから置き換えることで、書きかけのファイルを参照させない
+        fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix=".part")
+        os.close(fd)
+        shutil.move(source_path, tmp_path)
+
+        with self._lock:
+            now = time.time()
+            info = self._documents.get(document_id)
+            if info is None:
+                # 同じディレクトリ内の置き換えなのでロック中でもすぐに終わる
+                os.replace(tmp_path, self._pdf_path(document_id))
+                info = {
+                    "document_id": document_id,
+                    "filename": filename,
+                    "size": size,
+                    "total_pages": total_pages,
+                    "created_at": now
+                }
+                with open(self._meta_path(document_id), 'w', encoding='utf-8') as f:
+                    json.dump(info, f, ensure_ascii=False)
+                self._documents[document_id] = info
+                logger.info(f"[document_store] ドキュメントを保存: {document_id[:12]} ({filename}, {size}バイト)")
+            else:
+                # 移動中に同じ内容が別のリクエストで保存された
+                os.remove(tmp_path)
+            self._touch(info, now)
+
+        self.cleanup()
+        return self._public_info(info)
+
+    def _touch(self, info: Dict[str, Any], now: float):
+        info["last_access"] = now
+        try:
+            os.utime(self._pdf_path(info["document_id"]), (now, now))
+        except OSError:
+            pass
+
+    def _lookup(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """有効なドキュメントを探して最終アクセス時刻を更新する（ロック取得済みで呼ぶ）"""
+        if not DOCUMENT_ID_PATTERN.match(document_id):
+            return None
+
+        now = time.time()
+        info = self._documents.get(document_id)
+        if info is None or now - info["last_access"] > self.ttl_seconds:
+            return None
+        self._touch(info, now)
+        return info
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        ドキュメント情報を取得する（期限切れ・未登録の場合はNone）
+        """
+        with self._lock:
+            info = self._lookup(document_id)
+            return self._public_info(info) if info else None
+
+    @contextmanager
+    def open(self, document_id: str) -> Iterator[Optional[str]]:
+        """
+        処理中に削除されないよう固定した状態でPDFのパスを取得する
+
+        Yields:
+            Optional[str]: PDFファイルのパス（期限切れ・未登録の場合はNone）
+        """
+        with self._lock:
+            if self._lookup(document_id) is None:
+                info = None
+            else:
+                info = self._documents[document_id]
+                self._pins[document_id] = self._pins.get(document_id, 0) + 1
+
+        if info is None:
+            yield None
+            return
+
+        try:
+            yield self._pdf_path(document_id)
+        finally:
+            with self._lock:
+                self._pins[document_id] -= 1
+                if self._pins[document_id] <= 0:
+                    del self._pins[document_id]
+
+    def delete(self, document_id: str) -> bool:
+        """ドキュメントを削除する（処理中の場合は削除しない）"""
+        with self._lock:
+            if document_id not in self._documents or document_id in self._pins:
+                return False
+            del self._documents[document_id]
+            self._remove_files(document_id)
+        logger.info(f"[document_store] ドキュメントを削除: {document_id[:12]}")
+        return True
+
+    def cleanup(self):
+        """期限切れのドキュメントと、合計サイズの上限を超えた分を古い順に削除する"""
+        now = time.time()
+        with self._lock:
+            # 最終アクセスが古い順
+            candidates = sorted(self._documents.values(), key=lambda info: info["last_access"])
+            total_bytes = sum(info["size"] for info in candidates)
+
+            for info in candidates:
+                document_id = info["document_id"]
+                expired = now - info["last_access"] > self.ttl_seconds
+                if not expired and total_bytes <= self.max_bytes:
+                    continue
+                if document_id in self._pins:
+                    continue
+                del self._documents[document_id]
+                self._remove_files(document_id)
+                total_bytes -= info["size"]
+                logger.info(f"[document_store] ドキュメントを破棄: {document_id[:12]} ({'期限切れ' if expired else 'サイズ上限'})")
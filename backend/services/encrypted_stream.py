@@ -0,0 +1,109 @@
+"""抽出結果をレコードごとにAES-GCMで暗号化して返すストリーミング処理
+
+全ページの結果をまとめて暗号化する代わりに、ストリームの1レコード（"page", "done", "error"）ごとに
+独立したAES-GCMのフレームとして暗号化する。サーバーが保持するのは1レコード分だけで、
+クライアントは受信したフレームから順に復号できる。
+
+フレームの形式（バイナリ、ビッグエンディアン）:
+    [暗号文+認証タグの長さ: 4バイト][nonce: 12バイト][暗号文][認証タグ: 16バイト]
+
+nonce はストリームごとのランダムな8バイトとフレームの通し番号（4バイト、0から）を連結したもの。
+平文は {"type": レコードの種類, "data": レコードの内容} のUTF-8のJSON。
+クライアントは nonce の先頭8バイトが最初のフレームと同じであること、通し番号が0から順に続くこと、
+最後のレコードが "done" または "error" であることを確認する
+（別のストリームのフレームの混入・フレームの入れ替え・途中での切断の検出）。
+"""
+import base64
+import json
+import os
+import struct
+from typing import Any, Dict, List
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from services.serialization import dumps
+
+ENCRYPTED_STREAM_MEDIA_TYPE = "application/octet-stream"
+
+FRAME_LENGTH = struct.Struct(">I")
+NONCE_PREFIX_SIZE = 8
+NONCE_SIZE = 12
+TAG_SIZE = 16
+MAX_FRAMES = 2 ** 32
+
+
+def load_user_key(user_key: str) -> bytes:
+    """
+    クライアントの暗号化キー（Base64）をAESのキーにする（/api/extract-text-encrypted と同じく先頭32バイト）
+
+    Raises:
+        ValueError: Base64として不正な場合、またはAESのキー長（16/24/32バイト）にならない場合
+    """
+    try:
+        key_bytes = base64.b64decode(user_key, validate=True)[:32]
+    except Exception:
+        raise ValueError("暗号化キーがBase64ではありません")
+    if len(key_bytes) not in (16, 24, 32):
+        raise ValueError(f"暗号化キーの長さが不正です（{len(key_bytes)}バイト）")
+    return key_bytes
+
+
+class FrameEncryptor:
+    """1つのストリームのレコードを順にフレームとして暗号化する"""
+
+    def __init__(self, key: bytes):
+        self.key = key
+        self.nonce_prefix = os.urandom(NONCE_PREFIX_SIZE)
+        self.frame_count = 0
+
+    def seal(self, event: str, data: Dict[str, Any]) -> bytes:
+        """
+        1レコードを暗号化したフレームを返す
+
+        Args:
+            event: レコードの種類（"page", "done", "error"）
+            data: レコードの内容
+        """
+        if self.frame_count >= MAX_FRAMES:
+            raise ValueError("1つのストリームで暗号化できるフレーム数を超えました")
+        nonce = self.nonce_prefix + self.frame_count.to_bytes(NONCE_SIZE - NONCE_PREFIX_SIZE, "big")
+        self.frame_count += 1
+
+        plaintext = dumps({"type": event, "data": data})
+        encryptor = Cipher(algorithms.AES(self.key), modes.GCM(nonce), backend=default_backend()).encryptor()
+        ciphertext = encryptor.update(plaintext) + encryptor.finalize()
+        return FRAME_LENGTH.pack(len(ciphertext) + TAG_SIZE) + nonce + ciphertext + encryptor.tag
+
+
+def decrypt_frames(key: bytes, data: bytes) -> List[Dict[str, Any]]:
+    """
+    暗号化ストリーム全体を復号してレコードのリストを返す（テスト・Pythonクライアント用）
+
+    Raises:
+        ValueError: フレームが途中で切れている場合、通し番号が連続していない場合
+        cryptography.exceptions.InvalidTag: 認証に失敗した場合
+    """
+    records = []
+    nonce_prefix = None
+    offset = 0
+    while offset < len(data):
+        if offset + FRAME_LENGTH.size + NONCE_SIZE > len(data):
+            raise ValueError("フレームが途中で切れています")
+        (length,) = FRAME_LENGTH.unpack_from(data, offset)
+        offset += FRAME_LENGTH.size
+        nonce = data[offset:offset + NONCE_SIZE]
+        offset += NONCE_SIZE
+        if length < TAG_SIZE or offset + length > len(data):
+            raise ValueError("フレームが途中で切れています")
+
+        if nonce_prefix is None:
+            nonce_prefix = nonce[:NONCE_PREFIX_SIZE]
+        if nonce[:NONCE_PREFIX_SIZE] != nonce_prefix or int.from_bytes(nonce[NONCE_PREFIX_SIZE:], "big") != len(records):
+            raise ValueError("フレームの順序が不正です")
+
+        ciphertext, tag = data[offset:offset + length - TAG_SIZE], data[offset + length - TAG_SIZE:offset + length]
+        offset += length
+        decryptor = Cipher(algorithms.AES(key), modes.GCM(nonce, tag), backend=default_backend()).decryptor()
+        records.append(json.loads(decryptor.update(ciphertext) + decryptor.finalize()))
+    return records
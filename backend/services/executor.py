@@ -0,0 +1,112 @@
+"""PDF処理用ワーカープロセスプールの管理
+
+PyMuPDFによる解析やレイアウト処理はCPUを占有するため、イベントループ上で
+実行するとヘルスチェックを含む全リクエストが止まってしまう。ここでは
+ProcessPoolExecutorを1つ保持し、ページ抽出処理をワーカープロセスで実行する。
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# ワーカープロセス数（0以下の場合はプロセスプールを使わずスレッドで実行）
+PDF_WORKER_PROCESSES = int(os.getenv("PDF_WORKER_PROCESSES", str(min(4, os.cpu_count() or 1))))
+
+# 1ワーカーあたりの最大タスク数（到達したワーカーは再起動してメモリを解放する。0で無制限）
+PDF_WORKER_MAX_TASKS = int(os.getenv("PDF_WORKER_MAX_TASKS", "50"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker():
+    """ワーカープロセスの初期化"""
+    # Ctrl+Cは親プロセスがまとめて処理する（ワーカーは親からのシャットダウンで終了）
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    共有のプロセスプールを取得する（未作成の場合は作成する）
+
+    Returns:
+        Optional[ProcessPoolExecutor]: プロセスプール（PDF_WORKER_PROCESSES が0以下の場合はNone）
+    """
+    global _executor
+
+    if PDF_WORKER_PROCESSES <= 0:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            # forkはイベントループのスレッドやPyMuPDFの状態を引き継いでしまうためspawnを使う
+            _executor = ProcessPoolExecutor(
+                max_workers=PDF_WORKER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                max_tasks_per_child=PDF_WORKER_MAX_TASKS if PDF_WORKER_MAX_TASKS > 0 else None
+            )
+            logger.info(f"[executor] ワーカープロセスプールを作成: workers={PDF_WORKER_PROCESSES}, max_tasks_per_child={PDF_WORKER_MAX_TASKS}")
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor):
+    """壊れたプロセスプールを破棄する（次回の get_executor で再作成される）"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_in_worker(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    関数をワーカープロセスで実行し、結果を待つ
+
+    func はモジュールのトップレベル関数で、引数と戻り値はpickle可能である必要がある。
+
+    Args:
+        func: 実行する関数
+        *args, **kwargs: func に渡す引数
+
+    Returns:
+        Any: func の戻り値
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+
+    try:
+        return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+    except BrokenProcessPool:
+        # ワーカーが異常終了した場合（MuPDFのクラッシュなど）はプールを作り直す
+        logger.error(f"[executor] ワーカープロセスが異常終了しました: {getattr(func, '__name__', func)}")
+        if executor is not None:
+            _discard_executor(executor)
+        raise
+
+
+def shutdown_executor(wait: bool = True):
+    """
+    プロセスプールを停止する（複数回呼び出しても安全）
+
+    Args:
+        wait: 実行中のタスクとワーカーの終了を待つか
+    """
+    global _executor
+
+    with _executor_lock:
+        executor = _executor
+        _executor = None
+
+    if executor is not None:
+        logger.info("[executor] ワーカープロセスプールを停止します")
+        executor.shutdown(wait=wait, cancel_futures=True)
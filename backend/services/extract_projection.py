@@ -0,0 +1,95 @@
+"""抽出結果の応答に含める項目の選択とブロックの列形式への変換
+
+ページの blocks（bbox・text・font_size・is_bold）はページの text と同じ文字列を持ち、
+full_text もすべてのページのテキストを繰り返すため、Markdown だけが必要なクライアントにも
+ジオメトリを含む大きな応答を返すことになる。detail で応答に含める項目を選び、
+block_format="columnar" ではブロックを辞書の配列ではなく項目ごとの配列で返す。
+"""
+from typing import Any, Dict, List
+
+# 応答に含める項目（APIの detail パラメータの値）
+DETAIL_TEXT = "text"      # total_pages と full_text のみ
+DETAIL_PAGES = "pages"    # total_pages と extracted_pages（blocks なし）のみ
+DETAIL_BLOCKS = "blocks"  # すべて（従来の応答）
+
+# ブロックの形式（APIの block_format パラメータの値）
+BLOCK_FORMAT_OBJECTS = "objects"    # ブロックごとの辞書の配列（従来の形式）
+BLOCK_FORMAT_COLUMNAR = "columnar"  # 項目ごとの配列
+
+
+def columnar_blocks(blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    ブロックのリストを項目ごとの配列にする
+
+    Returns:
+        Dict[str, Any]: {
+            "x0", "y0", "x1", "y1", "font_size", "is_bold": ブロックの順の配列,
+            "text": ブロックのテキストを連結した文字列,
+            "text_offsets": i 番目のブロックのテキストは text[text_offsets[i]:text_offsets[i + 1]]
+        }
+
+    オフセットはクライアント（TypeScript の String.slice）に合わせてUTF-16のコード単位で数える。
+    サロゲートペアになる文字（𠮷 などのCJK統合漢字拡張B、絵文字）は2単位になる。
+    """
+    columns = {"x0": [], "y0": [], "x1": [], "y1": [], "font_size": [], "is_bold": []}
+    texts = []
+    text_offsets = [0]
+    for block in blocks:
+        x0, y0, x1, y1 = block["bbox"]
+        columns["x0"].append(x0)
+        columns["y0"].append(y0)
+        columns["x1"].append(x1)
+        columns["y1"].append(y1)
+        columns["font_size"].append(block["font_size"])
+        columns["is_bold"].append(block["is_bold"])
+        texts.append(block["text"])
+        text_offsets.append(text_offsets[-1] + len(block["text"].encode("utf-16-le")) // 2)
+    columns["text"] = "".join(texts)
+    columns["text_offsets"] = text_offsets
+    return columns
+
+
+def project_page(page_data: Dict[str, Any], detail: str, block_format: str = BLOCK_FORMAT_OBJECTS) -> Dict[str, Any]:
+    """
+    1ページ分の抽出結果（PageText 相当の辞書）から応答に含める項目を選ぶ
+
+    キャッシュの辞書を共有しているため、変更する場合はコピーを返す。
+    """
+    if detail == DETAIL_PAGES:
+        return {key: value for key, value in page_data.items() if key != "blocks"}
+    if block_format == BLOCK_FORMAT_COLUMNAR:
+        return dict(page_data, blocks=columnar_blocks(page_data["blocks"]))
+    return page_data
+
+
+def project_extract_result(
+    result: Dict[str, Any],
+    detail: str = DETAIL_BLOCKS,
+    block_format: str = BLOCK_FORMAT_OBJECTS
+) -> Dict[str, Any]:
+    """
+    抽出結果（ExtractResponse と同じ形式の辞書）から応答に含める項目を選ぶ
+
+    detail が "text" の場合は total_pages と full_text、"pages" の場合は total_pages と
+    blocks を除いた extracted_pages を返す（include_layout の layout はどちらでも含める）。
+    "blocks" の場合はすべての項目を返し、block_format に従ってブロックを変換する。
+    """
+    if detail == DETAIL_BLOCKS and block_format == BLOCK_FORMAT_OBJECTS:
+        return result
+
+    if detail == DETAIL_TEXT:
+        projected = {"total_pages": result["total_pages"], "full_text": result["full_text"]}
+    elif detail == DETAIL_PAGES:
+        projected = {
+            "total_pages": result["total_pages"],
+            "extracted_pages": [project_page(page, detail) for page in result["extracted_pages"]]
+        }
+    else:
+        projected = dict(
+            result,
+            extracted_pages=[project_page(page, detail, block_format) for page in result["extracted_pages"]]
+        )
+
+    if result.get("layout") is not None:
+        projected["layout"] = result["layout"]
+    return projected
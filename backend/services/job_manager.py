@@ -0,0 +1,344 @@
+"""バックグラウンドジョブによる抽出・レイアウト解析
+
+大きなページ範囲の処理を1つのHTTPリクエストで待たずに済むよう、処理をジョブとして
+受け付けてバックグラウンドで実行する。クライアントは進捗（完了ページ数・残り時間の目安）を
+問い合わせ、完了したページの結果を少しずつ取得できる。
+
+ジョブの状態（{job_id}.json）と完了したページの結果（{job_id}.ndjson、1行1ページ）は
+ディスクに保存し、サーバーの再起動で中断されたジョブは起動時に続きのページから再開する。
+"""
+import asyncio
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.executor import PDF_WORKER_PROCESSES
+from services.parallel_extractor import PDF_SHARD_MIN_PAGES
+from services.page_cache import extract_page_range_cached, analyze_page_range_cached
+
+logger = logging.getLogger(__name__)
+
+# 1回に処理するページ数（このページ数ごとに結果を保存する）
+JOB_CHUNK_PAGES = int(os.getenv("JOB_CHUNK_PAGES", str(max(1, PDF_WORKER_PROCESSES) * PDF_SHARD_MIN_PAGES)))
+
+JOB_KINDS = ("extract", "analyze")
+
+# 終了したジョブの状態
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+# キャンセルを受け付け、実行中の処理の停止を待っているジョブの状態
+CANCELLING_STATUS = "cancelling"
+
+# クライアントに返すジョブ情報の項目
+_PUBLIC_FIELDS = (
+    "job_id", "kind", "document_id", "filename", "page_ranges", "options",
+    "status", "pages_total", "pages_done", "error", "created_at", "updated_at"
+)
+
+
+class JobManager:
+    """ジョブの受付・実行・進捗管理"""
+
+    def __init__(self, root_dir: str, document_store, ttl_seconds: float, max_concurrent: int):
+        """
+        Args:
+            root_dir: ジョブの状態と結果の保存先ディレクトリ
+            document_store: 処理するPDFを保持する DocumentStore
+            ttl_seconds: 終了したジョブを保持する秒数
+            max_concurrent: 同時に実行するジョブ数
+        """
+        self.root_dir = root_dir
+        self.document_store = document_store
+        self.ttl_seconds = ttl_seconds
+        self.max_concurrent = max(1, max_concurrent)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._shutting_down = False
+        self._save_lock = threading.Lock()
+
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(self.root_dir, f"{job_id}.json")
+
+    def _results_path(self, job_id: str) -> str:
+        return os.path.join(self.root_dir, f"{job_id}.ndjson")
+
+    def _save(self, job: Dict[str, Any]):
+        """ジョブの状態を保存する（書きかけのファイルを残さないよう置き換えで書き込む）"""
+        with self._save_lock:
+            job["updated_at"] = time.time()
+            state = {field: job[field] for field in _PUBLIC_FIELDS}
+            tmp_path = self._state_path(job["job_id"]) + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self._state_path(job["job_id"]))
+
+    def _remove_files(self, job_ids: List[str]):
+        """ジョブの状態と結果のファイルを削除する"""
+        for job_id in job_ids:
+            for path in (self._state_path(job_id), self._results_path(job_id)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _load_results_index(self, job: Dict[str, Any]):
+        """結果ファイルの各行の開始位置を読み込む（書きかけの最終行は切り捨てる）"""
+        offsets = []
+        results_path = self._results_path(job["job_id"])
+        if os.path.exists(results_path):
+            with open(results_path, 'rb+') as f:
+                position = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    offsets.append(position)
+                    position += len(line)
+                f.truncate(position)
+        job["_offsets"] = offsets
+        job["pages_done"] = len(offsets)
+
+    def _load(self) -> List[Dict[str, Any]]:
+        """保存済みのジョブを読み込み、再開するジョブを返す"""
+        now = time.time()
+        resumable = []
+        for name in os.listdir(self.root_dir):
+            if not name.endswith(".json"):
+                continue
+            job_id = name[:-len(".json")]
+            try:
+                with open(self._state_path(job_id), 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"[job_manager] ジョブの読み込みをスキップ: {job_id} ({e})")
+                continue
+
+            if job["status"] in FINISHED_STATUSES and now - job["updated_at"] > self.ttl_seconds:
+                self._remove_files([job_id])
+                continue
+
+            self._load_results_index(job)
+            self._jobs[job_id] = job
+            if job["status"] not in FINISHED_STATUSES:
+                resumable.append(job)
+
+        logger.info(f"[job_manager] {len(self._jobs)}件のジョブを読み込みました（再開: {len(resumable)}件）")
+        return resumable
+
+    async def start(self):
+        """保存済みのジョブを読み込み、中断されたジョブを再開する（起動時に呼ぶ）"""
+        for job in await asyncio.to_thread(self._load):
+            logger.info(f"[job_manager] ジョブを再開: {job['job_id']} ({job['pages_done']}/{job['pages_total']}ページ完了)")
+            self._schedule(job)
+
+    async def shutdown(self):
+        """実行中のジョブを止める（状態は実行中のまま残し、次回の起動時に再開する）"""
+        self._shutting_down = True
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(
+        self,
+        kind: str,
+        document_id: str,
+        filename: str,
+        page_ranges: List[Tuple[int, int]],
+        options: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        ジョブを登録して実行を開始する
+
+        Args:
+            kind: "extract"（テキスト抽出）または "analyze"（レイアウト解析）
+            document_id: DocumentStore に保存済みのドキュメントID
+            filename: 元のファイル名
+            page_ranges: 総ページ数で切り詰めた (開始ページ, 終了ページ) のリスト
+            options: テキスト抽出のオプション（extract_page_range の引数名と値）
+
+        Returns:
+            Dict[str, Any]: ジョブ情報
+        """
+        await asyncio.to_thread(self._remove_files, self._pop_expired())
+        now = time.time()
+        job = {
+            "job_id": secrets.token_hex(12),
+            "kind": kind,
+            "document_id": document_id,
+            "filename": filename,
+            "page_ranges": [list(page_range) for page_range in page_ranges],
+            "options": options,
+            "status": "queued",
+            "pages_total": sum(end - start + 1 for start, end in page_ranges),
+            "pages_done": 0,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "_offsets": []
+        }
+        await asyncio.to_thread(self._save, job)
+        self._jobs[job["job_id"]] = job
+        self._schedule(job)
+        logger.info(f"[job_manager] ジョブを登録: {job['job_id']} ({kind}, {filename}, {job['pages_total']}ページ)")
+        return self._public_info(job)
+
+    def _pop_expired(self) -> List[str]:
+        """保持期間を過ぎた終了済みのジョブを一覧から外し、そのジョブIDを返す（ファイルは _remove_files で削除する）"""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in FINISHED_STATUSES and now - job["updated_at"] > self.ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return expired
+
+    def _schedule(self, job: Dict[str, Any]):
+        job["_run_started_at"] = None
+        job["_run_start_pages"] = job["pages_done"]
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job["job_id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["job_id"], None))
+
+    def _remaining_chunks(self, job: Dict[str, Any]) -> List[Tuple[int, int]]:
+        """未処理のページを JOB_CHUNK_PAGES ごとの (開始ページ, 終了ページ) に分ける"""
+        skip = job["pages_done"]
+        chunks = []
+        for start, end in job["page_ranges"]:
+            page_count = end - start + 1
+            if skip >= page_count:
+                skip -= page_count
+                continue
+            start += skip
+            skip = 0
+            for chunk_start in range(start, end + 1, JOB_CHUNK_PAGES):
+                chunks.append((chunk_start, min(chunk_start + JOB_CHUNK_PAGES - 1, end)))
+        return chunks
+
+    def _compute_func(self, job: Dict[str, Any], pdf_path: str) -> Callable:
+        if job["kind"] == "extract":
+            return lambda start, end: extract_page_range_cached(
+                pdf_path, start, end, document_id=job["document_id"], **job["options"]
+            )
+        return lambda start, end: analyze_page_range_cached(pdf_path, start, end, job["document_id"])
+
+    def _append_results(self, job: Dict[str, Any], pages: List[Dict[str, Any]]):
+        """完了したページの結果を追記し、状態を保存する"""
+        new_offsets = []
+        with open(self._results_path(job["job_id"]), 'ab') as f:
+            position = f.seek(0, os.SEEK_END)
+            for page_data in pages:
+                line = (json.dumps(page_data, ensure_ascii=False) + "\n").encode('utf-8')
+                f.write(line)
+                new_offsets.append(position)
+                position += len(line)
+        # 書き込みが終わってから結果の取得対象にする
+        job["_offsets"].extend(new_offsets)
+        job["pages_done"] = len(job["_offsets"])
+        self._save(job)
+
+    async def _run(self, job: Dict[str, Any]):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        async with self._semaphore:
+            if job["status"] in FINISHED_STATUSES:
+                return
+            job["status"] = "running"
+            job["_run_started_at"] = time.time()
+
+            try:
+                await asyncio.to_thread(self._save, job)
+
+                # 実行中はドキュメントを削除しない
+                with self.document_store.open(job["document_id"]) as pdf_path:
+                    if pdf_path is None:
+                        raise RuntimeError("ドキュメントが見つかりません（期限切れの可能性があります）")
+                    compute = self._compute_func(job, pdf_path)
+
+                    for chunk_start, chunk_end in self._remaining_chunks(job):
+                        result = await compute(chunk_start, chunk_end)
+                        await asyncio.to_thread(self._append_results, job, result["pages"])
+
+                job["status"] = "completed"
+                logger.info(f"[job_manager] ジョブ完了: {job['job_id']} ({job['pages_done']}ページ)")
+            except asyncio.CancelledError:
+                if self._shutting_down and job["status"] != CANCELLING_STATUS:
+                    # 状態は実行中のまま残し、次回の起動時に再開する
+                    logger.info(f"[job_manager] ジョブを中断: {job['job_id']} ({job['pages_done']}/{job['pages_total']}ページ完了)")
+                    raise
+                job["status"] = "cancelled"
+                logger.info(f"[job_manager] ジョブをキャンセル: {job['job_id']}")
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                logger.error(f"[job_manager] ジョブ失敗: {job['job_id']} ({str(e)})")
+
+            await asyncio.to_thread(self._save, job)
+
+    def _public_info(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        info = {field: job[field] for field in _PUBLIC_FIELDS}
+
+        # 今回の実行での処理速度から残り時間を見積もる
+        eta_seconds = None
+        run_started_at = job.get("_run_started_at")
+        pages_this_run = job["pages_done"] - job.get("_run_start_pages", 0)
+        if job["status"] == "running" and run_started_at and pages_this_run > 0:
+            seconds_per_page = (time.time() - run_started_at) / pages_this_run
+            eta_seconds = round(seconds_per_page * (job["pages_total"] - job["pages_done"]), 1)
+        info["eta_seconds"] = eta_seconds
+        return info
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """ジョブ情報を取得する（存在しない場合はNone）"""
+        job = self._jobs.get(job_id)
+        return self._public_info(job) if job else None
+
+    def read_results(self, job_id: str, offset: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        完了したページの結果を offset 番目（0始まり、ページ順）から最大 limit 件取得する
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: ページ結果のリスト（ジョブが存在しない場合はNone）
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        offsets = job["_offsets"][offset:offset + limit]
+        if not offsets:
+            return []
+
+        pages = []
+        with open(self._results_path(job_id), 'rb') as f:
+            f.seek(offsets[0])
+            for _ in offsets:
+                pages.append(json.loads(f.readline()))
+        return pages
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        ジョブをキャンセルする（終了済みの場合は何もしない）
+
+        実行中のジョブは処理中のページ範囲が止まるまで "cancelling" を返し、
+        止まった時点で "cancelled" になる。
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        if job["status"] not in FINISHED_STATUSES and job["status"] != CANCELLING_STATUS:
+            task = self._tasks.get(job_id)
+            if task is not None and job["status"] == "running":
+                job["status"] = CANCELLING_STATUS
+                task.cancel()
+            else:
+                # 実行待ちのジョブは実行されないよう先に状態を変える
+                job["status"] = "cancelled"
+                await asyncio.to_thread(self._save, job)
+        return self._public_info(job)
@@ -0,0 +1,237 @@
+"""ページ単位のレイアウト解析処理"""
+import fitz
+from typing import Dict, Any, Optional
+import logging
+from pdf_processor import PDFProcessor
+from common import assign_blocks_to_column_regions, extract_block_text, xy_cut, PageTextContext
+from common.reading_order import READING_ORDER_HEURISTIC, READING_ORDER_XY_CUT
+from services.document_cache import open_pdf
+from services.page_extractor import extract_page_data
+
+logger = logging.getLogger(__name__)
+
+
+def analyze_page_layout(
+    page: fitz.Page,
+    page_num: int,
+    processor: PDFProcessor,
+    text_page: Optional[PageTextContext] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Dict[str, Any]:
+    """
+    /api/analyze-layout の1ページ分の領域情報を計算する
+    
+    ヘッダー・フッター境界、余白、カラム領域とカラムごとのブロック数だけを求め、
+    テキストの組み立てやスタイルの解析は行わない（PDFProcessor.analyze_page_geometry）。
+    ヘッダー・フッターはこのページだけから検出する（ドキュメント共通の領域は使わない）。
+    
+    Args:
+        text_page: ページの PageTextContext（同じページの他の処理と解析結果を共有する場合に指定）
+        reading_order: 読み順の決定方法。"xycut" の場合は XYカットで続けて読むまとまりを columns に入れ、
+            読み順の木を regions.reading_order に入れる
+    
+    Returns:
+        Dict[str, Any]: ページ番号・サイズと header/footer/vertical_gaps/columns 領域を持つ辞書
+    """
+    page_width = page.rect.width
+    page_height = page.rect.height
+    
+    # PDFProcessorで幾何情報だけを計算（テキストは組み立てない）
+    structure = processor.analyze_page_geometry(page, text_page=text_page)
+    
+    header_boundary = structure["header_boundary"]
+    footer_boundary = structure["footer_boundary"]
+    header_blocks = structure["raw_header_blocks"]
+    footer_blocks = structure["raw_footer_blocks"]
+    main_blocks = structure["raw_main_blocks"]
+    vertical_gaps = structure["vertical_gaps"]
+    
+    # ヘッダー・フッター領域のサイズを計算
+    header_region_height = header_boundary
+    if header_blocks:
+        max_bottom = max(b.bbox[3] for b in header_blocks)
+        header_region_height = max_bottom + 10
+    
+    # フッター領域の計算
+    footer_region_y = footer_boundary
+    footer_region_height = page_height - footer_boundary
+    if footer_blocks:
+        footer_top_y = min(b.bbox[1] for b in footer_blocks)
+        footer_region_y = footer_top_y - 10
+        footer_region_height = page_height - footer_region_y
+    
+    # 領域情報をまとめる
+    page_info = {
+        "page_number": page_num + 1,
+        "width": page_width,
+        "height": page_height,
+        "regions": {
+            "header": {
+                "x": 0,
+                "y": 0,
+                "width": page_width,
+                "height": header_region_height,
+                "detected": len(header_blocks) > 0,
+                "text": "\n".join(extract_block_text(b) for b in header_blocks),
+                "block_count": len(header_blocks)
+            },
+            "footer": {
+                "x": 0,
+                "y": footer_region_y,
+                "width": page_width,
+                "height": footer_region_height,
+                "detected": len(footer_blocks) > 0,
+                "text": "\n".join(extract_block_text(b) for b in footer_blocks),
+                "block_count": len(footer_blocks)
+            },
+            "vertical_gaps": vertical_gaps,
+            "columns": []
+        }
+    }
+    
+    if reading_order == READING_ORDER_XY_CUT:
+        reading_order_tree = xy_cut(main_blocks)
+        # XYカットの読み順で続けて読むまとまりをカラムとして返す
+        page_info["regions"]["reading_order"] = reading_order_tree.to_dict() if reading_order_tree else None
+        if reading_order_tree:
+            columns = []
+            for i, segment in enumerate(reading_order_tree.segments()):
+                x0 = min(main_blocks[j].bbox[0] for j in segment)
+                y0 = min(main_blocks[j].bbox[1] for j in segment)
+                x1 = max(main_blocks[j].bbox[2] for j in segment)
+                y1 = max(main_blocks[j].bbox[3] for j in segment)
+                columns.append({
+                    "x": x0,
+                    "y": y0,
+                    "width": x1 - x0,
+                    "height": y1 - y0,
+                    "block_count": len(segment),
+                    "column_number": i + 1
+                })
+            page_info["regions"]["columns"] = columns
+    # PDFProcessorが検出した余白がある場合はカラム情報を計算
+    elif vertical_gaps:
+        # カラム領域を取得（PDFProcessorが余白と一緒に計算済み）
+        columns_base = structure["columns"]
+        
+        # ブロックをカラムに割り当て
+        column_blocks_list = assign_blocks_to_column_regions(main_blocks, columns_base, vertical_gaps)
+        
+        # column_numberとblock_countを追加
+        columns = []
+        for i, column_base in enumerate(columns_base):
+            column = column_base.copy()
+            # 対応するブロックリストを見つける（assign_blocks_to_column_regionsが空カラムを保持するように修正済み）
+            column_blocks = column_blocks_list[i] if i < len(column_blocks_list) else []
+            column["block_count"] = len(column_blocks)
+            column["column_number"] = i + 1
+            columns.append(column)
+        
+        page_info["regions"]["columns"] = columns
+    
+    return page_info
+
+
+def analyze_page_range(
+    pdf_path: str,
+    start_page: int,
+    end_page: Optional[int],
+    document_id: Optional[str] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Dict[str, Any]:
+    """
+    PDFファイルを開いて指定範囲のページのレイアウトを解析する
+    
+    ワーカープロセスから呼び出せるよう、引数と戻り値はpickle可能な値のみを使う。
+    document_id（PDF内容のハッシュ）を指定すると、開いたドキュメントをプロセス内でキャッシュする。
+    reading_order は読み順の決定方法（"heuristic" または "xycut"）。
+    
+    Returns:
+        Dict[str, Any]: {"total_pages": 総ページ数, "pages": analyze_page_layout の戻り値のリスト}
+    """
+    with open_pdf(pdf_path, document_id) as pdf_document:
+        # ページ範囲の調整
+        total_pages = len(pdf_document)
+        start_idx = max(0, start_page - 1)
+        end_idx = min(total_pages, end_page if end_page else total_pages)
+        
+        layout_info = {
+            "total_pages": total_pages,
+            "pages": []
+        }
+        
+        # PDFProcessorのインスタンスを作成
+        processor = PDFProcessor()
+        
+        for page_num in range(start_idx, end_idx):
+            layout_info["pages"].append(analyze_page_layout(
+                pdf_document[page_num], page_num, processor, reading_order=reading_order
+            ))
+    
+    return layout_info
+
+
+def extract_and_analyze_page_range(
+    pdf_path: str,
+    start_page: int,
+    end_page: Optional[int],
+    preserve_layout: bool,
+    apply_formatting: bool,
+    remove_headers_footers: bool,
+    header_threshold_percent: float,
+    footer_threshold_percent: float,
+    document_id: Optional[str] = None,
+    style_stats: Optional[Dict[str, float]] = None,
+    header_footer_regions: Optional[Dict] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Dict[str, Any]:
+    """
+    指定範囲のページのテキスト抽出とレイアウト解析を、1ページにつき1回の解析で行う
+    
+    ページごとに PageTextContext と PDFProcessor を共有して extract_page_data と
+    analyze_page_layout を実行する。引数は extract_page_range と同じ。
+    header_footer_regions はテキスト抽出だけに使い、レイアウト解析は analyze_page_range と同じく
+    ページごとにヘッダー・フッターを検出する。
+    ページ範囲の並列処理（_run_sharded）で分割できるよう、ページごとの結果は pages に入れて返す。
+    
+    Returns:
+        Dict[str, Any]: {
+            "total_pages": 総ページ数,
+            "end_page": 調整後の終了ページ,
+            "pages": [{"page": extract_page_data の戻り値, "layout": analyze_page_layout の戻り値}, ...]
+        }
+    """
+    with open_pdf(pdf_path, document_id) as pdf_document:
+        total_pages = len(pdf_document)
+        if end_page is None or end_page > total_pages:
+            end_page = total_pages
+        
+        processor = PDFProcessor()
+        pages = []
+        for page_num in range(max(0, start_page - 1), end_page):
+            page = pdf_document[page_num]
+            text_page = PageTextContext(page)
+            pages.append({
+                "page": extract_page_data(
+                    page,
+                    page_num,
+                    preserve_layout,
+                    apply_formatting,
+                    remove_headers_footers,
+                    header_threshold_percent,
+                    footer_threshold_percent,
+                    text_page=text_page,
+                    style_stats=style_stats,
+                    header_footer_regions=header_footer_regions,
+                    reading_order=reading_order
+                ),
+                "layout": analyze_page_layout(
+                    page, page_num, processor, text_page=text_page, reading_order=reading_order
+                )
+            })
+    
+    return {
+        "total_pages": total_pages,
+        "end_page": end_page,
+        "pages": pages
+    }
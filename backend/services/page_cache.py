@@ -0,0 +1,614 @@
+"""ページ単位の抽出結果のキャッシュ
+
+同じPDFに対してオプションを切り替えながら抽出を繰り返す場合や、ページ範囲を
+広げて再抽出する場合に、計算済みのページを再計算しないよう、
+(ドキュメントID, ページ番号, 正規化したオプション) をキーに PageText 相当の辞書を保持する。
+キャッシュはAPIサーバーのプロセスに持ち、合計サイズ（概算）が上限を超えたら
+最終使用が古いものから削除する。
+
+ディスクキャッシュ（services.persistent_cache）が設定されている場合は、
+メモリにないページをディスクから読み込み、新しく計算したページはディスクにも保存する。
+レイアウト解析の結果も同じ仕組みでキャッシュする。
+テキスト抽出とレイアウト解析を1回の解析で行う場合（extract_page_range_with_layout_cached）も、
+結果はそれぞれのキャッシュに保存するため、別々のリクエストとキャッシュを共有する。
+
+apply_formatting の構造化抽出では、ドキュメント全体のフォントサイズのヒストグラムから作った
+スタイルの基準値（StyleProfile.stats）を全ページで使う。構造化抽出と remove_headers_footers の
+レイアウト抽出では、全ページから学習したヘッダー・フッター領域（HeaderFooterLearner.regions）を全ページで使う。
+レイアウト解析（analyze-layout）はヘッダー・フッターをページごとに検出する。
+これらのドキュメント単位の値は1回の全ページの読み込みでまとめて作り、ドキュメントIDごとに
+メモリとディスクキャッシュ（ページ結果と同じテーブル）に保持する。
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.executor import run_in_worker
+from services.page_extractor import count_pdf_pages, normalize_extract_options
+from services.parallel_extractor import (
+    extract_page_range_parallel,
+    analyze_page_range_parallel,
+    extract_and_analyze_page_range_parallel,
+    collect_document_profile_parallel,
+)
+from services.persistent_cache import PersistentPageCache
+from common.reading_order import READING_ORDER_HEURISTIC
+
+logger = logging.getLogger(__name__)
+
+# キャッシュするページ結果の合計サイズの上限（0以下でキャッシュしない）
+PDF_PAGE_CACHE_MAX_BYTES = int(os.getenv("PDF_PAGE_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+
+# 総ページ数・ドキュメント単位の値を保持するドキュメント数
+_TOTAL_PAGES_CACHE_SIZE = 1024
+
+
+def estimate_page_size(page_data: Dict[str, Any]) -> int:
+    """ページ結果のおおよそのメモリ使用量（バイト）"""
+    if "regions" in page_data:
+        # レイアウト解析の結果
+        regions = page_data["regions"]
+        return 1024 + sys.getsizeof(regions["header"]["text"]) + sys.getsizeof(regions["footer"]["text"]) + \
+            256 * (len(regions["vertical_gaps"]) + len(regions["columns"]))
+    size = 512 + sys.getsizeof(page_data["text"])
+    for block in page_data["blocks"]:
+        size += 256 + sys.getsizeof(block["text"])
+    return size
+
+
+class PageResultCache:
+    """(ドキュメントID, ページ番号, オプション) をキーにしたページ結果のLRUキャッシュ"""
+
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes: 保持するページ結果の合計サイズの上限（バイト）
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._total_pages: "OrderedDict[str, int]" = OrderedDict()
+        self._document_values: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+
+    def get(self, document_id: str, page_number: int, options: Tuple) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みのページ結果を取得する（ない場合はNone）"""
+        key = (document_id, page_number, options)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, document_id: str, page_number: int, options: Tuple, page_data: Dict[str, Any]):
+        """ページ結果を登録する"""
+        key = (document_id, page_number, options)
+        size = estimate_page_size(page_data)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+            self._entries[key] = (page_data, size)
+            self._total_bytes += size
+
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    def get_total_pages(self, document_id: str) -> Optional[int]:
+        with self._lock:
+            return self._total_pages.get(document_id)
+
+    def set_total_pages(self, document_id: str, total_pages: int):
+        with self._lock:
+            self._total_pages[document_id] = total_pages
+            self._total_pages.move_to_end(document_id)
+            if len(self._total_pages) > _TOTAL_PAGES_CACHE_SIZE:
+                self._total_pages.popitem(last=False)
+
+    def get_document_value(self, kind: str, document_id: str) -> Any:
+        """ドキュメント単位の値（スタイルの基準値など）を取得する（ない場合はNone）"""
+        with self._lock:
+            return self._document_values.get((kind, document_id))
+
+    def set_document_value(self, kind: str, document_id: str, value: Any):
+        with self._lock:
+            self._document_values[(kind, document_id)] = value
+            self._document_values.move_to_end((kind, document_id))
+            if len(self._document_values) > _TOTAL_PAGES_CACHE_SIZE * 2:
+                self._document_values.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット・ミス数と現在の保持状況を返す"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "pages": len(self._entries),
+                "bytes": self._total_bytes
+            }
+
+
+page_cache = PageResultCache(PDF_PAGE_CACHE_MAX_BYTES)
+
+# ディスクキャッシュ（open_persistent_cache で設定）
+persistent_cache: Optional[PersistentPageCache] = None
+
+# レイアウト解析結果のキャッシュキー（オプションなし）
+LAYOUT_OPTIONS = ("analyze_layout",)
+
+# ドキュメント単位の値のディスクキャッシュのキー（ページ番号0の1件として保存する）
+DOCUMENT_PROFILE_OPTIONS = ("document_profile",)
+
+
+def open_persistent_cache(db_path: str, max_bytes: int) -> PersistentPageCache:
+    """ディスクキャッシュを開いて有効にする（起動時に呼ぶ）"""
+    global persistent_cache
+    persistent_cache = PersistentPageCache(db_path, max_bytes)
+    return persistent_cache
+
+
+def close_persistent_cache():
+    """ディスクキャッシュを閉じる"""
+    global persistent_cache
+    if persistent_cache is not None:
+        persistent_cache.close()
+        persistent_cache = None
+
+
+async def get_total_pages(pdf_path: str, document_id: Optional[str] = None) -> int:
+    """PDFの総ページ数を取得する（document_id を指定した場合は結果をキャッシュする）"""
+    total_pages = page_cache.get_total_pages(document_id) if document_id else None
+    if total_pages is None:
+        total_pages = await run_in_worker(count_pdf_pages, pdf_path, document_id)
+        if document_id:
+            page_cache.set_total_pages(document_id, total_pages)
+    return total_pages
+
+
+# 計算中のドキュメント単位の値（同じドキュメントへの同時リクエストで計算を1回にする）
+_document_value_tasks: Dict[Tuple[str, str], "asyncio.Future"] = {}
+
+# ドキュメント単位の値がない場合（テキストのあるページが2ページ未満など）にキャッシュする値
+_NO_VALUE = object()
+
+
+async def _get_document_value(
+    kind: str,
+    document_id: Optional[str],
+    compute: Callable[[], Awaitable[Any]]
+) -> Any:
+    """ドキュメント単位の値を取得する（document_id を指定した場合は結果をキャッシュする）"""
+    if document_id is None:
+        return await compute()
+
+    value = page_cache.get_document_value(kind, document_id)
+    if value is not None:
+        return None if value is _NO_VALUE else value
+
+    key = (kind, document_id)
+    task = _document_value_tasks.get(key)
+    if task is None:
+        async def compute_and_store():
+            value = await compute()
+            page_cache.set_document_value(kind, document_id, _NO_VALUE if value is None else value)
+            return value
+
+        task = asyncio.ensure_future(compute_and_store())
+        _document_value_tasks[key] = task
+        task.add_done_callback(lambda _: _document_value_tasks.pop(key, None))
+    # 待っているリクエストがキャンセルされても計算は続ける
+    return await asyncio.shield(task)
+
+
+async def _load_stored_document_profile(document_id: str) -> Optional[Dict[str, Any]]:
+    """ディスクキャッシュに保存済みのドキュメント単位の値を取得する（ない場合はNone）"""
+    disk_cache = persistent_cache
+    if disk_cache is None:
+        return None
+    stored = await asyncio.to_thread(disk_cache.get_many, "document", document_id, DOCUMENT_PROFILE_OPTIONS, [0])
+    if 0 not in stored:
+        return None
+    return {"style_stats": stored[0]["style_stats"], "header_footer": stored[0]["header_footer"]}
+
+
+async def has_document_profile(document_id: str) -> bool:
+    """
+    ドキュメント単位の値が計算済みか（計算はしない）
+
+    メモリにない場合はディスクキャッシュを探し、見つかった値はメモリに読み込む。
+    """
+    if page_cache.get_document_value("profile", document_id) is not None:
+        return True
+    stored = await _load_stored_document_profile(document_id)
+    if stored is None:
+        return False
+    page_cache.set_document_value("profile", document_id, stored)
+    return True
+
+
+async def get_document_profile(pdf_path: str, document_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    ドキュメント単位の値を取得する（document_id を指定した場合は結果をキャッシュする）
+
+    全ページのフォントサイズのヒストグラムとヘッダー・フッターの学習を1回の読み込みで行うため、
+    ページ範囲を指定したリクエストでも同じドキュメントなら同じ値になる。
+    メモリにない場合はディスクキャッシュを探し、計算した値はディスクにも保存する。
+
+    Returns:
+        Dict[str, Any]: {
+            "style_stats": StyleProfile.stats の値,
+            "header_footer": HeaderFooterLearner.regions の値（テキストのあるページが2ページ未満の場合はNone）
+        }
+    """
+    async def compute():
+        if document_id is not None:
+            stored = await _load_stored_document_profile(document_id)
+            if stored is not None:
+                return stored
+
+        profile, learner = await collect_document_profile_parallel(pdf_path, document_id)
+        style_stats = profile.stats()
+        regions = learner.regions()
+        logger.info(f"[page_cache] スタイルの基準値（ドキュメント全体, {profile.total}文字）: 平均={style_stats['avg_font_size']:.1f}, 中央値={style_stats['median_font_size']:.1f}, 最頻値={style_stats['common_font_size']:.1f}")
+        if regions is not None:
+            logger.info(f"[page_cache] ヘッダー・フッター領域（{learner.page_count}ページから学習）: ヘッダー={regions['header']}, フッター={regions['footer']}")
+
+        value = {"style_stats": style_stats, "header_footer": regions}
+        disk_cache = persistent_cache
+        if document_id is not None and disk_cache is not None:
+            try:
+                await asyncio.to_thread(
+                    disk_cache.put_many, "document", document_id, DOCUMENT_PROFILE_OPTIONS, [dict(value, page_number=0)]
+                )
+            except Exception as e:
+                logger.error(f"[page_cache] ディスクキャッシュへの保存エラー: {str(e)}")
+        return value
+
+    return await _get_document_value("profile", document_id, compute)
+
+
+def uses_document_profile(preserve_layout: bool, apply_formatting: bool, remove_headers_footers: bool) -> bool:
+    """
+    抽出結果にドキュメント単位の値（get_document_profile）を使うか
+
+    ドキュメント単位の値は全ページを読んで作るため、結果が変わる場合（構造化抽出、または
+    remove_headers_footers のレイアウト抽出）だけ使う。それ以外はページごとの判定を使い、
+    最初のページの結果を全ページの読み込みのために待たせない。
+    """
+    return preserve_layout and (apply_formatting or remove_headers_footers)
+
+
+def _contiguous_runs(page_numbers: List[int]) -> List[Tuple[int, int]]:
+    """昇順のページ番号を連続した (開始ページ, 終了ページ) にまとめる"""
+    runs = []
+    for page_number in page_numbers:
+        if runs and runs[-1][1] == page_number - 1:
+            runs[-1] = (runs[-1][0], page_number)
+        else:
+            runs.append((page_number, page_number))
+    return runs
+
+
+async def _adjust_page_range(pdf_path: str, document_id: str, start_page: int, end_page: Optional[int]) -> Tuple[int, int, int]:
+    """ページ範囲を調整する（extract_page_range / analyze_page_range と同じ）"""
+    total_pages = await get_total_pages(pdf_path, document_id)
+    start_page = max(1, start_page)
+    if not end_page or end_page > total_pages:
+        end_page = total_pages
+    return total_pages, start_page, end_page
+
+
+async def _lookup_cached(
+    document_id: str,
+    kind: str,
+    options: Tuple,
+    page_numbers: List[int]
+) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+    """
+    メモリ・ディスクのキャッシュからページ結果を探す
+
+    Returns:
+        Tuple[Dict[int, Dict[str, Any]], List[int]]: (ページ番号 → ページ結果, キャッシュになかったページ番号)
+    """
+    pages = {}
+    missing = []
+    for page_number in page_numbers:
+        page_data = page_cache.get(document_id, page_number, options)
+        if page_data is None:
+            missing.append(page_number)
+        else:
+            pages[page_number] = page_data
+    memory_hits = len(pages)
+
+    # メモリにないページはディスクから
+    disk_cache = persistent_cache
+    if missing and disk_cache is not None:
+        stored = await asyncio.to_thread(disk_cache.get_many, kind, document_id, options, missing)
+        for page_number, page_data in stored.items():
+            page_cache.put(document_id, page_number, options, page_data)
+            pages[page_number] = page_data
+        missing = [page_number for page_number in missing if page_number not in stored]
+
+    if pages:
+        logger.info(f"[page_cache] {kind} {document_id[:12]}: メモリ{memory_hits}ページ、ディスク{len(pages) - memory_hits}ページをキャッシュから取得、{len(missing)}ページを計算")
+    return pages, missing
+
+
+async def _store_computed(document_id: str, kind: str, options: Tuple, computed: List[Dict[str, Any]]):
+    """計算したページ結果をメモリ・ディスクのキャッシュに保存する"""
+    for page_data in computed:
+        page_cache.put(document_id, page_data["page_number"], options, page_data)
+
+    disk_cache = persistent_cache
+    if computed and disk_cache is not None:
+        try:
+            await asyncio.to_thread(disk_cache.put_many, kind, document_id, options, computed)
+        except Exception as e:
+            logger.error(f"[page_cache] ディスクキャッシュへの保存エラー: {str(e)}")
+
+
+async def _run_cached(
+    pdf_path: str,
+    document_id: str,
+    start_page: int,
+    end_page: Optional[int],
+    kind: str,
+    options: Tuple,
+    compute_range: Callable[[int, int], Awaitable[Dict[str, Any]]]
+) -> Tuple[int, int, List[Dict[str, Any]]]:
+    """
+    キャッシュ済みのページはそのまま使い、残りのページだけを連続した範囲ごとに compute_range で計算する
+
+    Returns:
+        Tuple[int, int, List[Dict[str, Any]]]: (総ページ数, 調整後の終了ページ, ページ結果のリスト)
+    """
+    total_pages, start_page, end_page = await _adjust_page_range(pdf_path, document_id, start_page, end_page)
+    pages, missing = await _lookup_cached(document_id, kind, options, list(range(start_page, end_page + 1)))
+
+    results = await asyncio.gather(*(
+        compute_range(run_start, run_end)
+        for run_start, run_end in _contiguous_runs(missing)
+    ))
+
+    computed = [page_data for result in results for page_data in result["pages"]]
+    for page_data in computed:
+        pages[page_data["page_number"]] = page_data
+    await _store_computed(document_id, kind, options, computed)
+
+    return total_pages, end_page, [pages[page_number] for page_number in range(start_page, end_page + 1)]
+
+
+async def extract_page_range_cached(
+    pdf_path: str,
+    start_page: int,
+    end_page: Optional[int],
+    preserve_layout: bool,
+    apply_formatting: bool,
+    remove_headers_footers: bool,
+    header_threshold_percent: float,
+    footer_threshold_percent: float,
+    document_id: Optional[str] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Dict[str, Any]:
+    """
+    extract_page_range_parallel のキャッシュ版（戻り値の形式は同じ）
+
+    document_id を指定しない場合はキャッシュを使わない。
+    構造化抽出と remove_headers_footers のレイアウト抽出では get_document_profile のヘッダー・フッター領域を、
+    apply_formatting の場合は同じくスタイルの基準値を全ページで使う。
+    """
+    async def compute_range(run_start: int, run_end: Optional[int]):
+        # 構造化抽出（apply_formatting）はドキュメント全体のスタイルの基準値で見出し等を判定する
+        style_stats = None
+        header_footer_regions = None
+        if uses_document_profile(preserve_layout, apply_formatting, remove_headers_footers):
+            document_profile = await get_document_profile(pdf_path, document_id)
+            header_footer_regions = document_profile["header_footer"]
+            if apply_formatting:
+                style_stats = document_profile["style_stats"]
+        return await extract_page_range_parallel(
+            pdf_path,
+            run_start,
+            run_end,
+            preserve_layout,
+            apply_formatting,
+            remove_headers_footers,
+            header_threshold_percent,
+            footer_threshold_percent,
+            document_id=document_id,
+            style_stats=style_stats,
+            header_footer_regions=header_footer_regions,
+            reading_order=reading_order
+        )
+
+    if document_id is None or page_cache.max_bytes <= 0:
+        return await compute_range(start_page, end_page)
+
+    options = normalize_extract_options(
+        preserve_layout, apply_formatting, remove_headers_footers,
+        header_threshold_percent, footer_threshold_percent, reading_order
+    )
+    total_pages, end_page, pages = await _run_cached(
+        pdf_path, document_id, start_page, end_page, "extract", options, compute_range
+    )
+    return {
+        "total_pages": total_pages,
+        "end_page": end_page,
+        "pages": pages
+    }
+
+
+async def extract_page_range_provisional(
+    pdf_path: str,
+    start_page: int,
+    end_page: Optional[int],
+    preserve_layout: bool,
+    apply_formatting: bool,
+    remove_headers_footers: bool,
+    header_threshold_percent: float,
+    footer_threshold_percent: float,
+    document_id: Optional[str] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Dict[str, Any]:
+    """
+    ドキュメント単位の値を待たずに、ページごとのスタイル・ヘッダー・フッターの判定で抽出する
+
+    ドキュメント単位の値を使う抽出（uses_document_profile）で、その値の計算が終わる前に
+    最初のページを返すために使う。extract_page_range_cached とは見出しやヘッダー・フッターの判定が
+    異なる場合があるため、結果はキャッシュせず、各ページに "provisional": True を付けて返す。
+    """
+    result = await extract_page_range_parallel(
+        pdf_path,
+        start_page,
+        end_page,
+        preserve_layout,
+        apply_formatting,
+        remove_headers_footers,
+        header_threshold_percent,
+        footer_threshold_percent,
+        document_id=document_id,
+        reading_order=reading_order
+    )
+    for page_data in result["pages"]:
+        page_data["provisional"] = True
+    return result
+
+
+async def analyze_page_range_cached(
+    pdf_path: str,
+    start_page: int,
+    end_page: Optional[int],
+    document_id: Optional[str] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Dict[str, Any]:
+    """
+    analyze_page_range_parallel のキャッシュ版（戻り値の形式は同じ）
+
+    document_id を指定しない場合はキャッシュを使わない。
+    ヘッダー・フッターはページごとに検出する（ドキュメント共通の領域の学習は行わない）。
+    """
+    async def compute_range(run_start: int, run_end: Optional[int]):
+        return await analyze_page_range_parallel(pdf_path, run_start, run_end, document_id, reading_order=reading_order)
+
+    if document_id is None or page_cache.max_bytes <= 0:
+        return await compute_range(start_page, end_page)
+
+    options = LAYOUT_OPTIONS if reading_order == READING_ORDER_HEURISTIC else LAYOUT_OPTIONS + (reading_order,)
+    total_pages, _, pages = await _run_cached(
+        pdf_path, document_id, start_page, end_page, "layout", options, compute_range
+    )
+    return {
+        "total_pages": total_pages,
+        "pages": pages
+    }
+
+
+async def extract_page_range_with_layout_cached(
+    pdf_path: str,
+    start_page: int,
+    end_page: Optional[int],
+    preserve_layout: bool,
+    apply_formatting: bool,
+    remove_headers_footers: bool,
+    header_threshold_percent: float,
+    footer_threshold_percent: float,
+    document_id: Optional[str] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Dict[str, Any]:
+    """
+    extract_page_range_cached と analyze_page_range_cached を1回のページ解析で行う
+
+    どちらかのキャッシュにないページだけを extract_and_analyze_page_range_parallel で計算し、
+    結果をテキスト抽出・レイアウト解析それぞれのキャッシュに保存する。
+
+    Returns:
+        Dict[str, Any]: {
+            "total_pages": 総ページ数,
+            "end_page": 調整後の終了ページ,
+            "pages": extract_page_data の戻り値のリスト,
+            "layout_pages": analyze_page_layout の戻り値のリスト
+        }
+    """
+    async def compute_range(run_start: int, run_end: Optional[int]):
+        style_stats = None
+        header_footer_regions = None
+        if uses_document_profile(preserve_layout, apply_formatting, remove_headers_footers):
+            document_profile = await get_document_profile(pdf_path, document_id)
+            header_footer_regions = document_profile["header_footer"]
+            if apply_formatting:
+                style_stats = document_profile["style_stats"]
+        return await extract_and_analyze_page_range_parallel(
+            pdf_path,
+            run_start,
+            run_end,
+            preserve_layout,
+            apply_formatting,
+            remove_headers_footers,
+            header_threshold_percent,
+            footer_threshold_percent,
+            document_id=document_id,
+            style_stats=style_stats,
+            header_footer_regions=header_footer_regions,
+            reading_order=reading_order
+        )
+
+    if document_id is None or page_cache.max_bytes <= 0:
+        result = await compute_range(start_page, end_page)
+        return {
+            "total_pages": result["total_pages"],
+            "end_page": result["end_page"],
+            "pages": [page["page"] for page in result["pages"]],
+            "layout_pages": [page["layout"] for page in result["pages"]]
+        }
+
+    extract_options = normalize_extract_options(
+        preserve_layout, apply_formatting, remove_headers_footers,
+        header_threshold_percent, footer_threshold_percent, reading_order
+    )
+    layout_options = LAYOUT_OPTIONS if reading_order == READING_ORDER_HEURISTIC else LAYOUT_OPTIONS + (reading_order,)
+
+    total_pages, start_page, end_page = await _adjust_page_range(pdf_path, document_id, start_page, end_page)
+    page_numbers = list(range(start_page, end_page + 1))
+    pages, missing_pages = await _lookup_cached(document_id, "extract", extract_options, page_numbers)
+    layouts, missing_layouts = await _lookup_cached(document_id, "layout", layout_options, page_numbers)
+
+    # どちらかがないページは両方を計算する
+    missing = sorted(set(missing_pages) | set(missing_layouts))
+    results = await asyncio.gather(*(
+        compute_range(run_start, run_end)
+        for run_start, run_end in _contiguous_runs(missing)
+    ))
+
+    computed_pages = []
+    computed_layouts = []
+    for result in results:
+        for page in result["pages"]:
+            page_number = page["page"]["page_number"]
+            if page_number not in pages:
+                pages[page_number] = page["page"]
+                computed_pages.append(page["page"])
+            if page_number not in layouts:
+                layouts[page_number] = page["layout"]
+                computed_layouts.append(page["layout"])
+    await _store_computed(document_id, "extract", extract_options, computed_pages)
+    await _store_computed(document_id, "layout", layout_options, computed_layouts)
+
+    return {
+        "total_pages": total_pages,
+        "end_page": end_page,
+        "pages": [pages[page_number] for page_number in page_numbers],
+        "layout_pages": [layouts[page_number] for page_number in page_numbers]
+    }
@@ -3,7 +3,20 @@ import fitz
 from typing import List, Tuple, Optional, Dict, Any
 import logging
 from pdf_processor import PDFProcessor
-from common import extract_with_layout, extract_block_text
+from common import (
+    build_text_blocks,
+    assemble_layout_text,
+    detect_page_regions,
+    detect_header_footer,
+    Block,
+    PageTextContext,
+    StyleProfile,
+    HeaderFooterLearner,
+    header_footer_thresholds,
+    get_text_context,
+)
+from common.reading_order import READING_ORDER_HEURISTIC, READING_ORDER_XY_CUT
+from services.document_cache import open_pdf
 
 logger = logging.getLogger(__name__)
 
@@ -16,18 +29,23 @@ def extract_page_text(
     remove_headers_footers: bool,
     header_threshold_percent: float,
     footer_threshold_percent: float,
-    processor: PDFProcessor
+    processor: PDFProcessor,
+    text_page: Optional[PageTextContext] = None
 ) -> Tuple[str, List[Dict], int, bool, bool, Optional[str], Optional[str]]:
     """
     単一ページからテキストを抽出する
     
+    Args:
+        text_page: ページの PageTextContext（省略時はこのページ用に作成）
+    
     Returns:
         Tuple[str, List[Dict], int, bool, bool, Optional[str], Optional[str]]:
             (テキスト, ブロック情報, カラム数, ヘッダー有無, フッター有無, ヘッダーテキスト, フッターテキスト)
     """
+    text_page = get_text_context(page, text_page)
     if preserve_layout:
         # 構造を保持したテキスト抽出
-        result = processor.extract_text_with_structure(page, apply_text_style=apply_formatting)
+        result = processor.extract_text_with_structure(page, apply_text_style=apply_formatting, text_page=text_page)
         
         text = result["main_text"]
         header_text = "\n".join(result["headers"]) if result["headers"] else None
@@ -51,14 +69,11 @@ def extract_page_text(
                 has_footer
             )
             
-            # フィルタリングされたブロックで再度処理
-            result = extract_with_layout(page, filtered_blocks)
-            if len(result) != 4:
-                logger.error(f"extract_with_layout returned {len(result)} values instead of 4")
-            text, block_infos, column_count, _ = result
+            # フィルタリングされたブロックでテキストを組み立て直す
+            text, block_infos, column_count = _assemble_filtered_blocks(page, filtered_blocks, text_page.words)
     else:
         # シンプルなテキスト抽出
-        text = page.get_text()
+        text = text_page.text
         block_infos = []
         column_count = 1
         has_header = False
@@ -70,33 +85,340 @@ def extract_page_text(
 
 
 def _filter_header_footer_blocks(
-    blocks: List[Dict],
+    blocks: List[Block],
     header_threshold: float,
     footer_threshold: float,
     page_num: int,
     has_header: bool,
     has_footer: bool
-) -> List[Dict]:
+) -> List[Block]:
     """
     ヘッダー・フッターブロックをフィルタリングする
     """
     filtered_blocks = []
     
     for block in blocks:
-        block_y = block['bbox'][1]
+        block_y = block.bbox[1]
         
         # ヘッダー領域のブロックをスキップ
         if has_header and block_y < header_threshold:
             if page_num + 1 in [1, 3]:  # デバッグ用：最初の3ページのみログ出力
-                logger.info(f"  ヘッダーブロックを削除: Y={block_y:.1f}, テキスト='{block.get('text', '')[:30]}...'")
+                logger.info(f"  ヘッダーブロックを削除: Y={block_y:.1f}, テキスト='{(block.text or '')[:30]}...'")
             continue
         
         # フッター領域のブロックをスキップ
         if has_footer and block_y > footer_threshold:
             if page_num + 1 in [1, 3]:
-                logger.info(f"  フッターブロックを削除: Y={block_y:.1f}, テキスト='{block.get('text', '')[:30]}...'")
+                logger.info(f"  フッターブロックを削除: Y={block_y:.1f}, テキスト='{(block.text or '')[:30]}...'")
             continue
         
         filtered_blocks.append(block)
     
-    return filtered_blocks
\ No newline at end of file
+    return filtered_blocks
+
+
+def _assemble_filtered_blocks(
+    page: fitz.Page,
+    blocks: List[Block],
+    words: Optional[List] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Tuple[str, List[Dict], int]:
+    """
+    ヘッダー/フッター除外後のブロックからテキストを組み立てる（カラム検出・テキスト組み立て段階）
+    
+    Returns:
+        Tuple[str, List[Dict], int]: (テキスト, ブロック情報, カラム数)
+    """
+    if not blocks:
+        return "", [], 1
+    # XYカットはブロックだけで読み順を決めるため、ワードからのカラム領域の検出は不要
+    regions = detect_page_regions(page, words) if reading_order != READING_ORDER_XY_CUT else None
+    return assemble_layout_text(page, blocks, regions, reading_order)
+
+
+def extract_layout_page(
+    page: fitz.Page,
+    page_num: int,
+    remove_headers_footers: bool,
+    header_threshold_percent: float,
+    footer_threshold_percent: float,
+    text_page: Optional[PageTextContext] = None,
+    header_footer_regions: Optional[Dict] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Tuple[str, List[Dict], int, bool, bool, Optional[str], Optional[str]]:
+    """
+    レイアウト抽出（preserve_layout=True, apply_formatting=False）の1ページ分の処理
+    
+    解析 → ヘッダー/フッター検出 → 除外 → カラム検出 → テキスト組み立て の各段階を
+    1回ずつ実行し、途中の結果（ワード、ブロック）を次の段階に渡す。
+    
+    Args:
+        text_page: ページの PageTextContext（省略時はこのページ用に作成）
+        header_footer_regions: ドキュメント共通のヘッダー・フッター領域（省略時はページごとに指定割合で判定）
+        reading_order: 読み順の決定方法（"heuristic" または "xycut"）
+    
+    Returns:
+        Tuple[str, List[Dict], int, bool, bool, Optional[str], Optional[str]]:
+            (テキスト, ブロック情報, カラム数, ヘッダー有無, フッター有無, ヘッダーテキスト, フッターテキスト)
+    """
+    # 解析: ワードは1回だけ取得し、ブロック化とカラム領域の検出の両方に使う
+    text_page = get_text_context(page, text_page)
+    text_blocks = build_text_blocks(page, text_page)
+    
+    if page_num + 1 in [1, 3]:  # ページ1と3でログ出力
+        logger.info(f"[extract_page_data] ページ {page_num + 1}: ヘッダー/フッター検出を実行")
+    
+    # ヘッダー/フッター検出
+    has_header, has_footer, header_text, footer_text = detect_header_footer(
+        page, text_blocks, header_threshold_percent, footer_threshold_percent, header_footer_regions
+    )
+    
+    # remove_headers_footersが有効な場合、ヘッダー/フッターを除外
+    filtered_blocks = text_blocks
+    if remove_headers_footers and (has_header or has_footer):
+        header_threshold, footer_threshold = header_footer_thresholds(
+            page.rect.height, header_threshold_percent, footer_threshold_percent, header_footer_regions
+        )
+        filtered_blocks = _filter_header_footer_blocks(
+            text_blocks,
+            header_threshold,
+            footer_threshold,
+            page_num,
+            has_header,
+            has_footer
+        )
+    
+    # カラム検出とテキストの組み立て
+    text, block_infos, column_count = _assemble_filtered_blocks(page, filtered_blocks, text_page.words, reading_order)
+    
+    return text, block_infos, column_count, has_header, has_footer, header_text, footer_text
+
+
+def extract_page_data(
+    page: fitz.Page,
+    page_num: int,
+    preserve_layout: bool,
+    apply_formatting: bool,
+    remove_headers_footers: bool,
+    header_threshold_percent: float,
+    footer_threshold_percent: float,
+    text_page: Optional[PageTextContext] = None,
+    style_stats: Optional[Dict[str, float]] = None,
+    header_footer_regions: Optional[Dict] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Dict[str, Any]:
+    """
+    /api/extract-text の1ページ分の処理を行い、PageText相当の辞書を返す
+    
+    Args:
+        text_page: ページの PageTextContext（同じページの他の処理と解析結果を共有する場合に指定）
+        style_stats: apply_formatting で使うスタイルの基準値（ドキュメント全体の値。省略時はページごとに計算）
+        header_footer_regions: ドキュメント共通のヘッダー・フッター領域（省略時はページごとに検出）
+        reading_order: 読み順の決定方法（"heuristic" または "xycut"。preserve_layout の場合のみ使う）
+    
+    Returns:
+        Dict[str, Any]: page_number, text, blocks, column_count, has_header,
+            has_footer, header_text, footer_text を持つ辞書
+    """
+    if page_num + 1 == 3:  # ページ3のみログ出力
+        logger.info(f"[extract_page_data] ページ {page_num + 1} を処理中...")
+    
+    text_page = get_text_context(page, text_page)
+    
+    # テキストと構造情報を抽出
+    if preserve_layout:
+        # apply_formattingが有効な場合は改良版のPDFProcessorを使用
+        if apply_formatting:
+            processor = PDFProcessor()
+            structure = processor.extract_text_with_structure(
+                page, apply_text_style=apply_formatting, text_page=text_page, style_stats=style_stats,
+                header_footer_regions=header_footer_regions, reading_order=reading_order
+            )
+            
+            # 構造化されたテキストを使用
+            text = structure["main_text"]
+            has_header = len(structure["headers"]) > 0
+            has_footer = len(structure["footers"]) > 0
+            header_text = "\n".join(structure["headers"])
+            footer_text = "\n".join(structure["footers"])
+            
+            # block_infosを構築
+            block_infos = []
+            for block in structure["blocks"]:
+                block_infos.append({
+                    "bbox": block["bbox"],
+                    "text": block["text"],
+                    "font_size": block.get("avg_font_size", 12),
+                    "is_bold": block.get("is_heading", False)
+                })
+            
+            # カラム数を判定
+            if structure.get("reading_order_tree") is not None:
+                column_count = structure["reading_order_tree"].column_count()
+            else:
+                column_count = 2 if structure["has_columns"] else 1
+        else:
+            text, block_infos, column_count, has_header, has_footer, header_text, footer_text = extract_layout_page(
+                page,
+                page_num,
+                remove_headers_footers,
+                header_threshold_percent,
+                footer_threshold_percent,
+                text_page,
+                header_footer_regions,
+                reading_order
+            )
+    else:
+        text = text_page.text
+        block_infos = []
+        column_count = 1
+        has_header = False
+        has_footer = False
+        header_text = None
+        footer_text = None
+    
+    return {
+        "page_number": page_num + 1,
+        "text": text,
+        "blocks": block_infos,
+        "column_count": column_count,
+        "has_header": has_header,
+        "has_footer": has_footer,
+        "header_text": header_text,
+        "footer_text": footer_text
+    }
+
+
+def normalize_extract_options(
+    preserve_layout: bool,
+    apply_formatting: bool,
+    remove_headers_footers: bool,
+    header_threshold_percent: float,
+    footer_threshold_percent: float,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Tuple:
+    """
+    extract_page_data の結果に影響するオプションだけを取り出す（結果キャッシュのキー）
+    
+    結果が同じになるオプションの組み合わせは同じ値になる。
+    読み順が既定（heuristic）の場合は、読み順のオプションがなかったときと同じ値になる。
+    """
+    if not preserve_layout:
+        return ("plain",)
+    order = (reading_order,) if reading_order != READING_ORDER_HEURISTIC else ()
+    if apply_formatting:
+        # PDFProcessorによる構造化抽出はヘッダー/フッターのオプションを使わない
+        return ("structure",) + order
+    return ("layout", bool(remove_headers_footers), float(header_threshold_percent), float(footer_threshold_percent)) + order
+
+
+def extract_page_range(
+    pdf_path: str,
+    start_page: int,
+    end_page: Optional[int],
+    preserve_layout: bool,
+    apply_formatting: bool,
+    remove_headers_footers: bool,
+    header_threshold_percent: float,
+    footer_threshold_percent: float,
+    document_id: Optional[str] = None,
+    style_stats: Optional[Dict[str, float]] = None,
+    header_footer_regions: Optional[Dict] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Dict[str, Any]:
+    """
+    PDFファイルを開いて指定範囲のページを抽出する
+    
+    ワーカープロセスから呼び出せるよう、引数と戻り値はpickle可能な値のみを使う。
+    document_id（PDF内容のハッシュ）を指定すると、開いたドキュメントをプロセス内でキャッシュする。
+    style_stats はドキュメント全体のスタイルの基準値（collect_document_profile の結果から作る）。
+    header_footer_regions はドキュメント共通のヘッダー・フッター領域（collect_document_profile の結果から作る）。
+    reading_order は読み順の決定方法（"heuristic" または "xycut"）。
+    
+    Returns:
+        Dict[str, Any]: {
+            "total_pages": 総ページ数,
+            "end_page": 調整後の終了ページ,
+            "pages": extract_page_data の戻り値のリスト
+        }
+    """
+    with open_pdf(pdf_path, document_id) as pdf_document:
+        total_pages = len(pdf_document)
+        
+        # ページ範囲の調整
+        if end_page is None or end_page > total_pages:
+            end_page = total_pages
+        
+        pages = []
+        for page_num in range(start_page - 1, end_page):
+            pages.append(extract_page_data(
+                pdf_document[page_num],
+                page_num,
+                preserve_layout,
+                apply_formatting,
+                remove_headers_footers,
+                header_threshold_percent,
+                footer_threshold_percent,
+                style_stats=style_stats,
+                header_footer_regions=header_footer_regions,
+                reading_order=reading_order
+            ))
+    
+    return {
+        "total_pages": total_pages,
+        "end_page": end_page,
+        "pages": pages
+    }
+
+
+def collect_document_profile(
+    pdf_path: str,
+    start_page: int,
+    end_page: Optional[int],
+    document_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    指定範囲のページを1回ずつ読み、フォントサイズのヒストグラム（StyleProfile）と
+    ヘッダー・フッターの学習（HeaderFooterLearner）を同時に行う
+    
+    どちらも同じテキストページから作るため、ドキュメント全体を読むのは1回で済む。
+    ページのブロックは集計後に破棄し、ヒストグラムとパターンの出現数だけを返す。
+    ページ範囲の並列処理（_run_sharded）で分割できるよう、結果は pages に1件だけ入れて返す
+    （分割した結果は StyleProfile.merge / HeaderFooterLearner.merge でページ順に結合する）。
+    
+    Returns:
+        Dict[str, Any]: {
+            "total_pages": 総ページ数,
+            "end_page": 調整後の終了ページ,
+            "pages": [(StyleProfile, HeaderFooterLearner)]
+        }
+    """
+    profile = StyleProfile()
+    learner = HeaderFooterLearner()
+    with open_pdf(pdf_path, document_id) as pdf_document:
+        total_pages = len(pdf_document)
+        if end_page is None or end_page > total_pages:
+            end_page = total_pages
+        
+        for page_num in range(start_page - 1, end_page):
+            page = pdf_document[page_num]
+            text_page = PageTextContext(page)
+            profile.add_blocks(text_page.blocks)
+            # 学習には位置とテキストだけを使うので、スパンを作らない get_text("blocks") で十分
+            blocks = [
+                Block(tuple(b[:4]), [], b[4])
+                for b in page.get_text("blocks", textpage=text_page.textpage) if b[6] == 0
+            ]
+            learner.add_page(page_num + 1, page.rect.height, blocks)
+    
+    return {
+        "total_pages": total_pages,
+        "end_page": end_page,
+        "pages": [(profile, learner)]
+    }
+
+
+def count_pdf_pages(pdf_path: str, document_id: Optional[str] = None) -> int:
+    """PDFファイルの総ページ数を取得する"""
+    with open_pdf(pdf_path, document_id) as pdf_document:
+        return len(pdf_document)
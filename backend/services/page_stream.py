@@ -0,0 +1,136 @@
+"""抽出結果をページごとに順次返すストリーミング処理
+
+ページ範囲を小さなチャンクに分けてワーカーで並列に抽出し、完了したチャンクから
+ページ順に返す。全ページの処理を待たずに最初のページを返せるため、大きなページ範囲でも
+クライアントは先頭のページから表示できる。
+
+構造化抽出などドキュメント単位の値（全ページのスタイルの基準値・ヘッダー・フッター領域）を使う抽出では、
+値が計算済みでなければ、最初に並列で始めるチャンク（ワーカー数まで）はページごとの判定で抽出して
+"provisional": True を付けて返し、その間に値の計算を始める（最初のページを全ページの読み込みで待たせない）。
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from services.executor import PDF_WORKER_PROCESSES
+from services.page_cache import (
+    extract_page_range_cached,
+    extract_page_range_provisional,
+    get_document_profile,
+    get_total_pages,
+    has_document_profile,
+    uses_document_profile,
+)
+
+logger = logging.getLogger(__name__)
+
+# 1チャンクあたりのページ数（最初のチャンクは1ページにして最初の応答を早くする）
+PDF_STREAM_CHUNK_PAGES = int(os.getenv("PDF_STREAM_CHUNK_PAGES", "4"))
+
+
+def split_stream_chunks(start_page: int, end_page: int, chunk_pages: int = PDF_STREAM_CHUNK_PAGES) -> List[Tuple[int, int]]:
+    """
+    ページ範囲をストリーミング用のチャンクに分割する（最初のチャンクは1ページ）
+
+    Returns:
+        List[Tuple[int, int]]: (開始ページ, 終了ページ) のリスト（ページ順）
+    """
+    if start_page > end_page:
+        return []
+    chunks = [(start_page, start_page)]
+    chunk_pages = max(1, chunk_pages)
+    for chunk_start in range(start_page + 1, end_page + 1, chunk_pages):
+        chunks.append((chunk_start, min(chunk_start + chunk_pages - 1, end_page)))
+    return chunks
+
+
+async def iter_extracted_pages(
+    pdf_path: str,
+    page_ranges: List[Tuple[int, Optional[int]]],
+    preserve_layout: bool,
+    apply_formatting: bool,
+    remove_headers_footers: bool,
+    header_threshold_percent: float,
+    footer_threshold_percent: float,
+    document_id: Optional[str] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    指定ページ範囲の抽出結果（PageText相当の辞書）をページ順に1ページずつ返す
+
+    同時に処理するチャンク数はワーカー数までに制限する。途中で中断された場合
+    （クライアントの切断など）は未完了のチャンクをキャンセルする。
+    ドキュメント単位の値を待たずに抽出したページには "provisional": True が付く。
+
+    Args:
+        page_ranges: (開始ページ, 終了ページ) のリスト。終了ページがNoneの場合は最終ページまで
+    """
+    total_pages = await get_total_pages(pdf_path, document_id)
+
+    chunks = []
+    for range_start, range_end in page_ranges:
+        if range_end is None or range_end > total_pages:
+            range_end = total_pages
+        chunks.extend(split_stream_chunks(range_start, range_end))
+
+    # ドキュメント単位の値が計算済みでなければ、最初に始めるチャンクはその値を待たずに抽出する
+    provisional = document_id is not None and \
+        uses_document_profile(preserve_layout, apply_formatting, remove_headers_footers) and \
+        not await has_document_profile(document_id)
+    profile_task = None
+
+    def start_chunk(chunk_start: int, chunk_end: int) -> asyncio.Task:
+        extract = extract_page_range_provisional if provisional and profile_task is None else extract_page_range_cached
+        return asyncio.ensure_future(extract(
+            pdf_path,
+            chunk_start,
+            chunk_end,
+            preserve_layout,
+            apply_formatting,
+            remove_headers_footers,
+            header_threshold_percent,
+            footer_threshold_percent,
+            document_id=document_id
+        ))
+
+    window = max(1, PDF_WORKER_PROCESSES)
+    pending = deque()
+    next_chunk = 0
+    try:
+        while next_chunk < len(chunks) or pending:
+            while next_chunk < len(chunks) and len(pending) < window:
+                pending.append(start_chunk(*chunks[next_chunk]))
+                next_chunk += 1
+
+            if provisional and profile_task is None:
+                # 最初のチャンクをワーカーに渡してから全ページの読み込みを始める
+                # （以降のチャンクはこの計算の結果を待って extract_page_range_cached で抽出する）
+                profile_task = asyncio.ensure_future(get_document_profile(pdf_path, document_id))
+                # 失敗した場合は以降のチャンクの計算で改めてエラーになるので、ここでは例外を取り出すだけにする
+                profile_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+            result = await pending.popleft()
+            for page_data in result["pages"]:
+                yield page_data
+    finally:
+        for task in pending:
+            task.cancel()
+        if profile_task is not None:
+            # 計算自体は get_document_profile の中で続き、次のリクエストで使われる
+            profile_task.cancel()
+
+
+def format_stream_event(event: str, data: Dict[str, Any], stream_format: str) -> str:
+    """
+    ストリームの1レコードを文字列にする
+
+    Args:
+        event: レコードの種類（"page", "done", "error"）
+        data: レコードの内容
+        stream_format: "ndjson"（1行1レコード）または "sse"（Server-Sent Events）
+    """
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return json.dumps({"type": event, "data": data}, ensure_ascii=False) + "\n"
@@ -0,0 +1,183 @@
+"""ページ範囲をシャードに分割してワーカープロセスで並列処理する"""
+import asyncio
+import logging
+import math
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.executor import PDF_WORKER_PROCESSES, get_executor, run_in_worker
+from common import HeaderFooterLearner, StyleProfile
+from common.reading_order import READING_ORDER_HEURISTIC
+from services.page_extractor import collect_document_profile, count_pdf_pages, extract_page_range
+from services.layout_analyzer import analyze_page_range, extract_and_analyze_page_range
+
+logger = logging.getLogger(__name__)
+
+# 1シャードあたりの最小ページ数（これ未満のページ範囲は分割しない）
+PDF_SHARD_MIN_PAGES = int(os.getenv("PDF_SHARD_MIN_PAGES", "8"))
+
+
+def split_page_range(start_page: int, end_page: int, max_shards: int, min_pages: int = PDF_SHARD_MIN_PAGES) -> List[Tuple[int, int]]:
+    """
+    ページ範囲（1始まり、両端を含む）を連続したシャードに分割する
+    
+    Args:
+        start_page: 開始ページ
+        end_page: 終了ページ
+        max_shards: 最大シャード数
+        min_pages: 1シャードあたりの最小ページ数
+    
+    Returns:
+        List[Tuple[int, int]]: (開始ページ, 終了ページ) のリスト（ページ順）
+    """
+    page_count = end_page - start_page + 1
+    if page_count <= 0:
+        return []
+    
+    shard_count = max(1, min(max_shards, page_count // max(1, min_pages)))
+    shard_size = math.ceil(page_count / shard_count)
+    
+    shards = []
+    for shard_start in range(start_page, end_page + 1, shard_size):
+        shards.append((shard_start, min(shard_start + shard_size - 1, end_page)))
+    return shards
+
+
+async def _run_sharded(
+    func: Callable[..., Dict[str, Any]],
+    pdf_path: str,
+    start_page: int,
+    end_page: Optional[int],
+    *args,
+    document_id: Optional[str] = None,
+    **kwargs
+) -> Dict[str, Any]:
+    """
+    func(pdf_path, start_page, end_page, *args, document_id=document_id, **kwargs) をシャードごとに
+    並列実行し、結果をページ順に結合する
+    
+    func は {"total_pages": int, "pages": list} を返すページ範囲処理関数。
+    """
+    # プロセスプールが使えない場合は分割しても速くならない
+    if PDF_WORKER_PROCESSES <= 1 or get_executor() is None:
+        return await run_in_worker(func, pdf_path, start_page, end_page, *args, document_id=document_id, **kwargs)
+    
+    # 指定範囲が明らかに小さい場合はページ数を数えずにそのまま実行
+    if end_page and end_page - max(1, start_page) + 1 < PDF_SHARD_MIN_PAGES * 2:
+        return await run_in_worker(func, pdf_path, start_page, end_page, *args, document_id=document_id, **kwargs)
+    
+    total_pages = await run_in_worker(count_pdf_pages, pdf_path, document_id)
+    first_page = max(1, start_page)
+    last_page = min(total_pages, end_page) if end_page else total_pages
+    
+    shards = split_page_range(first_page, last_page, PDF_WORKER_PROCESSES)
+    if len(shards) <= 1:
+        return await run_in_worker(func, pdf_path, start_page, end_page, *args, document_id=document_id, **kwargs)
+    
+    logger.info(f"[parallel_extractor] {func.__name__}: ページ{first_page}-{last_page}を{len(shards)}シャードで並列処理")
+    
+    # 各ワーカーがPDFを自分で開いてシャードを処理する
+    results = await asyncio.gather(*(
+        run_in_worker(func, pdf_path, shard_start, shard_end, *args, document_id=document_id, **kwargs)
+        for shard_start, shard_end in shards
+    ))
+    
+    merged = dict(results[-1])
+    merged["total_pages"] = total_pages
+    merged["pages"] = [page for result in results for page in result["pages"]]
+    return merged
+
+
+async def extract_page_range_parallel(
+    pdf_path: str,
+    start_page: int,
+    end_page: Optional[int],
+    preserve_layout: bool,
+    apply_formatting: bool,
+    remove_headers_footers: bool,
+    header_threshold_percent: float,
+    footer_threshold_percent: float,
+    document_id: Optional[str] = None,
+    style_stats: Optional[Dict[str, float]] = None,
+    header_footer_regions: Optional[Dict] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Dict[str, Any]:
+    """extract_page_range の並列版（戻り値の形式は同じ）"""
+    return await _run_sharded(
+        extract_page_range,
+        pdf_path,
+        start_page,
+        end_page,
+        preserve_layout,
+        apply_formatting,
+        remove_headers_footers,
+        header_threshold_percent,
+        footer_threshold_percent,
+        document_id=document_id,
+        style_stats=style_stats,
+        header_footer_regions=header_footer_regions,
+        reading_order=reading_order
+    )
+
+
+async def analyze_page_range_parallel(
+    pdf_path: str,
+    start_page: int,
+    end_page: Optional[int],
+    document_id: Optional[str] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Dict[str, Any]:
+    """analyze_page_range の並列版（戻り値の形式は同じ）"""
+    return await _run_sharded(
+        analyze_page_range, pdf_path, start_page, end_page,
+        document_id=document_id, reading_order=reading_order
+    )
+
+
+async def extract_and_analyze_page_range_parallel(
+    pdf_path: str,
+    start_page: int,
+    end_page: Optional[int],
+    preserve_layout: bool,
+    apply_formatting: bool,
+    remove_headers_footers: bool,
+    header_threshold_percent: float,
+    footer_threshold_percent: float,
+    document_id: Optional[str] = None,
+    style_stats: Optional[Dict[str, float]] = None,
+    header_footer_regions: Optional[Dict] = None,
+    reading_order: str = READING_ORDER_HEURISTIC
+) -> Dict[str, Any]:
+    """extract_and_analyze_page_range の並列版（戻り値の形式は同じ）"""
+    return await _run_sharded(
+        extract_and_analyze_page_range,
+        pdf_path,
+        start_page,
+        end_page,
+        preserve_layout,
+        apply_formatting,
+        remove_headers_footers,
+        header_threshold_percent,
+        footer_threshold_percent,
+        document_id=document_id,
+        style_stats=style_stats,
+        header_footer_regions=header_footer_regions,
+        reading_order=reading_order
+    )
+
+
+async def collect_document_profile_parallel(
+    pdf_path: str,
+    document_id: Optional[str] = None
+) -> Tuple[StyleProfile, HeaderFooterLearner]:
+    """
+    ドキュメント全体のフォントサイズのヒストグラムとヘッダー・フッターの学習を
+    ページ範囲ごとに並列で行い、ページ順に結合する
+    """
+    result = await _run_sharded(collect_document_profile, pdf_path, 1, None, document_id=document_id)
+    profile = StyleProfile()
+    learner = HeaderFooterLearner()
+    for shard_profile, shard_learner in result["pages"]:
+        profile.merge(shard_profile)
+        learner.merge(shard_learner)
+    return profile, learner
@@ -1,10 +1,10 @@
 """PDFファイルの検証に関する処理"""
 import fitz
 import os
-import tempfile
-from typing import Tuple
+from typing import List, Tuple
 from fastapi import HTTPException, UploadFile
-import hashlib
+from services.upload import spool_upload
+import re
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,16 +21,12 @@ async def validate_and_save_pdf(file: UploadFile) -> Tuple[str, int, str]:
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="PDFファイルのみ対応しています")
     
-    # 一時ファイルとして保存
-    contents = await file.read()
+    # 一時ファイルとして保存（チャンクごとに書き出し、サイズ上限の確認とハッシュ計算も行う）
+    temp_path, document_id, _ = await spool_upload(file)
     await file.seek(0)
     
-    # ファイルハッシュを計算
-    file_hash = hashlib.md5(contents).hexdigest()[:8]
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-        tmp.write(contents)
-        temp_path = tmp.name
+    # ファイルハッシュ（ログ表示用の短縮形）
+    file_hash = document_id[:8]
     
     # PyMuPDFでPDFを開く
     try:
@@ -70,4 +66,52 @@ def validate_page_range(start_page: int, end_page: int, total_pages: int) -> Tup
     
     logger.info(f"[validate_page_range] ページ範囲: {start_page}-{end_page}/{total_pages}")
     
-    return start_page, end_page
\ No newline at end of file
+    return start_page, end_page
+
+
+def parse_page_set(pages: str, total_pages: int) -> List[Tuple[int, int]]:
+    """
+    ページ指定文字列（例: "1-3,7,10-"）を連続したページ範囲のリストに変換する
+    
+    範囲は総ページ数で切り詰め、重複・隣接する範囲は結合する。
+    
+    Returns:
+        List[Tuple[int, int]]: (開始ページ, 終了ページ) のリスト（昇順）
+    """
+    ranges = []
+    for part in pages.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        
+        match = re.match(r'^(\d+)?\s*(-)?\s*(\d+)?$', part)
+        if not match or not (match.group(1) or match.group(3)):
+            raise HTTPException(status_code=400, detail=f"ページ指定が不正です: {part}")
+        
+        start = int(match.group(1)) if match.group(1) else 1
+        if match.group(2):
+            end = int(match.group(3)) if match.group(3) else total_pages
+        else:
+            end = start
+        
+        if start < 1 or start > end:
+            raise HTTPException(status_code=400, detail=f"ページ指定が不正です: {part}")
+        
+        end = min(end, total_pages)
+        if start <= end:
+            ranges.append((start, end))
+    
+    if not ranges:
+        raise HTTPException(status_code=400, detail=f"有効なページが指定されていません: {pages}")
+    
+    # 重複・隣接する範囲を結合
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    
+    return merged
@@ -0,0 +1,212 @@
+"""ページ単位の抽出・レイアウト解析結果のディスクキャッシュ（SQLite）
+
+サーバーの再起動（デプロイ）後も計算済みの結果を使えるよう、
+(種類, ドキュメントID, ページ番号, オプション) をキーにページ結果をJSONで保存する。
+
+- WALモードで開き、読み込みと書き込みを並行できるようにする
+- 合計サイズが上限を超えたら最終アクセスが古いものから削除する
+- 抽出アルゴリズム（common/ など）のソースが変わったら保存済みの結果を破棄する
+- 起動時にキーの一覧（ウォームインデックス）をメモリに読み込み、
+  保存されていないページではデータベースを参照しない
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# テーブル構成のバージョン（変更したら上げる）
+CACHE_SCHEMA_VERSION = 1
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 結果に影響するソースファイル
+# （ページ結果の組み立て・文書単位の値の計算・シャードの結合を行うモジュールも含める）
+_ALGORITHM_SOURCES = [
+    "common/*.py",
+    "pdf_processor.py",
+    "services/page_extractor.py",
+    "services/layout_analyzer.py",
+    "services/page_cache.py",
+    "services/parallel_extractor.py",
+]
+
+
+def compute_algorithm_version() -> str:
+    """抽出・解析処理のソースファイルの内容からバージョン文字列を計算する"""
+    digest = hashlib.sha256()
+    for pattern in _ALGORITHM_SOURCES:
+        for path in sorted(glob.glob(os.path.join(_BACKEND_DIR, pattern))):
+            digest.update(os.path.relpath(path, _BACKEND_DIR).encode('utf-8'))
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class PersistentPageCache:
+    """SQLiteに保存するページ結果キャッシュ"""
+
+    def __init__(self, db_path: str, max_bytes: int, algorithm_version: Optional[str] = None):
+        """
+        Args:
+            db_path: データベースファイルのパス
+            max_bytes: 保存するページ結果の合計サイズの上限（バイト）
+            algorithm_version: 結果のバージョン（省略時は compute_algorithm_version()）
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.algorithm_version = algorithm_version or compute_algorithm_version()
+        self._lock = threading.Lock()
+        # ウォームインデックス: キー -> サイズ
+        self._index: Dict[Tuple[str, str, int, str], int] = {}
+        self._total_bytes = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._load_index()
+
+    def _migrate(self):
+        """テーブルを作成し、バージョンが異なる場合は保存済みの結果を破棄する"""
+        conn = self._conn
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        rows = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+        if rows.get("schema_version") != str(CACHE_SCHEMA_VERSION):
+            conn.execute("DROP TABLE IF EXISTS pages")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                kind TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                page_number INTEGER NOT NULL,
+                options TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (kind, document_id, page_number, options)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+
+        if rows.get("algorithm_version") != self.algorithm_version and rows.get("algorithm_version") is not None:
+            deleted = conn.execute("DELETE FROM pages").rowcount
+            logger.info(f"[persistent_cache] 抽出処理が変更されたため{deleted}件の結果を破棄しました")
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("schema_version", str(CACHE_SCHEMA_VERSION)), ("algorithm_version", self.algorithm_version)]
+        )
+
+    def _load_index(self):
+        """保存済みのキーとサイズをメモリに読み込む"""
+        for kind, document_id, page_number, options, size in self._conn.execute(
+            "SELECT kind, document_id, page_number, options, size FROM pages"
+        ):
+            self._index[(kind, document_id, page_number, options)] = size
+            self._total_bytes += size
+        logger.info(f"[persistent_cache] {len(self._index)}件のページ結果を読み込みました（{self._total_bytes}バイト）: {self.db_path}")
+
+    def get_many(self, kind: str, document_id: str, options: Tuple, page_numbers: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        保存済みのページ結果をまとめて取得する
+
+        Returns:
+            Dict[int, Dict[str, Any]]: ページ番号 -> ページ結果（保存されているページのみ）
+        """
+        options_key = json.dumps(options)
+        with self._lock:
+            wanted = [n for n in page_numbers if (kind, document_id, n, options_key) in self._index]
+            if not wanted:
+                return {}
+
+            pages = {}
+            for offset in range(0, len(wanted), 500):
+                chunk = wanted[offset:offset + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for page_number, payload in self._conn.execute(
+                    f"SELECT page_number, payload FROM pages WHERE kind = ? AND document_id = ? AND options = ? "
+                    f"AND page_number IN ({placeholders})",
+                    (kind, document_id, options_key, *chunk)
+                ):
+                    pages[page_number] = json.loads(payload)
+
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE pages SET last_access = ? WHERE kind = ? AND document_id = ? AND page_number = ? AND options = ?",
+                [(now, kind, document_id, n, options_key) for n in pages]
+            )
+            return pages
+
+    def put_many(self, kind: str, document_id: str, options: Tuple, pages: List[Dict[str, Any]]):
+        """ページ結果をまとめて保存する"""
+        if not pages:
+            return
+
+        options_key = json.dumps(options)
+        now = time.time()
+        rows = []
+        for page_data in pages:
+            payload = json.dumps(page_data, ensure_ascii=False).encode('utf-8')
+            rows.append((kind, document_id, page_data["page_number"], options_key, payload, len(payload), now))
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO pages (kind, document_id, page_number, options, payload, size, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            for row in rows:
+                key = row[:4]
+                self._total_bytes += row[5] - self._index.get(key, 0)
+                self._index[key] = row[5]
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """合計サイズが上限の9割以下になるまで古い結果を削除する（ロック取得済みで呼ぶ）"""
+        target = self.max_bytes * 0.9
+        deleted = 0
+        self._conn.execute("BEGIN")
+        try:
+            rows = self._conn.execute(
+                "SELECT kind, document_id, page_number, options, size FROM pages ORDER BY last_access"
+            ).fetchall()
+            for kind, document_id, page_number, options, size in rows:
+                if self._total_bytes <= target:
+                    break
+                self._conn.execute(
+                    "DELETE FROM pages WHERE kind = ? AND document_id = ? AND page_number = ? AND options = ?",
+                    (kind, document_id, page_number, options)
+                )
+                self._index.pop((kind, document_id, page_number, options), None)
+                self._total_bytes -= size
+                deleted += 1
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        logger.info(f"[persistent_cache] サイズ上限のため{deleted}件の結果を削除しました")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"pages": len(self._index), "bytes": self._total_bytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,32 @@
+"""抽出結果のJSONシリアライズ
+
+ページの抽出結果はワーカー・キャッシュから組み込み型だけの辞書として返るため、
+pydantic モデルを経由せずにそのままバイト列へシリアライズする。
+orjson がインストールされていれば使い、なければ標準ライブラリの json を使う（出力は同じJSON）。
+"""
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson がない環境では標準ライブラリを使う
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """オブジェクトをUTF-8のJSON（空白なし、非ASCII文字はそのまま）にする"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(obj: Any) -> Response:
+    """
+    シリアライズ済みのJSONレスポンスを返す
+
+    エンドポイントが Response を返した場合、FastAPI は response_model による検証と
+    再シリアライズを行わない（response_model はAPIドキュメント用に残す）。
+    """
+    return Response(content=dumps(obj), media_type="application/json")
@@ -0,0 +1,229 @@
+"""抽出結果のテキストの保存（アーカイブ）
+
+/api/extract-text などの抽出結果を extracted_texts に保存する。リクエストの処理中は
+保存内容をキューに入れるだけで、ファイルの書き込み・古いファイルの削除はバックグラウンドの
+書き込みスレッドで行う。保存済みのファイルはメモリ上のインデックスで管理し、
+リクエストごとにディレクトリを検索しない（インデックスは起動時に1回だけディレクトリから復元する）。
+
+保持するファイルは、同じPDF・同じページ範囲（暗号化の有無も区別）ごとの件数と、
+全体の合計サイズで制限する。超えた分は古いものから削除する。
+"""
+import gzip
+import logging
+import os
+import queue
+import re
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# {PDF名}_{日時}_p{ページ範囲}[_encrypted].txt[.gz]
+ARCHIVE_NAME_PATTERN = re.compile(r'^(.+)_(\d{8}_\d{6})_p(.+?)(_encrypted)?\.txt(\.gz)?$')
+
+ArchiveKey = Tuple[str, str, str]  # (PDF名, ページ範囲, サフィックス)
+
+
+def format_archive_header(
+    filename: str,
+    page_label: str,
+    total_pages: int,
+    preserve_layout: bool,
+    apply_formatting: bool,
+    encrypted: bool = False
+) -> str:
+    """保存ファイルの先頭に書くヘッダー（PDF名・抽出日時・ページ範囲・オプション）"""
+    lines = [
+        f"# PDF: {filename}",
+        f"# 抽出日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"# ページ範囲: {page_label.replace('_', ',')}",
+        f"# 総ページ数: {total_pages}",
+        f"# オプション: preserve_layout={preserve_layout}, apply_formatting={apply_formatting}",
+    ]
+    if encrypted:
+        lines.append("# 暗号化: あり")
+    lines.append("=" * 80)
+    return "\n".join(lines) + "\n\n"
+
+
+class TextArchive:
+    """抽出結果のテキストをバックグラウンドで保存する"""
+
+    def __init__(
+        self,
+        root_dir: str,
+        max_bytes: int,
+        max_files_per_document: int = 10,
+        compress: bool = False,
+        queue_size: int = 64
+    ):
+        """
+        Args:
+            root_dir: 保存先ディレクトリ
+            max_bytes: 保存するファイルの合計サイズの上限（バイト、0で無制限）
+            max_files_per_document: 同じPDF・同じページ範囲ごとに保持するファイル数
+            compress: gzipで圧縮して保存するか（.txt.gz）
+            queue_size: 書き込み待ちの上限。超えた分は保存しない（リクエストを待たせない）
+        """
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.max_files_per_document = max(1, max_files_per_document)
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._files: "OrderedDict[str, Tuple[ArchiveKey, int]]" = OrderedDict()  # 古い順
+        self._by_key: Dict[ArchiveKey, Deque[str]] = {}
+        self._total_bytes = 0
+        self._queue: "queue.Queue[Optional[Tuple[ArchiveKey, str, str]]]" = queue.Queue(maxsize=queue_size)
+
+        os.makedirs(root_dir, exist_ok=True)
+        self._load_index()
+
+        self._writer = threading.Thread(target=self._run, name="text-archive-writer", daemon=True)
+        self._writer.start()
+
+    @property
+    def total_bytes(self) -> int:
+        """保存済みファイルの合計サイズ（バイト）"""
+        return self._total_bytes
+
+    def files(self, filename: str, page_label: str, encrypted: bool = False) -> List[str]:
+        """同じPDF・同じページ範囲の保存済みファイル名（古い順）"""
+        with self._lock:
+            return list(self._by_key.get(self._key(filename, page_label, encrypted), ()))
+
+    @staticmethod
+    def _key(filename: str, page_label: str, encrypted: bool) -> ArchiveKey:
+        safe_filename = filename.replace('.pdf', '').replace(' ', '_')
+        return (safe_filename, page_label, "_encrypted" if encrypted else "")
+
+    def _load_index(self):
+        """起動時にディスク上のファイルからインデックスを復元する（更新日時の古い順）"""
+        entries = []
+        for name in os.listdir(self.root_dir):
+            match = ARCHIVE_NAME_PATTERN.match(name)
+            if not match:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.root_dir, name))
+            except OSError:
+                continue
+            key = (match.group(1), match.group(3), match.group(4) or "")
+            entries.append((stat.st_mtime, name, key, stat.st_size))
+
+        with self._lock:
+            for _, name, key, size in sorted(entries):
+                self._add(name, key, size)
+            expired = self._enforce_limits(list(self._by_key))
+        self._delete_files(expired)
+        logger.info(f"[text_archive] {len(self._files)}件の保存済みファイルを読み込みました: {self.root_dir}")
+
+    def submit(
+        self,
+        filename: str,
+        page_label: str,
+        header: str,
+        text: str,
+        encrypted: bool = False
+    ) -> bool:
+        """
+        抽出結果の保存を書き込みスレッドに依頼する（書き込みの完了は待たない）
+
+        Returns:
+            bool: キューに入れた場合True（書き込み待ちが上限に達している場合は保存せずFalse）
+        """
+        key = self._key(filename, page_label, encrypted)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        name = f"{key[0]}_{timestamp}_p{page_label}{key[2]}.txt" + (".gz" if self.compress else "")
+        try:
+            self._queue.put_nowait((key, name, header + text))
+            return True
+        except queue.Full:
+            logger.warning(f"[text_archive] 書き込み待ちが上限に達したため保存しません: {name}")
+            return False
+
+    def flush(self):
+        """キューに入っている書き込みがすべて終わるまで待つ"""
+        self._queue.join()
+
+    def close(self):
+        """残りの書き込みを終えてから書き込みスレッドを停止する"""
+        self._queue.put(None)
+        self._writer.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                logger.error(f"[text_archive] ファイル保存エラー: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, key: ArchiveKey, name: str, content: str):
+        path = os.path.join(self.root_dir, name)
+        data = content.encode('utf-8')
+        if self.compress:
+            data = gzip.compress(data)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        with self._lock:
+            if name in self._files:
+                # 同じ秒に同じ範囲を保存した場合は上書き
+                self._remove_from_index(name)
+            self._add(name, key, len(data))
+            expired = self._enforce_limits([key], keep=name)
+        self._delete_files(expired)
+        logger.info(f"[text_archive] 抽出結果を保存: {path}")
+
+    def _delete_files(self, names: List[str]):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.root_dir, name))
+                logger.info(f"[text_archive] 古いファイルを削除: {name}")
+            except OSError as e:
+                logger.error(f"[text_archive] ファイル削除エラー: {e}")
+
+    def _add(self, name: str, key: ArchiveKey, size: int):
+        self._files[name] = (key, size)
+        self._by_key.setdefault(key, deque()).append(name)
+        self._total_bytes += size
+
+    def _remove_from_index(self, name: str):
+        key, size = self._files.pop(name)
+        names = self._by_key[key]
+        names.remove(name)
+        if not names:
+            del self._by_key[key]
+        self._total_bytes -= size
+
+    def _enforce_limits(self, keys: List[ArchiveKey], keep: Optional[str] = None) -> List[str]:
+        """
+        件数・合計サイズの上限を超えた古いファイルをインデックスから外す（ロックを取得して呼ぶ）
+
+        Args:
+            keys: 件数の上限を確認するPDF・ページ範囲
+            keep: 削除しないファイル（今回保存したファイル）
+
+        Returns:
+            List[str]: 削除するファイル名
+        """
+        expired = []
+        for key in keys:
+            names = self._by_key.get(key)
+            while names and len(names) > self.max_files_per_document:
+                expired.append(names[0])
+                self._remove_from_index(names[0])
+
+        while self.max_bytes > 0 and self._total_bytes > self.max_bytes:
+            oldest = next(iter(self._files))
+            if oldest == keep:
+                break
+            expired.append(oldest)
+            self._remove_from_index(oldest)
+        return expired
@@ -0,0 +1,128 @@
+"""PDFアップロードの受信処理
+
+アップロードされたPDFを一度にメモリへ読み込まず、チャンクごとに一時ファイルへ
+書き出しながらサイズ上限の確認とハッシュ計算を行う。
+リクエストボディ全体のサイズも、受信しながら上限を確認する（UploadSizeLimitMiddleware）。
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Tuple
+
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger(__name__)
+
+# ファイルサイズ制限（100MB）- 大型TRPGシナリオにも対応
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", str(100 * 1024 * 1024)))
+
+# 一時ファイルへ書き出すときのチャンクサイズ
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# multipartの境界やヘッダーの分としてボディサイズの上限に加える余裕
+_MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _too_large_detail(max_size: int) -> str:
+    return f"ファイルサイズが上限（{max_size // (1024 * 1024)}MB）を超えています"
+
+
+async def spool_upload(file: UploadFile, max_size: int = MAX_FILE_SIZE) -> Tuple[str, str, int]:
+    """
+    アップロードされたファイルをチャンクごとに一時ファイルへ書き出す
+
+    書き出しながらサイズ上限を確認し、内容のSHA-256（ドキュメントID）を計算する。
+    上限を超えた場合は一時ファイルを削除して413エラーにする。
+
+    Returns:
+        Tuple[str, str, int]: (一時ファイルパス, ドキュメントID, ファイルサイズ)
+    """
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, temp_path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    logger.warning(f"[upload] サイズ上限を超えたアップロードを拒否: {file.filename}")
+                    raise HTTPException(status_code=413, detail=_too_large_detail(max_size))
+                digest.update(chunk)
+                tmp_file.write(chunk)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    return temp_path, digest.hexdigest(), size
+
+
+class UploadSizeLimitMiddleware:
+    """
+    リクエストボディのサイズを受信しながら確認し、上限を超えたら413を返すASGIミドルウェア
+
+    Content-Lengthが上限を超えている場合はボディを読まずに拒否する。
+    Content-Lengthがない（チャンク転送の）場合は、受信したバイト数が上限を超えた時点で
+    ボディの受信を打ち切る。
+    """
+
+    def __init__(self, app, max_body_size: int = MAX_FILE_SIZE + _MULTIPART_OVERHEAD):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def _reject(self, send):
+        body = ('{"detail":"' + _too_large_detail(self.max_body_size - _MULTIPART_OVERHEAD) + '"}').encode('utf-8')
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_body_size:
+                await self._reject(send)
+                return
+
+        received = 0
+        exceeded = False
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    exceeded = True
+                    # 以降のボディは読まずに打ち切る（アプリ側ではボディの解析エラーになる）
+                    raise HTTPException(status_code=413, detail=_too_large_detail(self.max_body_size - _MULTIPART_OVERHEAD))
+            return message
+
+        async def limited_send(message):
+            nonlocal rejected
+            if exceeded:
+                # アプリが返すエラーレスポンスを413に置き換える
+                if not rejected:
+                    rejected = True
+                    await self._reject(send)
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except HTTPException:
+            if not exceeded:
+                raise
+            if not rejected:
+                rejected = True
+                await self._reject(send)
@@ -0,0 +1,56 @@
+import fitz
+
+from services.document_cache import DocumentCache
+
+
+def _write_pdf(path, page_count):
+    pdf_document = fitz.open()
+    for i in range(page_count):
+        pdf_document.new_page().insert_text((72, 72), f"page {i + 1}")
+    pdf_document.save(str(path))
+    pdf_document.close()
+    return str(path)
+
+
+def test_reuses_open_document(tmp_path):
+    """同じドキュメントIDは開いたドキュメントを再利用し、元ファイルの削除後も使える"""
+    cache = DocumentCache(max_documents=2, max_bytes=10 * 1024 * 1024)
+    pdf_path = _write_pdf(tmp_path / "a.pdf", 3)
+
+    with cache.open(pdf_path, "a") as first:
+        assert len(first) == 3
+    (tmp_path / "a.pdf").unlink()
+    with cache.open(pdf_path, "a") as second:
+        assert second is first
+        assert "page 2" in second[1].get_text()
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    """件数の上限を超えると最終使用が古いドキュメントを閉じる（使用中は使い終わってから閉じる）"""
+    cache = DocumentCache(max_documents=2, max_bytes=10 * 1024 * 1024)
+    paths = {name: _write_pdf(tmp_path / f"{name}.pdf", 1) for name in "abc"}
+
+    with cache.open(paths["a"], "a") as in_use:
+        with cache.open(paths["b"], "b"):
+            pass
+        with cache.open(paths["c"], "c"):
+            pass
+        assert not in_use.is_closed
+    assert in_use.is_closed
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["documents"] == 2
+
+
+def test_without_document_id_is_not_cached(tmp_path):
+    """ドキュメントIDを指定しない場合は毎回開いて閉じる"""
+    cache = DocumentCache(max_documents=2, max_bytes=10 * 1024 * 1024)
+    pdf_path = _write_pdf(tmp_path / "a.pdf", 1)
+    with cache.open(pdf_path) as pdf_document:
+        pass
+    assert pdf_document.is_closed
+    assert cache.stats()["documents"] == 0
@@ -0,0 +1,64 @@
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from services.document_store import DocumentStore, compute_document_id
+from services.pdf_validator import parse_page_set
+
+
+def _put(store, tmp_path, data, filename="a.pdf"):
+    source = tmp_path / f"upload_{compute_document_id(data)[:8]}.pdf"
+    source.write_bytes(data)
+    return store.put(str(source), compute_document_id(data), filename, 3)
+
+
+def test_put_is_content_addressed(tmp_path):
+    """同じ内容は同じIDで1つだけ保存され、再起動後も参照できる"""
+    store = DocumentStore(str(tmp_path / "docs"), ttl_seconds=60, max_bytes=1024)
+    first = _put(store, tmp_path, b"%PDF-1 same")
+    second = _put(store, tmp_path, b"%PDF-1 same", filename="b.pdf")
+    assert first["document_id"] == second["document_id"]
+    assert second["filename"] == "a.pdf"
+    assert len(os.listdir(tmp_path / "docs")) == 2  # PDFとメタデータ
+
+    restored = DocumentStore(str(tmp_path / "docs"), ttl_seconds=60, max_bytes=1024)
+    assert restored.get(first["document_id"])["total_pages"] == 3
+    assert restored.get("0" * 64) is None
+    assert restored.get("../main") is None
+
+
+def test_expired_and_oversized_documents_are_evicted(tmp_path):
+    """期限切れのドキュメントと、サイズ上限を超えた古いドキュメントは削除される"""
+    store = DocumentStore(str(tmp_path / "docs"), ttl_seconds=60, max_bytes=20)
+    old = _put(store, tmp_path, b"%PDF-1 old 1234")
+    store._documents[old["document_id"]]["last_access"] = time.time() - 30
+    new = _put(store, tmp_path, b"%PDF-1 new 5678")
+    assert store.get(old["document_id"]) is None
+    assert store.get(new["document_id"]) is not None
+
+    store._documents[new["document_id"]]["last_access"] = time.time() - 120
+    assert store.get(new["document_id"]) is None
+
+
+def test_open_pins_document(tmp_path):
+    """処理中のドキュメントは削除されない"""
+    store = DocumentStore(str(tmp_path / "docs"), ttl_seconds=60, max_bytes=1024)
+    document_id = _put(store, tmp_path, b"%PDF-1 pinned")["document_id"]
+    with store.open(document_id) as pdf_path:
+        assert os.path.exists(pdf_path)
+        assert not store.delete(document_id)
+    assert store.delete(document_id)
+    with store.open(document_id) as pdf_path:
+        assert pdf_path is None
+
+
+def test_parse_page_set():
+    """ページ集合は昇順に結合された範囲になる"""
+    assert parse_page_set("1-3,7,10-", 12) == [(1, 3), (7, 7), (10, 12)]
+    assert parse_page_set("5, 2-4 ,3", 12) == [(2, 5)]
+    for pages in ("abc", "0", "3-2", "13", ""):
+        with pytest.raises(HTTPException) as exc_info:
+            parse_page_set(pages, 12)
+        assert exc_info.value.status_code == 400
@@ -0,0 +1,57 @@
+import base64
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from services.encrypted_stream import FrameEncryptor, decrypt_frames, load_user_key
+
+
+def _key():
+    return load_user_key(base64.b64encode(os.urandom(32)).decode())
+
+
+def test_frames_round_trip():
+    """レコードごとに独立したフレームになり、順に復号できる"""
+    key = _key()
+    encryptor = FrameEncryptor(key)
+    frames = [
+        encryptor.seal("page", {"page_number": 1, "text": "本文"}),
+        encryptor.seal("done", {"total_pages": 1}),
+    ]
+    assert decrypt_frames(key, b"".join(frames)) == [
+        {"type": "page", "data": {"page_number": 1, "text": "本文"}},
+        {"type": "done", "data": {"total_pages": 1}},
+    ]
+    # 最初のフレームだけでも復号できる
+    assert decrypt_frames(key, frames[0])[0]["type"] == "page"
+
+
+def test_tampered_reordered_or_truncated_frames_are_rejected():
+    key = _key()
+    encryptor = FrameEncryptor(key)
+    first = encryptor.seal("page", {"page_number": 1})
+    second = encryptor.seal("done", {})
+
+    tampered = bytearray(first)
+    tampered[-20] ^= 1
+    with pytest.raises(InvalidTag):
+        decrypt_frames(key, bytes(tampered))
+    with pytest.raises(ValueError):
+        decrypt_frames(key, second + first)
+    with pytest.raises(ValueError):
+        decrypt_frames(key, first + second[:-1])
+
+    # 同じキーで暗号化した別のストリームの同じ通し番号のフレーム
+    other = FrameEncryptor(key)
+    other.seal("page", {"page_number": 1})
+    with pytest.raises(ValueError):
+        decrypt_frames(key, first + other.seal("done", {}))
+
+
+def test_load_user_key():
+    assert len(load_user_key(base64.b64encode(b"k" * 40).decode())) == 32
+    with pytest.raises(ValueError):
+        load_user_key(base64.b64encode(b"short").decode())
+    with pytest.raises(ValueError):
+        load_user_key("not base64!")
@@ -0,0 +1,82 @@
+from services.extract_projection import columnar_blocks, project_extract_result
+
+
+def _result():
+    page = {
+        "page_number": 1,
+        "text": "見出し\n本文",
+        "blocks": [
+            {"bbox": (10.0, 20.0, 110.0, 40.0), "text": "見出し", "font_size": 14.0, "is_bold": True},
+            {"bbox": (10.0, 50.0, 300.0, 70.0), "text": "本文", "font_size": 10.5, "is_bold": False},
+        ],
+        "column_count": 1,
+        "has_header": False,
+        "has_footer": False,
+        "header_text": None,
+        "footer_text": None,
+    }
+    return {
+        "total_pages": 3,
+        "extracted_pages": [page],
+        "full_text": page["text"],
+        "formatted_text": None,
+        "header_region": None,
+        "footer_region": None,
+        "layout": None,
+    }
+
+
+def _utf16_slice(text, start, end):
+    """TypeScript の text.slice(start, end) と同じ（UTF-16のコード単位）"""
+    return text.encode("utf-16-le")[start * 2:end * 2].decode("utf-16-le")
+
+
+def test_columnar_blocks_round_trip():
+    """項目ごとの配列とテキストのオフセットから元のブロックを復元できる"""
+    blocks = _result()["extracted_pages"][0]["blocks"]
+    columns = columnar_blocks(blocks)
+    offsets = columns["text_offsets"]
+    restored = [
+        {
+            "bbox": (columns["x0"][i], columns["y0"][i], columns["x1"][i], columns["y1"][i]),
+            "text": _utf16_slice(columns["text"], offsets[i], offsets[i + 1]),
+            "font_size": columns["font_size"][i],
+            "is_bold": columns["is_bold"][i],
+        }
+        for i in range(len(offsets) - 1)
+    ]
+    assert restored == blocks
+    assert columnar_blocks([]) == {"x0": [], "y0": [], "x1": [], "y1": [], "font_size": [], "is_bold": [], "text": "", "text_offsets": [0]}
+
+
+def test_columnar_offsets_count_utf16_code_units():
+    """サロゲートペアの文字（CJK統合漢字拡張B、絵文字）は2単位と数え、後続のブロックもずれない"""
+    blocks = [
+        {"bbox": (0.0, 0.0, 10.0, 10.0), "text": "𠮷野家", "font_size": 10.0, "is_bold": False},
+        {"bbox": (0.0, 20.0, 10.0, 30.0), "text": "😀", "font_size": 10.0, "is_bold": False},
+        {"bbox": (0.0, 40.0, 10.0, 50.0), "text": "本文", "font_size": 10.0, "is_bold": False},
+    ]
+    columns = columnar_blocks(blocks)
+    offsets = columns["text_offsets"]
+    assert offsets == [0, 4, 6, 8]
+    assert [_utf16_slice(columns["text"], offsets[i], offsets[i + 1]) for i in range(3)] == ["𠮷野家", "😀", "本文"]
+
+
+def test_project_extract_result():
+    result = _result()
+    assert project_extract_result(result) is result
+    assert project_extract_result(result, "text") == {"total_pages": 3, "full_text": "見出し\n本文"}
+
+    pages = project_extract_result(result, "pages")
+    assert set(pages) == {"total_pages", "extracted_pages"}
+    assert "blocks" not in pages["extracted_pages"][0]
+
+    columnar = project_extract_result(result, "blocks", "columnar")
+    assert columnar["extracted_pages"][0]["blocks"]["text_offsets"] == [0, 3, 5]
+    # キャッシュと共有している元の辞書は変更しない
+    assert isinstance(result["extracted_pages"][0]["blocks"], list)
+
+
+def test_layout_is_kept():
+    result = dict(_result(), layout={"total_pages": 3, "pages": []})
+    assert project_extract_result(result, "text")["layout"] == {"total_pages": 3, "pages": []}
@@ -0,0 +1,56 @@
+import random
+
+from common import detect_vertical_gaps
+
+
+def _scan_gaps(blocks, min_gap_width=1):
+    """1ピクセル単位で走査する参照実装"""
+    min_x = min(b["bbox"][0] for b in blocks)
+    max_x = max(b["bbox"][2] for b in blocks)
+    gap_columns = []
+    for x in range(int(min_x), int(max_x) + 1):
+        if all(
+            b["bbox"][1] < 30 or not (b["bbox"][0] - 0.5 <= x <= b["bbox"][2] + 0.5)
+            for b in blocks
+        ):
+            gap_columns.append(x)
+
+    ranges = []
+    for x in gap_columns:
+        if ranges and x == ranges[-1][1] + 1:
+            ranges[-1][1] = x
+        else:
+            ranges.append([x, x])
+    return [(start, end - start + 1) for start, end in ranges if end - start + 1 >= min_gap_width]
+
+
+def _block(x0, y0, x1, y1):
+    return {"bbox": [x0, y0, x1, y1], "lines": []}
+
+
+def test_two_column_gap():
+    """2カラムの間の余白を検出する"""
+    blocks = [_block(50, 100, 280, 120), _block(320, 100, 550, 120)]
+    gaps = detect_vertical_gaps(blocks, 595, 40, 800)
+    assert gaps == [{"x": 281, "width": 39, "y": 40, "height": 760}]
+
+
+def test_top_margin_blocks_are_ignored():
+    """ページ上部30pt以内のブロックは余白を塞がない"""
+    blocks = [_block(50, 100, 280, 120), _block(200, 10, 400, 25), _block(320, 100, 550, 120)]
+    gaps = detect_vertical_gaps(blocks, 595, 0, 842)
+    assert [(g["x"], g["width"]) for g in gaps] == [(281, 39)]
+
+
+def test_matches_pixel_scan():
+    """ランダムなレイアウトで1ピクセル走査と同じ結果になる"""
+    rng = random.Random(0)
+    for _ in range(200):
+        blocks = []
+        for _ in range(rng.randint(1, 25)):
+            x0 = rng.uniform(0, 2000)
+            y0 = rng.uniform(0, 800)
+            blocks.append(_block(x0, y0, x0 + rng.uniform(0, 300), y0 + 12))
+        min_gap_width = rng.choice([1, 5, 30])
+        gaps = detect_vertical_gaps(blocks, 2400, 0, 1000, min_gap_width=min_gap_width)
+        assert [(g["x"], g["width"]) for g in gaps] == _scan_gaps(blocks, min_gap_width)
@@ -0,0 +1,47 @@
+from common import assign_blocks_to_columns, detect_columns_with_blocks, detect_header_footer_boundaries
+from common.geometry import UNASSIGNED, BlockGeometry
+from common.page_model import Block
+
+
+def _block(x0, y0, x1, y1):
+    return Block((x0, y0, x1, y1), [])
+
+
+def test_best_overlap_columns_matches_loop_rules():
+    """重なり率が最大のカラム（同率なら先頭）を選び、しきい値未満と幅0のブロックは割り当てない"""
+    blocks = [
+        _block(0, 0, 100, 10),     # 左カラムに完全に含まれる
+        _block(80, 0, 120, 10),    # 左右に半分ずつ → 先頭のカラム
+        _block(90, 0, 200, 10),    # 左に10/110、右に100/110
+        _block(250, 0, 260, 10),   # どのカラムとも重ならない
+        _block(50, 0, 50, 10),     # 幅0
+    ]
+    geometry = BlockGeometry(blocks)
+    labels = geometry.best_overlap_columns([(0, 100), (100, 200)], 0.5)
+    assert labels.tolist() == [0, 0, 1, UNASSIGNED, UNASSIGNED]
+
+
+def test_assign_blocks_to_columns_sorts_each_column_by_y():
+    """各カラムのブロックはY座標順（同じY座標なら元の順）になる"""
+    first, second, third = _block(0, 50, 90, 60), _block(10, 10, 90, 20), _block(5, 50, 80, 60)
+    columns = assign_blocks_to_columns([first, second, third, _block(300, 0, 400, 10)], [(0, 100), (300, 400)])
+    assert columns[0] == [second, first, third]
+    assert len(columns[1]) == 1
+
+
+def test_header_footer_boundaries_from_indices():
+    """最上部のブロックと下端付近のブロックから境界を決める"""
+    header = _block(50, 20, 300, 35)
+    body = [_block(50, 100, 300, 400), _block(50, 420, 300, 700)]
+    footer = _block(280, 800, 320, 812)
+    header_boundary, footer_boundary = detect_header_footer_boundaries([footer, *body, header], 842)
+    assert header_boundary == (35 + 100) / 2
+    assert footer_boundary == (700 + 800) / 2
+
+
+def test_detect_columns_with_blocks_groups_by_center():
+    """中心X座標でカラムに分け、各カラムは上から下の順になる"""
+    left = [_block(40, y, 280, y + 12) for y in (300, 100, 200)]
+    right = [_block(320, y, 560, y + 12) for y in (150, 50)]
+    columns = detect_columns_with_blocks(left + right)
+    assert [[b.bbox[1] for b in column] for column in columns] == [[100, 200, 300], [50, 150]]
@@ -0,0 +1,62 @@
+from common import Block, HeaderFooterLearner, header_footer_thresholds, normalize_text_pattern
+from common.header_footer_model import MAX_PATTERNS_PER_LEVEL
+
+PAGE_HEIGHT = 800.0
+
+
+def _page(page_number, with_number=True):
+    blocks = [
+        Block((72.0, 20.0, 300.0, 32.0), [], f"第{page_number // 10 + 1}章 ドキュメントの書名"),
+        Block((72.0, 60.0, 500.0, 700.0), [], f"本文 {page_number} ページ目の段落"),
+    ]
+    if with_number:
+        blocks.append(Block((290.0, 770.0, 310.0, 782.0), [], f"- {page_number} -"))
+    return blocks
+
+
+def _learn(page_numbers):
+    learner = HeaderFooterLearner()
+    for page_number in page_numbers:
+        learner.add_page(page_number, PAGE_HEIGHT, _page(page_number, with_number=page_number % 5 != 0))
+    return learner
+
+
+def test_learns_running_header_and_page_numbers():
+    """多くのページで同じ位置に現れるヘッダーとページ番号から共通の領域を決める"""
+    regions = _learn(range(1, 31)).regions()
+    assert regions["header"]["pattern"] == "第#章 ドキュメントの書名"
+    assert regions["header"]["y_end"] == 20.0 + 12.0 * 1.5
+    assert regions["footer"]["pattern"] == "PAGE_NUMBER"
+    assert regions["footer"]["y_start"] == 770.0 - 20
+
+
+def test_merged_ranges_match_sequential_learning():
+    """ページ範囲ごとの学習結果をページ順に結合すると、全ページを順に学習した結果と同じ"""
+    merged = _learn(range(1, 11)).merge(_learn(range(11, 21))).merge(_learn(range(21, 31)))
+    whole = _learn(range(1, 31))
+    assert merged.page_count == whole.page_count
+    assert merged.regions() == whole.regions()
+    footer_counter = merged.footer_levels[0]["PAGE_NUMBER"]
+    assert footer_counter.is_sequential and footer_counter.numbers == 24
+
+
+def test_pattern_counts_stay_bounded():
+    """ページごとに異なるテキストが続いても保持するパターン数は上限以下"""
+    learner = HeaderFooterLearner()
+    for page_number in range(1, 500):
+        learner.add_page(page_number, PAGE_HEIGHT, [
+            Block((72.0, 20.0, 300.0, 32.0), [], "書名"),
+            Block((72.0, 25.0, 300.0, 37.0), [], f"ユニークな見出し{chr(0x4e00 + page_number)}"),
+        ])
+    assert all(len(level) <= MAX_PATTERNS_PER_LEVEL for level in learner.header_levels)
+    assert learner.regions()["header"]["pattern"] == "書名"
+
+
+def test_thresholds_use_document_regions():
+    """共通の領域がある場合は指定割合の帯との狭い方、ない側はヘッダー・フッターなしとする"""
+    assert header_footer_thresholds(800.0, 0.1, 0.1) == (80.0, 720.0)
+    regions = {"header": {"y_end": 38.0, "pattern": "x"}, "footer": None}
+    assert header_footer_thresholds(800.0, 0.1, 0.1, regions) == (38.0, float('inf'))
+    assert HeaderFooterLearner().regions() is None
+    assert normalize_text_pattern("Page 12") == "PAGE_NUMBER"
+    assert normalize_text_pattern("2024年1月5日 作成") == "DATE 作成"
@@ -0,0 +1,83 @@
+import asyncio
+from contextlib import contextmanager
+
+from services import job_manager as job_manager_module
+from services.job_manager import JobManager
+
+
+class _FakeDocumentStore:
+    @contextmanager
+    def open(self, document_id):
+        yield "dummy.pdf"
+
+
+def _patch_extract(monkeypatch, calls, delay=0.0):
+    async def fake_extract(pdf_path, start_page, end_page, document_id=None, **options):
+        calls.append((start_page, end_page))
+        await asyncio.sleep(delay)
+        return {"pages": [{"page_number": n, "text": f"p{n}"} for n in range(start_page, end_page + 1)]}
+
+    monkeypatch.setattr(job_manager_module, "extract_page_range_cached", fake_extract)
+    monkeypatch.setattr(job_manager_module, "JOB_CHUNK_PAGES", 2)
+
+
+async def _wait_for(manager, job_id, statuses):
+    for _ in range(200):
+        info = manager.get(job_id)
+        if info["status"] in statuses:
+            return info
+        await asyncio.sleep(0.01)
+    raise AssertionError(manager.get(job_id))
+
+
+def test_job_resumes_after_restart(monkeypatch, tmp_path):
+    """再起動で中断されたジョブは完了したページの続きから再開する"""
+    calls = []
+    _patch_extract(monkeypatch, calls, delay=0.05)
+
+    async def first_run():
+        manager = JobManager(str(tmp_path), _FakeDocumentStore(), ttl_seconds=60, max_concurrent=1)
+        info = await manager.submit("extract", "doc", "a.pdf", [(1, 3), (7, 9)], {})
+        while manager.get(info["job_id"])["pages_done"] < 2:
+            await asyncio.sleep(0.01)
+        await manager.shutdown()
+        return info["job_id"]
+
+    job_id = asyncio.run(first_run())
+    assert calls[0] == (1, 2)
+
+    async def second_run():
+        manager = JobManager(str(tmp_path), _FakeDocumentStore(), ttl_seconds=60, max_concurrent=1)
+        await manager.start()
+        info = await _wait_for(manager, job_id, ("completed",))
+        return info, manager.read_results(job_id, 0, 100), manager.read_results(job_id, 3, 2)
+
+    info, pages, tail = asyncio.run(second_run())
+    assert info["pages_done"] == info["pages_total"] == 6
+    assert [page["page_number"] for page in pages] == [1, 2, 3, 7, 8, 9]
+    assert [page["page_number"] for page in tail] == [7, 8]
+    # 完了済みの1-2ページは再計算しない
+    assert calls.count((1, 2)) == 1 and (3, 3) in calls
+
+
+def test_cancel_job(monkeypatch, tmp_path):
+    """キャンセルしたジョブは以降のページを処理しない"""
+    calls = []
+    _patch_extract(monkeypatch, calls, delay=0.05)
+
+    async def run():
+        manager = JobManager(str(tmp_path), _FakeDocumentStore(), ttl_seconds=60, max_concurrent=1)
+        running = await manager.submit("extract", "doc", "a.pdf", [(1, 20)], {})
+        queued = await manager.submit("extract", "doc", "b.pdf", [(1, 20)], {})
+        while not calls:
+            await asyncio.sleep(0.005)
+        assert (await manager.cancel(queued["job_id"]))["status"] == "cancelled"
+        # 実行中のジョブは処理中のページ範囲が止まるまで cancelling を返す
+        assert (await manager.cancel(running["job_id"]))["status"] == "cancelling"
+        info = await _wait_for(manager, running["job_id"], ("cancelled",))
+        await asyncio.sleep(0.1)
+        return info
+
+    info = asyncio.run(run())
+    assert info["pages_done"] < 20
+    assert len(calls) == 1
@@ -0,0 +1,60 @@
+import fitz
+
+from pdf_processor import PDFProcessor
+from services.layout_analyzer import analyze_page_layout, analyze_page_range, extract_and_analyze_page_range
+from services.page_extractor import extract_page_range
+
+
+def _make_page():
+    document = fitz.open()
+    page = document.new_page(width=595, height=842)
+    page.insert_text((250, 40), "Scenario Title")
+    page.insert_text((50, 120), "\n".join(f"left column line {i}" for i in range(12)))
+    page.insert_text((330, 120), "\n".join(f"right column line {i}" for i in range(12)))
+    page.insert_text((290, 820), "12")
+    return document, page
+
+
+def test_geometry_matches_structure_extraction():
+    """幾何情報だけの計算は、構造化抽出の境界・ブロックの分類・余白・カラム領域と同じ"""
+    document, page = _make_page()
+    processor = PDFProcessor()
+    geometry = processor.analyze_page_geometry(page)
+    structure = processor.extract_text_with_structure(page)
+    for key, value in geometry.items():
+        if key.startswith("raw_"):
+            assert [b.bbox for b in structure[key]] == [b.bbox for b in value]
+        else:
+            assert structure[key] == value
+    assert geometry["vertical_gaps"] and len(geometry["columns"]) == 2
+    document.close()
+
+
+def test_analyze_page_layout_regions():
+    document, page = _make_page()
+    page_info = analyze_page_layout(page, 0, PDFProcessor())
+    regions = page_info["regions"]
+    assert regions["header"]["text"] == "Scenario Title"
+    assert regions["footer"]["text"] == "12"
+    assert [column["block_count"] for column in regions["columns"]] == [1, 1]
+    assert [column["column_number"] for column in regions["columns"]] == [1, 2]
+    document.close()
+
+
+def test_extract_and_analyze_matches_separate_calls(tmp_path):
+    """1回の解析での抽出とレイアウト解析は、それぞれを別に実行した結果と同じ"""
+    document, _ = _make_page()
+    document.new_page(width=595, height=842).insert_text((50, 100), "second page")
+    pdf_path = str(tmp_path / "a.pdf")
+    document.save(pdf_path)
+    document.close()
+
+    # レイアウト抽出（ヘッダー・フッター除外あり）と構造化抽出
+    for options in ((True, False, True, 0.1, 0.1), (True, True, False, 0.1, 0.1)):
+        for reading_order in ("heuristic", "xycut"):
+            combined = extract_and_analyze_page_range(pdf_path, 1, None, *options, reading_order=reading_order)
+            extracted = extract_page_range(pdf_path, 1, None, *options, reading_order=reading_order)
+            layout = analyze_page_range(pdf_path, 1, None, reading_order=reading_order)
+            assert combined["end_page"] == 2
+            assert [p["page"] for p in combined["pages"]] == extracted["pages"]
+            assert [p["layout"] for p in combined["pages"]] == layout["pages"]
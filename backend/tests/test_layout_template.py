@@ -0,0 +1,65 @@
+import random
+
+from common import (
+    LayoutTemplateCache,
+    as_blocks,
+    calculate_columns_from_gaps,
+    detect_vertical_gaps,
+    geometry_signature,
+)
+
+
+def _block(x0, y0, x1, y1):
+    return {"bbox": [x0, y0, x1, y1], "lines": []}
+
+
+def _detect(blocks, header_boundary, footer_boundary):
+    """テンプレートを使わない検出（参照結果）"""
+    vertical_gaps = detect_vertical_gaps(blocks, 595, header_boundary, footer_boundary)
+    columns = calculate_columns_from_gaps(vertical_gaps, blocks, 595, header_boundary, footer_boundary) if vertical_gaps else []
+    return vertical_gaps, columns
+
+
+def test_same_geometry_reuses_template():
+    """占有区間が同じページはテンプレートを再利用し、Y方向の値はページごとに埋める"""
+    cache = LayoutTemplateCache()
+    page1 = as_blocks([_block(50, 100, 280, 120), _block(320, 100, 550, 400)])
+    page2 = as_blocks([_block(50, 300, 280, 320), _block(50, 500, 280, 520), _block(320, 80, 550, 90)])
+
+    assert cache.detect(page1, 595, 40, 800) == _detect(page1, 40, 800)
+    assert cache.detect(page2, 595, 60, 780) == _detect(page2, 60, 780)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_different_edges_fall_back_to_detection():
+    """左右端（小数）が違うページはシグネチャが同じでも通常の検出を行う"""
+    cache = LayoutTemplateCache()
+    page1 = as_blocks([_block(50.0, 100, 280, 120), _block(320, 100, 550.0, 120)])
+    page2 = as_blocks([_block(50.2, 100, 280, 120), _block(320, 100, 550.3, 120)])
+    assert geometry_signature(page1)[0] == geometry_signature(page2)[0]
+
+    cache.detect(page1, 595, 40, 800)
+    assert cache.detect(page2, 595, 40, 800) == _detect(page2, 40, 800)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_matches_detection_for_random_pages():
+    """ランダムなページを続けて処理しても、結果は常にテンプレートなしの検出と同じ"""
+    rnd = random.Random(0)
+    cache = LayoutTemplateCache(max_templates=4)
+    for _ in range(500):
+        blocks = []
+        for _ in range(rnd.randint(1, 6)):
+            x0 = rnd.choice([40, 40.4, 300, 300.5]) + rnd.choice([0, 0, 0.3, 1])
+            y0 = rnd.uniform(0, 800)
+            blocks.append(_block(x0, y0, x0 + rnd.choice([200, 250.2, 100]), y0 + 10))
+        blocks = as_blocks(blocks)
+        header_boundary, footer_boundary = rnd.uniform(0, 50), rnd.uniform(700, 842)
+        assert cache.detect(blocks, 595, header_boundary, footer_boundary) == _detect(blocks, header_boundary, footer_boundary)
+    assert cache.hits > 0
+
+
+def test_empty_page():
+    cache = LayoutTemplateCache()
+    assert cache.detect([], 595, 40, 800) == ([], [])
+    assert geometry_signature([]) is None
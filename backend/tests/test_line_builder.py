@@ -0,0 +1,44 @@
+import random
+
+from common import group_words_into_lines
+
+
+def _naive_group(words, tolerance=3, x_gap_threshold=50):
+    """全行・全ワードを走査する参照実装"""
+    lines_dict = {}
+    for x0, y0, x1, y1, text, block_no, *_ in words:
+        word = {"x0": x0, "y0": y0, "x1": x1, "y1": y1, "text": text, "block_no": block_no}
+        for line_key, line_words in lines_dict.items():
+            if abs(y0 - line_key[0]) < tolerance and any(
+                min(abs(x0 - w["x1"]), abs(x1 - w["x0"])) < x_gap_threshold for w in line_words
+            ):
+                line_words.append(word)
+                break
+        else:
+            lines_dict[(y0, (x0, x1))] = [word]
+    for line_words in lines_dict.values():
+        line_words.sort(key=lambda w: w["x0"])
+    return lines_dict
+
+
+def test_splits_distant_words_on_same_baseline():
+    """同じY座標でも離れたワードは別の行になる"""
+    words = [
+        (50, 100, 80, 110, "左", 0, 0, 0),
+        (85, 101, 120, 111, "カラム", 0, 0, 1),
+        (320, 100, 360, 110, "右", 1, 0, 0),
+    ]
+    lines = group_words_into_lines(words)
+    assert [[w["text"] for w in line] for line in lines.values()] == [["左", "カラム"], ["右"]]
+
+
+def test_matches_naive_grouping():
+    """ランダムなワード配置で参照実装と同じ行になる"""
+    rng = random.Random(0)
+    for _ in range(100):
+        words = []
+        for i in range(rng.randint(1, 300)):
+            x0 = rng.uniform(0, 600)
+            y0 = rng.choice([100, 114, 128, 142]) + rng.uniform(-2, 2)
+            words.append((x0, y0, x0 + rng.uniform(5, 60), y0 + 10, f"w{i}", 0, 0, i))
+        assert group_words_into_lines(words) == _naive_group(words)
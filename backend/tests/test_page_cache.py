@@ -0,0 +1,148 @@
+import asyncio
+
+from services import page_cache as page_cache_module
+from common import HeaderFooterLearner, StyleProfile
+from services.page_cache import PageResultCache, extract_page_range_cached, get_document_profile
+from services.persistent_cache import PersistentPageCache
+
+
+def _page(page_number, text="本文"):
+    return {
+        "page_number": page_number, "text": text, "blocks": [], "column_count": 1,
+        "has_header": False, "has_footer": False, "header_text": None, "footer_text": None
+    }
+
+
+def test_reuses_computed_pages(monkeypatch):
+    """計算済みのページは再利用し、残りのページだけを抽出する"""
+    calls = []
+
+    async def fake_extract(pdf_path, start_page, end_page, *args, document_id=None, style_stats=None, header_footer_regions=None, reading_order=None):
+        calls.append((start_page, end_page))
+        return {"total_pages": 60, "end_page": end_page, "pages": [_page(n) for n in range(start_page, end_page + 1)]}
+
+    async def fake_run_in_worker(func, *args):
+        return 60
+
+    async def fake_collect_document_profile(pdf_path, document_id=None):
+        return StyleProfile({10.0: 100}), HeaderFooterLearner()
+
+    monkeypatch.setattr(page_cache_module, "page_cache", PageResultCache(10 * 1024 * 1024))
+    monkeypatch.setattr(page_cache_module, "extract_page_range_parallel", fake_extract)
+    monkeypatch.setattr(page_cache_module, "run_in_worker", fake_run_in_worker)
+    monkeypatch.setattr(page_cache_module, "collect_document_profile_parallel", fake_collect_document_profile)
+
+    options = (True, False, False, 0.1, 0.1)
+    asyncio.run(extract_page_range_cached("a.pdf", 1, 40, *options, document_id="doc"))
+    asyncio.run(extract_page_range_cached("a.pdf", 45, 46, *options, document_id="doc"))
+    result = asyncio.run(extract_page_range_cached("a.pdf", 1, 50, *options, document_id="doc"))
+
+    assert calls == [(1, 40), (45, 46), (41, 44), (47, 50)]
+    assert [page["page_number"] for page in result["pages"]] == list(range(1, 51))
+    assert result["total_pages"] == 60 and result["end_page"] == 50
+
+    # 結果に影響しないオプションの違いでは再計算しない
+    asyncio.run(extract_page_range_cached("a.pdf", 1, 10, True, True, False, 0.1, 0.1, document_id="doc"))
+    asyncio.run(extract_page_range_cached("a.pdf", 1, 10, True, True, True, 0.2, 0.3, document_id="doc"))
+    assert calls[-1] == (1, 10) and len(calls) == 5
+
+
+def test_formatting_uses_document_style_stats(monkeypatch):
+    """apply_formatting では全ページの集計から作った基準値を、ドキュメントごとに1回だけ作って全範囲で使う"""
+    received = []
+    profiles = []
+
+    async def fake_extract(pdf_path, start_page, end_page, *args, document_id=None, style_stats=None, header_footer_regions=None, reading_order=None):
+        received.append((start_page, style_stats))
+        return {"total_pages": 60, "end_page": end_page, "pages": [_page(n) for n in range(start_page, end_page + 1)]}
+
+    async def fake_run_in_worker(func, *args):
+        return 60
+
+    async def fake_collect_document_profile(pdf_path, document_id=None):
+        profiles.append(document_id)
+        await asyncio.sleep(0)
+        return StyleProfile({10.0: 300, 18.0: 20}), HeaderFooterLearner()
+
+    monkeypatch.setattr(page_cache_module, "page_cache", PageResultCache(10 * 1024 * 1024))
+    monkeypatch.setattr(page_cache_module, "extract_page_range_parallel", fake_extract)
+    monkeypatch.setattr(page_cache_module, "run_in_worker", fake_run_in_worker)
+    monkeypatch.setattr(page_cache_module, "collect_document_profile_parallel", fake_collect_document_profile)
+
+    async def run():
+        await extract_page_range_cached("a.pdf", 3, 4, True, True, False, 0.1, 0.1, document_id="doc")
+        await extract_page_range_cached("a.pdf", 1, 10, True, True, False, 0.1, 0.1, document_id="doc")
+
+    asyncio.run(run())
+    assert profiles == ["doc"]
+    assert [start for start, _ in received] == [3, 1, 5]
+    assert all(stats["common_font_size"] == 10.0 for _, stats in received)
+
+
+def test_learns_header_footer_only_when_used(monkeypatch):
+    """ヘッダー・フッター領域の学習は、結果に使う抽出（構造化、remove_headers_footers）でだけ行う"""
+    received = []
+    learned = []
+
+    async def fake_extract(pdf_path, start_page, end_page, *args, document_id=None, style_stats=None, header_footer_regions=None, reading_order=None):
+        received.append((args[:3], header_footer_regions))
+        return {"total_pages": 60, "end_page": end_page, "pages": [_page(n) for n in range(start_page, end_page + 1)]}
+
+    async def fake_run_in_worker(func, *args):
+        return 60
+
+    async def fake_collect_document_profile(pdf_path, document_id=None):
+        learned.append(document_id)
+        learner = HeaderFooterLearner()
+        learner.regions = lambda: {"header": None, "footer": None}
+        return StyleProfile({10.0: 100}), learner
+
+    monkeypatch.setattr(page_cache_module, "page_cache", PageResultCache(10 * 1024 * 1024))
+    monkeypatch.setattr(page_cache_module, "extract_page_range_parallel", fake_extract)
+    monkeypatch.setattr(page_cache_module, "run_in_worker", fake_run_in_worker)
+    monkeypatch.setattr(page_cache_module, "collect_document_profile_parallel", fake_collect_document_profile)
+
+    asyncio.run(extract_page_range_cached("a.pdf", 1, 2, True, False, False, 0.1, 0.1, document_id="doc"))
+    asyncio.run(extract_page_range_cached("a.pdf", 1, 2, False, False, True, 0.1, 0.1, document_id="doc"))
+    assert learned == []
+    assert [regions for _, regions in received] == [None, None]
+
+    asyncio.run(extract_page_range_cached("a.pdf", 1, 2, True, False, True, 0.1, 0.1, document_id="doc"))
+    asyncio.run(extract_page_range_cached("a.pdf", 1, 2, True, True, False, 0.1, 0.1, document_id="doc"))
+    assert learned == ["doc"]
+    assert [regions for _, regions in received[2:]] == [{"header": None, "footer": None}] * 2
+
+
+def test_document_profile_is_stored_on_disk(monkeypatch, tmp_path):
+    """ドキュメント単位の値はディスクキャッシュにも保存し、メモリにない場合は再計算しない"""
+    profiles = []
+
+    async def fake_collect_document_profile(pdf_path, document_id=None):
+        profiles.append(document_id)
+        learner = HeaderFooterLearner()
+        learner.regions = lambda: {"header": {"y_end": 40.0, "pattern": "書名"}, "footer": None}
+        return StyleProfile({10.0: 300, 18.0: 20}), learner
+
+    monkeypatch.setattr(page_cache_module, "collect_document_profile_parallel", fake_collect_document_profile)
+    monkeypatch.setattr(page_cache_module, "persistent_cache", PersistentPageCache(str(tmp_path / "cache.db"), 1024 * 1024))
+
+    monkeypatch.setattr(page_cache_module, "page_cache", PageResultCache(10 * 1024 * 1024))
+    computed = asyncio.run(get_document_profile("a.pdf", "doc"))
+    # 再起動後（メモリのキャッシュが空）
+    monkeypatch.setattr(page_cache_module, "page_cache", PageResultCache(10 * 1024 * 1024))
+    stored = asyncio.run(get_document_profile("a.pdf", "doc"))
+
+    assert profiles == ["doc"]
+    assert stored == computed
+    assert stored["style_stats"]["common_font_size"] == 10.0
+    assert stored["header_footer"]["header"]["pattern"] == "書名"
+
+
+def test_evicts_by_size():
+    """合計サイズの上限を超えると古いページから削除する"""
+    cache = PageResultCache(max_bytes=3000)
+    for n in range(1, 6):
+        cache.put("doc", n, ("plain",), _page(n, "x" * 500))
+    assert cache.stats()["bytes"] <= 3000
+    assert cache.get("doc", 1, ("plain",)) is None
+    assert cache.get("doc", 5, ("plain",))["page_number"] == 5
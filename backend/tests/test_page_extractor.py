@@ -0,0 +1,36 @@
+import fitz
+
+from common import extract_with_layout, detect_header_footer
+from services.page_extractor import extract_layout_page, _filter_header_footer_blocks
+
+
+def _make_page():
+    document = fitz.open()
+    page = document.new_page(width=595, height=842)
+    page.insert_text((250, 40), "Scenario Title")
+    for i in range(12):
+        page.insert_text((50, 120 + i * 14), f"left column line {i}")
+        page.insert_text((330, 120 + i * 14), f"right column line {i}")
+    page.insert_text((290, 820), "12")
+    return document, page
+
+
+def test_extract_layout_page_matches_two_pass_extraction():
+    """1回の処理で、ブロック化とレイアウト抽出を2回行う従来の処理と同じ結果になる"""
+    document, page = _make_page()
+    for remove_headers_footers in (False, True):
+        _, _, _, text_blocks = extract_with_layout(page)
+        has_header, has_footer, header_text, footer_text = detect_header_footer(page, text_blocks, 0.1, 0.1)
+        filtered_blocks = text_blocks
+        if remove_headers_footers:
+            filtered_blocks = _filter_header_footer_blocks(
+                text_blocks, page.rect.height * 0.1, page.rect.height * 0.9, 0, has_header, has_footer
+            )
+        text, block_infos, column_count, _ = extract_with_layout(page, filtered_blocks)
+
+        assert extract_layout_page(page, 0, remove_headers_footers, 0.1, 0.1) == (
+            text, block_infos, column_count, has_header, has_footer, header_text, footer_text
+        )
+    assert has_header and has_footer
+    assert "Scenario Title" not in text and "left column line 0" in text
+    document.close()
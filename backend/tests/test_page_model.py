@@ -0,0 +1,39 @@
+from common import Block, as_blocks, blocks_from_page_dict
+
+
+def _block_dict(font="Helvetica-Bold"):
+    return {
+        "type": 0,
+        "number": 3,
+        "bbox": (10.0, 20.0, 110.0, 40.0),
+        "lines": [{
+            "bbox": (10.0, 20.0, 110.0, 40.0),
+            "spans": [{"text": "見出し", "bbox": (10.0, 20.0, 60.0, 40.0), "size": 14.0, "font": font, "flags": 16, "color": 0}]
+        }]
+    }
+
+
+def test_from_dict_keeps_layout_fields():
+    """get_text("dict") のブロックからレイアウト解析で使う項目を取り出す"""
+    block = Block.from_dict(_block_dict())
+    assert block.bbox == (10.0, 20.0, 110.0, 40.0)
+    assert block.text is None
+    span = block.lines[0].spans[0]
+    assert (span.text, span.size, span.font, span.flags) == ("見出し", 14.0, "Helvetica-Bold", 16)
+    assert not hasattr(block, "__dict__") and not hasattr(span, "__dict__")
+    assert Block.from_dict(block.to_dict()).to_dict() == block.to_dict()
+
+
+def test_font_names_are_interned():
+    """同じフォント名は同じ文字列オブジェクトを共有する"""
+    first = Block.from_dict(_block_dict("".join(["Mincho", "-Bold"])))
+    second = Block.from_dict(_block_dict("".join(["Mincho", "-Bold"])))
+    assert first.lines[0].spans[0].font is second.lines[0].spans[0].font
+
+
+def test_as_blocks_converts_only_dicts():
+    """Block はそのまま、辞書は Block に変換する"""
+    block = Block((0, 0, 1, 1), [])
+    converted = as_blocks([block, _block_dict()])
+    assert converted[0] is block and isinstance(converted[1], Block)
+    assert len(blocks_from_page_dict({"blocks": [_block_dict(), {"type": 1, "bbox": (0, 0, 1, 1)}]})) == 1
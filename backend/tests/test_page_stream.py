@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+from services import page_stream as page_stream_module
+from services.page_stream import format_stream_event, iter_extracted_pages, split_stream_chunks
+
+
+def test_split_stream_chunks_starts_with_single_page():
+    """最初のチャンクは1ページで、残りはチャンクサイズごとにページ順に分割する"""
+    assert split_stream_chunks(3, 12, chunk_pages=4) == [(3, 3), (4, 7), (8, 11), (12, 12)]
+    assert split_stream_chunks(5, 5, chunk_pages=4) == [(5, 5)]
+    assert split_stream_chunks(6, 5, chunk_pages=4) == []
+
+
+def test_format_stream_event():
+    """NDJSONは1行1レコード、SSEはイベント名付きのフレームになる"""
+    line = format_stream_event("page", {"page_number": 1, "text": "本文"}, "ndjson")
+    assert line.endswith("\n") and line.count("\n") == 1
+    assert json.loads(line) == {"type": "page", "data": {"page_number": 1, "text": "本文"}}
+
+    frame = format_stream_event("done", {"total_pages": 3}, "sse")
+    assert frame == 'event: done\ndata: {"total_pages": 3}\n\n'
+
+
+def test_first_chunks_do_not_wait_for_document_profile(monkeypatch):
+    """ドキュメント単位の値が未計算の場合、最初のチャンクは値を待たずに抽出して provisional を付ける"""
+    calls = []
+    profiled = []
+
+    def fake_extract(kind):
+        async def extract(pdf_path, start_page, end_page, *args, document_id=None):
+            calls.append((kind, start_page, end_page))
+            pages = [{"page_number": n} for n in range(start_page, end_page + 1)]
+            if kind == "provisional":
+                for page in pages:
+                    page["provisional"] = True
+            return {"pages": pages}
+        return extract
+
+    async def fake_total_pages(pdf_path, document_id=None):
+        return 10
+
+    async def fake_get_document_profile(pdf_path, document_id=None):
+        profiled.append(document_id)
+        return {"style_stats": {}, "header_footer": None}
+
+    async def fake_has_document_profile(document_id):
+        return bool(profiled)
+
+    monkeypatch.setattr(page_stream_module, "extract_page_range_cached", fake_extract("cached"))
+    monkeypatch.setattr(page_stream_module, "extract_page_range_provisional", fake_extract("provisional"))
+    monkeypatch.setattr(page_stream_module, "get_total_pages", fake_total_pages)
+    monkeypatch.setattr(page_stream_module, "get_document_profile", fake_get_document_profile)
+    monkeypatch.setattr(page_stream_module, "has_document_profile", fake_has_document_profile)
+    monkeypatch.setattr(page_stream_module, "PDF_WORKER_PROCESSES", 2)
+
+    async def collect(*options):
+        return [page async for page in iter_extracted_pages("a.pdf", [(1, None)], *options, 0.1, 0.1, document_id="doc")]
+
+    pages = asyncio.run(collect(True, True, False))
+    assert [page["page_number"] for page in pages] == list(range(1, 11))
+    # ワーカー数分のチャンク（1ページ + 4ページ）だけが値を待たずに抽出される
+    assert calls == [("provisional", 1, 1), ("provisional", 2, 5), ("cached", 6, 9), ("cached", 10, 10)]
+    assert [page["page_number"] for page in pages if page.get("provisional")] == [1, 2, 3, 4, 5]
+    assert profiled == ["doc"]
+
+    # 計算済みの場合、またはドキュメント単位の値を使わない抽出では待つ必要がない
+    calls.clear()
+    asyncio.run(collect(True, True, False))
+    asyncio.run(collect(True, False, False))
+    assert {kind for kind, _, _ in calls} == {"cached"}
@@ -0,0 +1,17 @@
+from services.parallel_extractor import split_page_range
+
+
+def test_split_page_range_covers_range_in_order():
+    """シャードはページ順に範囲全体を重複なく覆う"""
+    shards = split_page_range(3, 400, max_shards=16, min_pages=8)
+    assert len(shards) == 16
+    assert shards[0][0] == 3 and shards[-1][1] == 400
+    for (_, prev_end), (next_start, _) in zip(shards, shards[1:]):
+        assert next_start == prev_end + 1
+
+
+def test_split_page_range_respects_min_pages():
+    """小さな範囲は最小ページ数を下回るほど分割しない"""
+    assert split_page_range(1, 10, max_shards=16, min_pages=8) == [(1, 10)]
+    assert split_page_range(1, 20, max_shards=16, min_pages=8) == [(1, 10), (11, 20)]
+    assert split_page_range(5, 4, max_shards=16, min_pages=8) == []
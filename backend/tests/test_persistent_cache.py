@@ -0,0 +1,48 @@
+from services.persistent_cache import PersistentPageCache
+
+
+def _page(page_number, text="本文"):
+    return {"page_number": page_number, "text": text, "blocks": [{"bbox": [0.5, 1, 2, 3], "text": text}]}
+
+
+def test_survives_reopen(tmp_path):
+    """保存した結果は開き直しても取得でき、オプションが異なれば別の結果になる"""
+    db_path = str(tmp_path / "cache.sqlite3")
+    cache = PersistentPageCache(db_path, max_bytes=1024 * 1024, algorithm_version="v1")
+    cache.put_many("extract", "doc", ("layout", False, 0.1, 0.1), [_page(1), _page(2)])
+    cache.close()
+
+    cache = PersistentPageCache(db_path, max_bytes=1024 * 1024, algorithm_version="v1")
+    assert cache.stats()["pages"] == 2
+    assert cache.get_many("extract", "doc", ("layout", False, 0.1, 0.1), [1, 2, 3]) == {1: _page(1), 2: _page(2)}
+    assert cache.get_many("extract", "doc", ("plain",), [1]) == {}
+    assert cache.get_many("layout", "doc", ("layout", False, 0.1, 0.1), [1]) == {}
+    cache.close()
+
+
+def test_algorithm_change_invalidates(tmp_path):
+    """抽出処理のバージョンが変わると保存済みの結果を破棄する"""
+    db_path = str(tmp_path / "cache.sqlite3")
+    cache = PersistentPageCache(db_path, max_bytes=1024 * 1024, algorithm_version="v1")
+    cache.put_many("extract", "doc", ("plain",), [_page(1)])
+    cache.close()
+
+    cache = PersistentPageCache(db_path, max_bytes=1024 * 1024, algorithm_version="v2")
+    assert cache.stats()["pages"] == 0
+    assert cache.get_many("extract", "doc", ("plain",), [1]) == {}
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    """合計サイズの上限を超えると最終アクセスが古い結果から削除する"""
+    cache = PersistentPageCache(str(tmp_path / "cache.sqlite3"), max_bytes=800, algorithm_version="v1")
+    cache.put_many("extract", "old", ("plain",), [_page(1, "x" * 100)])
+    cache.put_many("extract", "hot", ("plain",), [_page(1, "y" * 100)])
+    assert cache.get_many("extract", "old", ("plain",), [1])  # old を最近使ったことにする
+    cache.put_many("extract", "new", ("plain",), [_page(1, "z" * 100)])
+
+    assert cache.stats()["bytes"] <= 800
+    assert cache.get_many("extract", "hot", ("plain",), [1]) == {}
+    assert cache.get_many("extract", "old", ("plain",), [1])
+    assert cache.get_many("extract", "new", ("plain",), [1])
+    cache.close()
@@ -0,0 +1,63 @@
+import random
+
+from common import as_blocks, xy_cut
+
+
+def _block(x0, y0, x1, y1):
+    return {"bbox": [x0, y0, x1, y1], "lines": []}
+
+
+def test_title_then_two_columns():
+    """ページ幅の見出しの下の2カラムは、見出し → 左カラム → 右カラムの順"""
+    blocks = as_blocks([
+        _block(320, 100, 550, 120),  # 0: 右カラム上
+        _block(50, 40, 550, 60),     # 1: 見出し
+        _block(50, 130, 280, 150),   # 2: 左カラム下
+        _block(50, 100, 280, 120),   # 3: 左カラム上
+        _block(320, 130, 550, 150),  # 4: 右カラム下
+    ])
+    tree = xy_cut(blocks)
+    assert tree.order() == [1, 3, 2, 0, 4]
+    assert tree.segments() == [[1], [3, 2], [0, 4]]
+    assert tree.column_count() == 2
+
+
+def test_full_width_between_column_sections():
+    """カラムの区間の間にあるページ幅のブロックで、前後のカラムを分けて読む"""
+    blocks = as_blocks([
+        _block(50, 100, 280, 120),
+        _block(320, 100, 550, 120),
+        _block(50, 140, 550, 160),
+        _block(50, 180, 280, 200),
+        _block(320, 180, 550, 200),
+    ])
+    assert xy_cut(blocks).order() == [0, 1, 2, 3, 4]
+
+
+def test_page_number_between_columns_is_read_last():
+    """カラムの間の下端にあるページ番号は、カラムではなく最後の帯として読む"""
+    blocks = as_blocks([
+        _block(290, 800, 300, 812),
+        _block(50, 100, 280, 400),
+        _block(320, 100, 550, 400),
+    ])
+    tree = xy_cut(blocks)
+    assert tree.order() == [1, 2, 0]
+    assert tree.column_count() == 2
+
+
+def test_random_pages_cover_all_blocks():
+    rnd = random.Random(0)
+    for _ in range(300):
+        blocks = []
+        for _ in range(rnd.randint(1, 40)):
+            x0 = rnd.choice([rnd.uniform(0, 500), 50, 300])
+            y0 = rnd.uniform(0, 800)
+            blocks.append(_block(x0, y0, x0 + rnd.uniform(1, 300), y0 + rnd.uniform(1, 40)))
+        tree = xy_cut(as_blocks(blocks))
+        assert sorted(tree.order()) == list(range(len(blocks)))
+        assert [i for segment in tree.segments() for i in segment] == tree.order()
+
+
+def test_empty():
+    assert xy_cut([]) is None
@@ -0,0 +1,22 @@
+import json
+
+from services import serialization
+
+
+def test_dumps_matches_stdlib_json():
+    """orjson の有無によらず、非ASCII文字をそのまま含む同じ内容のJSONになる"""
+    data = {"page_number": 1, "text": "本文", "blocks": [{"bbox": (1.5, 2.0, 3.25, 4.0), "is_bold": False}], "header_text": None}
+    output = serialization.dumps(data)
+    assert "本文".encode("utf-8") in output
+    assert json.loads(output) == json.loads(json.dumps(data))
+
+
+def test_dumps_without_orjson(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert serialization.dumps({"text": "本文", "n": [1, 2.5]}) == '{"text":"本文","n":[1,2.5]}'.encode("utf-8")
+
+
+def test_json_response():
+    response = serialization.json_response({"total_pages": 3})
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == {"total_pages": 3}
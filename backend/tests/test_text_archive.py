@@ -0,0 +1,71 @@
+import gzip
+import os
+
+from services.text_archive import TextArchive, format_archive_header
+
+
+def _existing(root, count, label="1-3", size=10):
+    """過去に保存したファイル（古い順に更新日時を設定）"""
+    os.makedirs(root, exist_ok=True)
+    for i in range(count):
+        path = os.path.join(root, f"a_20240101_0000{i:02d}_p{label}.txt")
+        with open(path, "w") as f:
+            f.write("x" * size)
+        os.utime(path, (1000 + i, 1000 + i))
+
+
+def test_keeps_latest_files_per_document(tmp_path):
+    """同じPDF・同じページ範囲のファイルは上限の件数まで、古いものから削除する"""
+    root = str(tmp_path / "texts")
+    _existing(root, 10)
+    archive = TextArchive(root, max_bytes=0, max_files_per_document=10)
+    assert archive.submit("a.pdf", "1-3", "# header\n", "本文")
+    assert archive.submit("a.pdf", "4-5", "# header\n", "別の範囲")
+    archive.flush()
+
+    names = archive.files("a.pdf", "1-3")
+    assert len(names) == 10
+    assert "a_20240101_000000_p1-3.txt" not in names
+    assert sorted(os.listdir(root)) == sorted(names + archive.files("a.pdf", "4-5"))
+    with open(os.path.join(root, names[-1]), encoding="utf-8") as f:
+        assert f.read() == "# header\n本文"
+    archive.close()
+
+
+def test_total_bytes_limit_and_restore(tmp_path):
+    """合計サイズの上限を超えた分は古いものから削除し、再起動後はディレクトリからインデックスを復元する"""
+    root = str(tmp_path / "texts")
+    _existing(root, 3, label="9-9", size=40)
+    archive = TextArchive(root, max_bytes=100)
+    assert len(archive.files("a.pdf", "9-9")) == 2
+    archive.submit("b.pdf", "1-1", "", "y" * 50)
+    archive.flush()
+    archive.close()
+
+    restored = TextArchive(root, max_bytes=100)
+    assert restored.files("a.pdf", "9-9") == ["a_20240101_000002_p9-9.txt"]
+    assert len(restored.files("b.pdf", "1-1")) == 1
+    assert restored.total_bytes == 90 == sum(os.path.getsize(os.path.join(root, n)) for n in os.listdir(root))
+    restored.close()
+
+
+def test_compressed_and_encrypted_archives(tmp_path):
+    archive = TextArchive(str(tmp_path), max_bytes=0, compress=True)
+    header = format_archive_header("my file.pdf", "1-2_5-5", 9, True, False, encrypted=True)
+    archive.submit("my file.pdf", "1-2_5-5", header, "本文", encrypted=True)
+    archive.close()
+
+    (name,) = archive.files("my file.pdf", "1-2_5-5", encrypted=True)
+    assert name.startswith("my_file_") and name.endswith("_p1-2_5-5_encrypted.txt.gz")
+    with gzip.open(tmp_path / name, "rt", encoding="utf-8") as f:
+        content = f.read()
+    assert "# ページ範囲: 1-2,5-5\n" in content and "# 暗号化: あり\n" in content
+    assert content.endswith("=" * 80 + "\n\n本文")
+
+
+def test_full_queue_does_not_block(tmp_path):
+    """書き込み待ちが上限に達した場合は保存せずにすぐ戻る"""
+    archive = TextArchive(str(tmp_path), max_bytes=0, queue_size=1)
+    archive.close()  # 書き込みスレッドを止めてキューを埋める
+    assert archive.submit("a.pdf", "1-1", "", "text")
+    assert not archive.submit("a.pdf", "2-2", "", "text")
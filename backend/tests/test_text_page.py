@@ -0,0 +1,51 @@
+import fitz
+
+from common import PageTextContext, blocks_from_page_dict
+from pdf_processor import PDFProcessor
+
+
+def _make_page_with_image():
+    document = fitz.open()
+    page = document.new_page(width=595, height=842)
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False)
+    pixmap.clear_with(200)
+    page.insert_image(fitz.Rect(50, 200, 150, 300), pixmap=pixmap)
+    page.insert_text((250, 40), "Scenario Title")
+    for i in range(10):
+        page.insert_text((50, 320 + i * 14), f"body line {i}")
+    return document, page
+
+
+def test_views_match_page_get_text():
+    """1つのTextPageから作った words / dict / text は page.get_text と同じ内容になる"""
+    document, page = _make_page_with_image()
+    text_page = PageTextContext(page)
+
+    assert text_page.words == page.get_text("words")
+    assert text_page.text == page.get_text()
+    # 画像ブロックは含まない（テキストブロックは同じ）
+    expected_blocks = blocks_from_page_dict(page.get_text("dict"))
+    assert all(b["type"] == 0 for b in text_page.page_dict["blocks"])
+    assert [b.to_dict() for b in text_page.blocks] == [b.to_dict() for b in expected_blocks]
+    document.close()
+
+
+def test_textpage_is_built_once(monkeypatch):
+    """words / dict / text を何度取得してもTextPageは1回だけ作る"""
+    document, page = _make_page_with_image()
+    calls = []
+    original = fitz.Page.get_textpage
+
+    def counting_get_textpage(self, *args, **kwargs):
+        calls.append(1)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(fitz.Page, "get_textpage", counting_get_textpage)
+    text_page = PageTextContext(page)
+    assert text_page.words is text_page.words
+    assert text_page.page_dict is text_page.page_dict
+    assert text_page.blocks is text_page.blocks
+    text_page.text
+    PDFProcessor().extract_text_with_structure(page, text_page=text_page)
+    assert len(calls) == 1
+    document.close()
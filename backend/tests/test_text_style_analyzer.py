@@ -0,0 +1,44 @@
+from common import Block, Line, Span, StyleProfile, analyze_text_styles
+
+
+def _block(*spans):
+    return Block((0.0, 0.0, 100.0, 20.0), [Line([Span(text, (0.0, 0.0, 10.0, 10.0), size) for text, size in spans])])
+
+
+def _list_stats(sizes):
+    """文字ごとにサイズを並べて計算した基準値（ヒストグラムでの計算と比べる）"""
+    sorted_sizes = sorted(sizes)
+    counts = {}
+    for size in sizes:
+        counts[size] = counts.get(size, 0) + 1
+    return sum(sizes) / len(sizes), sorted_sizes[len(sizes) // 2], max(counts.items(), key=lambda x: x[1])[0]
+
+
+def test_histogram_stats_match_per_character_list():
+    """文字数で重み付けしたヒストグラムから、文字ごとのリストと同じ平均・中央値・最頻値を計算する"""
+    blocks = [_block(("本文です。", 10.0), ("見出し", 16.0)), _block(("注", 8.0), ("", 30.0), ("本文", 10.5), ("x", None))]
+    sizes = [10.0] * 5 + [16.0] * 3 + [8.0] + [10.5] * 2
+    stats = analyze_text_styles(blocks)
+    avg, median, common = _list_stats(sizes)
+    assert abs(stats["avg_font_size"] - avg) < 1e-9
+    assert (stats["median_font_size"], stats["common_font_size"]) == (median, common)
+    assert StyleProfile().add_blocks(blocks).size_counts == {10.0: 5, 16.0: 3, 8.0: 1, 10.5: 2}
+
+
+def test_merged_pages_match_whole_document():
+    """ページごとのヒストグラムを順に結合した結果は、全ページをまとめて数えた結果と同じ"""
+    pages = [[_block(("あいう", 12.0))], [_block(("かきくけ", 9.0), ("さ", 12.0))], [_block(("たち", 9.0))]]
+    merged = StyleProfile()
+    for page_blocks in pages:
+        merged.merge(StyleProfile().add_blocks(page_blocks))
+    whole = StyleProfile().add_blocks([block for page_blocks in pages for block in page_blocks])
+    assert merged.size_counts == whole.size_counts
+    assert list(merged.size_counts) == [12.0, 9.0]
+    # 同数の場合は先に現れたサイズを最頻値とする
+    assert merged.stats()["common_font_size"] == 9.0
+    assert StyleProfile({12.0: 6, 9.0: 6}).stats()["common_font_size"] == 12.0
+
+
+def test_empty_profile_defaults():
+    """文字がない場合は12.0を基準値とする"""
+    assert StyleProfile().stats() == {"avg_font_size": 12.0, "median_font_size": 12.0, "common_font_size": 12.0}
@@ -0,0 +1,52 @@
+import hashlib
+import os
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from services.upload import UploadSizeLimitMiddleware, spool_upload
+
+
+def _make_client(max_body_size, max_file_size):
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, max_body_size=max_body_size)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        temp_path, document_id, size = await spool_upload(file, max_size=max_file_size)
+        with open(temp_path, 'rb') as f:
+            stored = f.read()
+        os.unlink(temp_path)
+        return {"document_id": document_id, "size": size, "stored": len(stored)}
+
+    return TestClient(app)
+
+
+def test_spool_upload_hashes_incrementally():
+    """チャンクごとに書き出した内容とハッシュが元のファイルと一致する"""
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    client = _make_client(max_body_size=10 * 1024 * 1024, max_file_size=5 * 1024 * 1024)
+    response = client.post("/upload", files={"file": ("a.pdf", data, "application/pdf")})
+    assert response.json() == {"document_id": hashlib.sha256(data).hexdigest(), "size": len(data), "stored": len(data)}
+
+
+def test_rejects_oversized_file():
+    """ファイルサイズが上限を超えると413を返す"""
+    client = _make_client(max_body_size=10 * 1024 * 1024, max_file_size=1024)
+    response = client.post("/upload", files={"file": ("a.pdf", b"x" * 2048, "application/pdf")})
+    assert response.status_code == 413
+
+
+def test_rejects_oversized_body_while_receiving():
+    """Content-Lengthがなくても、受信したボディが上限を超えた時点で413を返す"""
+    client = _make_client(max_body_size=1024, max_file_size=10 * 1024 * 1024)
+
+    def chunks():
+        for _ in range(64):
+            yield b"x" * 512
+
+    response = client.post("/upload", content=chunks(), headers={"content-type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+
+    response = client.post("/upload", files={"file": ("a.pdf", b"x" * 4096, "application/pdf")})
+    assert response.status_code == 413
@@ -1,8 +1,7 @@
 import React, { useState, useEffect } from 'react';
-import { PDFApiService, type ExtractResponse } from '../../services/api';
+import { PDFApiService, type ExtractResponse, type ExtractedPage } from '../../services/api';
 import { AuthService } from '../../services/auth';
 import { EncryptionKeyService } from '../../services/encryptionKey';
-import { EncryptionService } from '../../services/encryption';
 import styles from './TextExtractor.module.css';
 
 interface TextExtractorProps {
@@ -53,28 +52,26 @@ export const TextExtractor: React.FC<TextExtractorProps> = ({
       const encryptionKey = await EncryptionKeyService.getUserKey(currentUser);
       console.log('暗号化キー取得完了');
 
-      // 暗号化APIを使用してテキストを抽出（成形オプション有効）
-      console.log('暗号化APIでテキスト抽出中...');
-      const encryptedResponse = await PDFApiService.extractTextEncrypted(
+      // 暗号化ストリームでテキストを抽出（成形オプション有効）
+      // ページごとに受信した順に復号して表示する
+      console.log('暗号化ストリームでテキスト抽出中...');
+      const pages: ExtractedPage[] = [];
+      let fullText = '';
+      const summary = await PDFApiService.extractTextEncryptedStream(
         file,
         encryptionKey,
+        (page) => {
+          fullText = pages.length > 0 ? `${fullText}\n${page.text}` : page.text;
+          pages.push(page);
+          setExtractedData({ total_pages: numPages, extracted_pages: [...pages], full_text: fullText });
+          setIsServerAwake(true);
+        },
         startPage,
         endPage,
         true,
         true  // apply_formatting を有効化
       );
-      
-      // 復号化
-      console.log('レスポンスを復号化中...');
-      const decryptedJson = await EncryptionService.decrypt(
-        encryptedResponse.encrypted_data,
-        encryptedResponse.iv,
-        encryptionKey
-      );
-      
-      // JSONをパース
-      const data: ExtractResponse = JSON.parse(decryptedJson);
-      setExtractedData(data);
+      setExtractedData({ total_pages: summary.total_pages, extracted_pages: pages, full_text: fullText });
       setIsServerAwake(true);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'テキスト抽出に失敗しました');
@@ -34,7 +34,25 @@ export interface EncryptedExtractResponse {
   };
 }
 
+export interface ExtractStreamSummary {
+  total_pages: number;
+  extracted_pages_count: number;
+  full_text_length: number;
+  header_pages: number[];
+  footer_pages: number[];
+  column_counts: Record<string, number>;
+}
+
+export interface DocumentInfo {
+  document_id: string;
+  filename: string;
+  size: number;
+  total_pages: number;
+  expires_in: number;
+}
+
 import type { LayoutData } from '../types/layout.types';
+import { EncryptionService } from './encryption';
 
 export const analyzeLayout = (file: File, startPage?: number, endPage?: number): Promise<LayoutData> => 
   PDFApiService.analyzeLayout(file, startPage, endPage);
@@ -48,6 +66,9 @@ export const extractText = (
 ) => PDFApiService.extractText(file, startPage, endPage, preserveLayout, applyFormatting);
 
 export class PDFApiService {
+  // アップロード済みPDFのドキュメントID（同じFileは再アップロードしない）
+  private static documentIds = new WeakMap<File, Promise<string>>();
+
   private static async handleResponse<T>(response: Response): Promise<T> {
     if (!response.ok) {
       const error = await response.json().catch(() => ({ detail: 'Unknown error' }));
@@ -65,6 +86,46 @@ export class PDFApiService {
     }
   }
 
+  static async uploadDocument(file: File): Promise<DocumentInfo> {
+    const formData = new FormData();
+    formData.append('file', file);
+
+    const response = await fetch(`${API_URL}/api/documents`, {
+      method: 'POST',
+      body: formData,
+    });
+
+    return this.handleResponse<DocumentInfo>(response);
+  }
+
+  private static getDocumentId(file: File): Promise<string> {
+    let documentId = this.documentIds.get(file);
+    if (!documentId) {
+      documentId = this.uploadDocument(file).then(info => info.document_id);
+      documentId.catch(() => this.documentIds.delete(file));
+      this.documentIds.set(file, documentId);
+    }
+    return documentId;
+  }
+
+  // ドキュメントIDでリクエストし、期限切れ（404）の場合は再アップロードして1回だけ再試行
+  private static async postToDocument<T>(file: File, path: string, params: URLSearchParams): Promise<T> {
+    const request = async () => {
+      const documentId = await this.getDocumentId(file);
+      return fetch(`${API_URL}/api/documents/${documentId}/${path}?${params}`, {
+        method: 'POST',
+      });
+    };
+
+    let response = await request();
+    if (response.status === 404) {
+      this.documentIds.delete(file);
+      response = await request();
+    }
+
+    return this.handleResponse<T>(response);
+  }
+
   static async extractText(
     file: File,
     startPage: number = 1,
@@ -72,9 +133,6 @@ export class PDFApiService {
     preserveLayout: boolean = true,
     applyFormatting: boolean = true
   ): Promise<ExtractResponse> {
-    const formData = new FormData();
-    formData.append('file', file);
-    
     const params = new URLSearchParams({
       start_page: startPage.toString(),
       preserve_layout: preserveLayout.toString(),
@@ -89,12 +147,77 @@ export class PDFApiService {
       params.append('end_page', endPage.toString());
     }
 
-    const response = await fetch(`${API_URL}/api/extract-text?${params}`, {
-      method: 'POST',
-      body: formData,
+    return this.postToDocument<ExtractResponse>(file, 'extract-text', params);
+  }
+
+  // ページごとに抽出結果を受け取る（NDJSONストリーム）。完了時に集計を返す
+  static async extractTextStream(
+    file: File,
+    onPage: (page: ExtractedPage) => void,
+    startPage: number = 1,
+    endPage?: number,
+    preserveLayout: boolean = true,
+    applyFormatting: boolean = true,
+    signal?: AbortSignal
+  ): Promise<ExtractStreamSummary> {
+    const params = new URLSearchParams({
+      start_page: startPage.toString(),
+      preserve_layout: preserveLayout.toString(),
+      apply_formatting: applyFormatting.toString(),
+      remove_headers_footers: 'true',
+      merge_paragraphs: 'true',
+      normalize_spaces: 'true',
+      fix_hyphenation: 'true',
+      format: 'ndjson'
     });
+    
+    if (endPage) {
+      params.append('end_page', endPage.toString());
+    }
 
-    return this.handleResponse<ExtractResponse>(response);
+    const request = async () => {
+      const documentId = await this.getDocumentId(file);
+      return fetch(`${API_URL}/api/documents/${documentId}/extract-text-stream?${params}`, {
+        method: 'POST',
+        signal,
+      });
+    };
+
+    let response = await request();
+    if (response.status === 404) {
+      this.documentIds.delete(file);
+      response = await request();
+    }
+    if (!response.ok || !response.body) {
+      return this.handleResponse<ExtractStreamSummary>(response);
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (value) {
+        buffer += value;
+      }
+      const lines = buffer.split('\n');
+      buffer = done ? '' : lines.pop() ?? '';
+
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const record = JSON.parse(line);
+        if (record.type === 'page') {
+          onPage(record.data as ExtractedPage);
+        } else if (record.type === 'done') {
+          return record.data as ExtractStreamSummary;
+        } else if (record.type === 'error') {
+          throw new Error(record.data.detail);
+        }
+      }
+
+      if (done) {
+        throw new Error('ストリームが途中で終了しました');
+      }
+    }
   }
 
   static async extractTextEncrypted(
@@ -105,9 +228,6 @@ export class PDFApiService {
     preserveLayout: boolean = true,
     applyFormatting: boolean = true
   ): Promise<EncryptedExtractResponse> {
-    const formData = new FormData();
-    formData.append('file', file);
-    
     const params = new URLSearchParams({
       start_page: startPage.toString(),
       preserve_layout: preserveLayout.toString(),
@@ -123,12 +243,72 @@ export class PDFApiService {
       params.append('end_page', endPage.toString());
     }
 
-    const response = await fetch(`${API_URL}/api/extract-text-encrypted?${params}`, {
-      method: 'POST',
-      body: formData,
+    return this.postToDocument<EncryptedExtractResponse>(file, 'extract-text-encrypted', params);
+  }
+
+  // ページごとに暗号化された抽出結果を受け取り、受信した順に復号する。完了時に集計を返す
+  static async extractTextEncryptedStream(
+    file: File,
+    encryptionKey: string,
+    onPage: (page: ExtractedPage) => void,
+    startPage: number = 1,
+    endPage?: number,
+    preserveLayout: boolean = true,
+    applyFormatting: boolean = true,
+    signal?: AbortSignal
+  ): Promise<ExtractStreamSummary> {
+    const params = new URLSearchParams({
+      start_page: startPage.toString(),
+      preserve_layout: preserveLayout.toString(),
+      user_key: encryptionKey,
+      apply_formatting: applyFormatting.toString(),
+      remove_headers_footers: 'true',
+      merge_paragraphs: 'true',
+      normalize_spaces: 'true',
+      fix_hyphenation: 'true'
     });
+    
+    if (endPage) {
+      params.append('end_page', endPage.toString());
+    }
 
-    return this.handleResponse<EncryptedExtractResponse>(response);
+    const request = async () => {
+      const documentId = await this.getDocumentId(file);
+      return fetch(`${API_URL}/api/documents/${documentId}/extract-text-encrypted-stream?${params}`, {
+        method: 'POST',
+        signal,
+      });
+    };
+
+    let response = await request();
+    if (response.status === 404) {
+      this.documentIds.delete(file);
+      response = await request();
+    }
+    if (!response.ok || !response.body) {
+      return this.handleResponse<ExtractStreamSummary>(response);
+    }
+
+    const body = response.body;
+    const chunks = (async function* () {
+      const reader = body.getReader();
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) return;
+        yield value;
+      }
+    })();
+
+    for await (const record of EncryptionService.decryptFrames(chunks, encryptionKey)) {
+      if (record.type === 'page') {
+        onPage(record.data as ExtractedPage);
+      } else if (record.type === 'done') {
+        return record.data as ExtractStreamSummary;
+      } else if (record.type === 'error') {
+        throw new Error(record.data.detail);
+      }
+    }
+    throw new Error('ストリームが途中で終了しました');
   }
 
   static async analyzeLayout(
@@ -136,9 +316,6 @@ export class PDFApiService {
     startPage: number = 1,
     endPage?: number
   ): Promise<LayoutData> {
-    const formData = new FormData();
-    formData.append('file', file);
-
     const params = new URLSearchParams({
       start_page: startPage.toString(),
     });
@@ -147,11 +324,6 @@ export class PDFApiService {
       params.append('end_page', endPage.toString());
     }
 
-    const response = await fetch(`${API_URL}/api/analyze-layout?${params}`, {
-      method: 'POST',
-      body: formData,
-    });
-
-    return this.handleResponse(response);
+    return this.postToDocument<LayoutData>(file, 'analyze-layout', params);
   }
-}
\ No newline at end of file
+}
@@ -87,4 +87,60 @@ export class EncryptionService {
       throw new Error('復号化に失敗しました');
     }
   }
-}
\ No newline at end of file
+
+  /**
+   * 暗号化ストリーム（/extract-text-encrypted-stream）のフレームを受信した順に復号化
+   * フレーム: [長さ 4バイト][nonce 12バイト][暗号文 + 認証タグ]
+   */
+  static async *decryptFrames(
+    chunks: AsyncIterable<Uint8Array>,
+    key: string
+  ): AsyncGenerator<{ type: string; data: any }> {
+    const keyBytes = Uint8Array.from(atob(key), c => c.charCodeAt(0));
+    const cryptoKey = await crypto.subtle.importKey(
+      'raw',
+      keyBytes.slice(0, 32),
+      { name: 'AES-GCM' },
+      false,
+      ['decrypt']
+    );
+    const decoder = new TextDecoder();
+
+    let buffer = new Uint8Array(0);
+    let frameIndex = 0;
+    let noncePrefix: Uint8Array | null = null;
+    for await (const chunk of chunks) {
+      const merged = new Uint8Array(buffer.length + chunk.length);
+      merged.set(buffer);
+      merged.set(chunk, buffer.length);
+      buffer = merged;
+
+      while (buffer.length >= 16) {
+        const length = new DataView(buffer.buffer, buffer.byteOffset).getUint32(0);
+        if (buffer.length < 16 + length) break;
+
+        const nonce = buffer.slice(4, 16);
+        // nonce の先頭8バイトはストリームごとに同じ値、末尾4バイトはフレームの通し番号
+        // （別のストリームのフレームの混入・入れ替えの検出）
+        if (noncePrefix === null) {
+          noncePrefix = nonce.slice(0, 8);
+        }
+        const prefix = noncePrefix;
+        if (
+          !nonce.subarray(0, 8).every((byte, i) => byte === prefix[i]) ||
+          new DataView(nonce.buffer).getUint32(8) !== frameIndex
+        ) {
+          throw new Error('フレームの順序が不正です');
+        }
+        const decrypted = await crypto.subtle.decrypt(
+          { name: 'AES-GCM', iv: nonce },
+          cryptoKey,
+          buffer.slice(16, 16 + length)
+        );
+        buffer = buffer.slice(16 + length);
+        frameIndex++;
+        yield JSON.parse(decoder.decode(decrypted));
+      }
+    }
+  }
+}